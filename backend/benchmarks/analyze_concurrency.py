@@ -0,0 +1,114 @@
+"""
+Load figure for /api/analyze on a single worker.
+
+Replays N concurrent "full" analyses against one event loop with the ADK
+runner swapped for a stand-in that takes MODEL_LATENCY seconds per call.
+
+Two runner modes are compared:
+- blocking: the model call holds the event loop (what the old synchronous
+  runner.run path did inside the async endpoint)
+- async:    the model call awaits, like runner.run_async
+
+For each concurrency level we report wall time, completed analyses per
+second, and the worst stall seen by a probe coroutine that stands in for
+an unrelated request (e.g. /api/upload) served by the same worker.
+
+Every level starts with an empty analysis cache and analyzes documents no
+other level has seen, so each persona pass really reaches the runner.
+Databases the API opens are kept in a temporary directory.
+
+Usage:
+    cd backend
+    python benchmarks/analyze_concurrency.py --latency 0.5 --levels 1 5 10 25 50
+"""
+
+import argparse
+import asyncio
+import atexit
+import itertools
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Set before main is imported, so nothing is written to the working directory.
+_WORKDIR = tempfile.mkdtemp(prefix="clauseguard-bench-")
+atexit.register(shutil.rmtree, _WORKDIR, ignore_errors=True)
+os.environ["CLAUSEGUARD_RISK_INDEX_DB"] = os.path.join(_WORKDIR, "risks.db")
+os.environ["CLAUSEGUARD_BATCH_DB"] = os.path.join(_WORKDIR, "batch.db")
+
+from corpus import contract  # noqa: E402
+from fake_runner import FakeRunner, install  # noqa: E402
+from guardian import agent  # noqa: E402
+from guardian.analysis_cache import AnalysisCache  # noqa: E402
+from main import AnalysisRequest, analyze_content  # noqa: E402
+
+DOCUMENT_CHARS = 2400
+
+# Seeds for the synthetic contracts; never reused within a run.
+_seeds = itertools.count(1)
+
+
+async def _probe(stop: asyncio.Event, interval: float = 0.01) -> float:
+    """Measures the longest time the event loop failed to schedule us."""
+    worst = 0.0
+    while not stop.is_set():
+        before = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - before - interval)
+    return worst
+
+
+async def _run_level(concurrency: int) -> dict:
+    # Fresh cache and distinct documents: no analysis is served from cache.
+    agent.analysis_cache = AnalysisCache(db_path=None)
+    requests = [
+        AnalysisRequest(
+            content=contract(DOCUMENT_CHARS, seed=next(_seeds)),
+            context="is this safe to sign", persona_mode="full",
+        )
+        for _ in range(concurrency)
+    ]
+    stop = asyncio.Event()
+    probe = asyncio.create_task(_probe(stop))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(analyze_content(request) for request in requests))
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    stall = await probe
+    return {
+        "concurrency": concurrency,
+        "wall_s": elapsed,
+        "analyses_per_s": concurrency / elapsed,
+        "max_stall_s": stall,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--latency", type=float, default=0.5,
+                        help="simulated seconds per model call")
+    parser.add_argument("--levels", type=int, nargs="+",
+                        default=[1, 5, 10, 25, 50])
+    args = parser.parse_args()
+
+    print(f"model latency per call: {args.latency:.2f}s, 4 persona passes per analysis")
+    print(f"{'mode':<9} {'clients':>7} {'wall s':>8} {'analyses/s':>11} {'max stall s':>12}")
+
+    for mode in ("blocking", "async"):
+        install(FakeRunner(args.latency, risks=1, blocking=(mode == "blocking")))
+        for level in args.levels:
+            row = asyncio.run(_run_level(level))
+            print(
+                f"{mode:<9} {row['concurrency']:>7} {row['wall_s']:>8.2f} "
+                f"{row['analyses_per_s']:>11.2f} {row['max_stall_s']:>12.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Fan-out vs consolidated persona analysis.
+
+Runs the same document through both analysis modes against the real
+Gemini runner (GOOGLE_API_KEY must be set) with the analysis cache
+disabled, and reports for each mode:
+
+- input tokens   (estimated as prompt characters / 4)
+- output tokens  (estimated as response characters / 4)
+- wall-clock latency
+- risks found per persona
+
+plus the agreement between the two modes: per persona, the Jaccard
+overlap of the quoted clauses, and the share of shared findings on which
+both modes gave the same severity.
+
+Usage:
+    cd backend
+    python benchmarks/consolidated_vs_fanout.py path/to/contract.txt --repeat 3
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from guardian import agent  # noqa: E402
+from guardian.analysis_cache import AnalysisCache  # noqa: E402
+from guardian.segmentation import risk_fingerprint  # noqa: E402
+
+PERSONAS = ["legal", "financial", "insurance", "compliance"]
+
+
+class _Meter:
+    """Wraps agent._run_prompt to count characters in and out."""
+
+    def __init__(self):
+        self.prompt_chars = 0
+        self.response_chars = 0
+        self.calls = 0
+        self._inner = agent._run_prompt
+
+    async def __call__(self, prompt, conversation_id=None):
+        self.calls += 1
+        self.prompt_chars += len(prompt)
+        reply = await self._inner(prompt, conversation_id)
+        self.response_chars += len(reply)
+        return reply
+
+
+async def _run_mode(mode: str, document: str) -> dict:
+    # Fresh, memory-only cache so every run really calls the model.
+    agent.analysis_cache = AnalysisCache(db_path=None)
+    meter = _Meter()
+    agent._run_prompt = meter
+    try:
+        start = time.perf_counter()
+        by_persona = {p: [] for p in PERSONAS}
+        async for key, risks, failure in agent._iter_persona_passes(
+            PERSONAS, document, None, mode
+        ):
+            by_persona[key] = risks
+        elapsed = time.perf_counter() - start
+    finally:
+        agent._run_prompt = meter._inner
+
+    return {
+        "latency_s": elapsed,
+        "calls": meter.calls,
+        "input_tokens": meter.prompt_chars // 4,
+        "output_tokens": meter.response_chars // 4,
+        "risks": by_persona,
+    }
+
+
+def _agreement(a: list, b: list) -> tuple:
+    prints_a = {risk_fingerprint(r): r.get("severity") for r in a}
+    prints_b = {risk_fingerprint(r): r.get("severity") for r in b}
+    union = prints_a.keys() | prints_b.keys()
+    shared = prints_a.keys() & prints_b.keys()
+    jaccard = len(shared) / len(union) if union else 1.0
+    same_severity = (
+        sum(prints_a[k] == prints_b[k] for k in shared) / len(shared) if shared else 1.0
+    )
+    return jaccard, same_severity
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("document", help="path to a .txt/.md contract")
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+
+    with open(args.document, encoding="utf-8") as f:
+        document = f.read()
+
+    runs = {agent.ANALYSIS_FANOUT: [], agent.ANALYSIS_CONSOLIDATED: []}
+    for _ in range(args.repeat):
+        for mode in runs:
+            runs[mode].append(asyncio.run(_run_mode(mode, document)))
+
+    print(f"document: {len(document)} chars, personas: {', '.join(PERSONAS)}")
+    print(f"{'mode':<13} {'calls':>5} {'in tok':>8} {'out tok':>8} {'p50 s':>7} {'max s':>7}")
+    for mode, results in runs.items():
+        latencies = [r["latency_s"] for r in results]
+        last = results[-1]
+        print(
+            f"{mode:<13} {last['calls']:>5} {last['input_tokens']:>8} "
+            f"{last['output_tokens']:>8} {statistics.median(latencies):>7.2f} "
+            f"{max(latencies):>7.2f}"
+        )
+
+    print(f"\n{'persona':<11} {'fanout':>6} {'consol':>6} {'jaccard':>8} {'same sev':>9}")
+    fanout = runs[agent.ANALYSIS_FANOUT][-1]["risks"]
+    consolidated = runs[agent.ANALYSIS_CONSOLIDATED][-1]["risks"]
+    for p in PERSONAS:
+        jaccard, same = _agreement(fanout[p], consolidated[p])
+        print(
+            f"{p:<11} {len(fanout[p]):>6} {len(consolidated[p]):>6} "
+            f"{jaccard:>8.2f} {same:>9.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
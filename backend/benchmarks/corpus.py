@@ -0,0 +1,163 @@
+"""
+Synthetic contract corpus for offline benchmarks.
+
+contract(size, seed) builds a numbered, clause-structured contract of
+about size characters from a fixed pool of clause templates, so the same
+(size, seed) always gives the same text and different seeds give
+different documents (and therefore different cache keys). Some templates
+trip the persona RULES on purpose.
+
+write_pdf(text, path) lays the text out as a plain multi-page PDF
+(Helvetica, no external dependency) that pypdf can extract again.
+
+Usage:
+    cd backend
+    python benchmarks/corpus.py out_dir --sizes 2000 20000 200000 --pdf
+"""
+
+import argparse
+import os
+import random
+import textwrap
+from typing import List
+
+_PARTIES = ["Acme Holdings Ltd", "Northwind Traders", "Globex Corporation",
+            "Initech LLC", "Umbrella Services", "Stark Logistics"]
+
+_HEADINGS = ["Definitions", "Term", "Payment", "Fees", "Termination",
+             "Confidentiality", "Liability", "Indemnification", "Insurance",
+             "Data Protection", "Governing Law", "Assignment", "Notices",
+             "Warranties", "Force Majeure", "Audit Rights", "Renewal"]
+
+_CLAUSES = [
+    "The {a} shall pay the {b} the fees set out in Schedule 1 within {n} days of "
+    "receipt of a valid invoice. Late payments accrue interest at {p}% per month.",
+    "This Agreement renews automatically for successive periods of {n} months "
+    "unless either party gives written notice of non-renewal.",
+    "The {b} may terminate this Agreement at any time for convenience on {n} "
+    "days' notice. Any deposit paid is non-refundable.",
+    "The {a} shall indemnify and hold harmless the {b} against all claims, losses "
+    "and expenses arising out of or in connection with this Agreement.",
+    "Each party shall keep confidential all information received from the other "
+    "party and shall not disclose it to any third party for {n} years.",
+    "The {a} waives any right to a jury trial and agrees to binding arbitration "
+    "of all disputes under this Agreement.",
+    "The {b} shall maintain professional liability insurance with a limit of not "
+    "less than {n},000 USD per claim throughout the term.",
+    "Personal data shall be processed only on documented instructions and in "
+    "accordance with applicable data protection law, including the GDPR.",
+    "Neither party's aggregate liability shall exceed the fees paid in the "
+    "{n} months preceding the claim, save for fraud or wilful misconduct.",
+    "The {a} may not assign or transfer any of its rights under this Agreement "
+    "without the prior written consent of the {b}.",
+    "Notices shall be in writing and delivered by hand or registered post to the "
+    "address set out above, and take effect on receipt.",
+    "The {b} may increase the fees once per year by no more than {p}% on {n} "
+    "days' written notice to the {a}.",
+]
+
+
+def contract(size: int, seed: int = 0) -> str:
+    """A deterministic synthetic contract of about size characters."""
+    rng = random.Random(seed * 1_000_003 + size)
+    a, b = rng.sample(_PARTIES, 2)
+    parts = [f"SERVICES AGREEMENT\n\nThis Agreement is made between {a} and {b}."]
+    length = len(parts[0])
+    number = 1
+    while length < size:
+        heading = rng.choice(_HEADINGS)
+        sentences = " ".join(
+            rng.choice(_CLAUSES).format(
+                a="Client", b="Provider", n=rng.randint(2, 90), p=rng.randint(1, 15)
+            )
+            for _ in range(rng.randint(1, 4))
+        )
+        clause = f"{number}. {heading}\n{sentences}"
+        parts.append(clause)
+        length += len(clause) + 2
+        number += 1
+    return "\n\n".join(parts)
+
+
+# ==================================================
+# PDF
+# ==================================================
+
+_PAGE_LINES = 60
+_LINE_CHARS = 95
+
+
+def _escape(line: str) -> str:
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _layout(text: str) -> List[List[str]]:
+    lines = []
+    for paragraph in text.split("\n"):
+        lines.extend(textwrap.wrap(paragraph, _LINE_CHARS) or [""])
+    return [lines[i:i + _PAGE_LINES] for i in range(0, len(lines), _PAGE_LINES)] or [[""]]
+
+
+def write_pdf(text: str, path: str) -> int:
+    """Writes text as a simple PDF and returns the number of pages."""
+    pages = _layout(text)
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # page tree, filled in once the page object ids are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+    ]
+    page_ids = []
+    for lines in pages:
+        body = "BT /F1 10 Tf 12 TL 50 800 Td\n" + "".join(
+            f"({_escape(line)}) '\n" for line in lines
+        ) + "ET"
+        stream = body.encode("latin-1", "replace")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id
+        )
+        page_ids.append(len(objects))
+    kids = b" ".join(b"%d 0 R" % i for i in page_ids)
+    objects[1] = b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % len(page_ids)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + obj + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1, xref
+    )
+    with open(path, "wb") as f:
+        f.write(out)
+    return len(pages)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("out_dir")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[2000, 20000, 200000])
+    parser.add_argument("--count", type=int, default=1, help="documents per size")
+    parser.add_argument("--pdf", action="store_true", help="also write PDFs")
+    args = parser.parse_args()
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    for size in args.sizes:
+        for seed in range(args.count):
+            text = contract(size, seed)
+            stem = os.path.join(args.out_dir, f"contract_{size}_{seed}")
+            with open(stem + ".txt", "w", encoding="utf-8") as f:
+                f.write(text)
+            if args.pdf:
+                pages = write_pdf(text, stem + ".pdf")
+                print(f"{stem}.pdf  {pages} pages")
+            print(f"{stem}.txt  {len(text)} chars")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Deterministic stand-in for the ADK Runner, for offline benchmarks.
+
+install() swaps it into guardian.agent (and lifts the scheduler's rate
+limits, which exist to protect the real API quota) so the whole backend
+runs without network access or API spend.
+
+Responses are a JSON list of risks derived from the prompt itself: the
+same prompt always yields the same risks, quoting lines of the document
+that was sent, so de-duplication, attribution and scoring see realistic
+input.
+"""
+
+import asyncio
+import json
+import random
+import time
+import zlib
+from types import SimpleNamespace
+
+_SEVERITIES = ["LOW", "MEDIUM", "HIGH", "CRITICAL"]
+
+
+class FakeRunner:
+    """
+    Stand-in for google.adk.runners.Runner.
+
+    latency:      seconds per call
+    risks:        risks returned per call
+    explanation:  characters of explanation per risk (response size)
+    blocking:     hold the event loop for the latency instead of awaiting,
+                  like a synchronous runner.run inside an async endpoint
+    """
+
+    def __init__(self, latency: float = 0.2, risks: int = 3,
+                 explanation: int = 160, blocking: bool = False):
+        self.latency = latency
+        self.risks = risks
+        self.explanation = explanation
+        self.blocking = blocking
+        self.calls = 0
+        self.prompt_chars = 0
+        self.response_chars = 0
+
+    def respond(self, prompt: str) -> str:
+        rng = random.Random(zlib.crc32(prompt.encode("utf-8")))
+        lines = [line.strip() for line in prompt.splitlines() if len(line.strip()) > 40]
+        risks = []
+        for i in range(self.risks if lines else 0):
+            quote = rng.choice(lines)[:200]
+            risks.append({
+                "title": f"Synthetic finding {i + 1}",
+                "clause": quote,
+                "severity": rng.choice(_SEVERITIES),
+                "irreversible": rng.random() < 0.2,
+                "explanation": ("x" * self.explanation),
+            })
+        return json.dumps(risks)
+
+    async def run_async(self, user_id, session_id, new_message):
+        prompt = "".join(p.text for p in new_message.parts if p.text)
+        if self.blocking:
+            time.sleep(self.latency)
+        else:
+            await asyncio.sleep(self.latency)
+        text = self.respond(prompt)
+        self.calls += 1
+        self.prompt_chars += len(prompt)
+        self.response_chars += len(text)
+        part = SimpleNamespace(text=text)
+        yield SimpleNamespace(content=SimpleNamespace(parts=[part]))
+
+
+def install(runner: FakeRunner, rate_limits: bool = False) -> FakeRunner:
+    """
+    Routes guardian.agent's model calls to runner. Unless rate_limits is
+    set, the scheduler is replaced by an unlimited one so numbers reflect
+    the backend, not the production quota settings.
+    """
+    from guardian import agent
+    from guardian.scheduler import LLMScheduler
+
+    agent.runner = runner
+    if not rate_limits:
+        agent.scheduler = LLMScheduler(
+            requests_per_second=0, tokens_per_minute=0, concurrency=10**6, max_queue=0
+        )
+    return runner
@@ -0,0 +1,288 @@
+"""
+Offline end-to-end benchmark of /api/upload and /api/analyze.
+
+Runs the FastAPI handlers in-process against the deterministic FakeRunner
+(no API key, no quota) and a synthetic corpus of contracts and PDFs:
+
+- upload:  text and PDF uploads of each --sizes, latency per upload
+- analyze: --clients concurrent clients, each sending --requests analyses
+           of its own documents (distinct texts, so the analysis cache
+           never answers for the model), per document size
+
+For each scenario it reports p50/p95/p99 latency and throughput, and at
+the end the process memory high-water mark and a per-stage breakdown
+(time spent in intent detection, routing, rule screening, persona
+passes, model calls, scoring, PDF extraction, storage and indexing).
+Stages nest (a persona pass contains its model calls), so shares do not
+add up to 100%.
+
+--json writes the same figures to a file for comparing two revisions.
+
+Usage:
+    cd backend
+    python benchmarks/offline_suite.py --latency 0.2 --sizes 2000 20000 200000 --clients 1 8 32
+"""
+
+import argparse
+import asyncio
+import atexit
+import io
+import json
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Set before main is imported, so the benchmark never touches the real
+# batch queue or risk index.
+_DB_DIR = tempfile.mkdtemp(prefix="clauseguard-bench-db-")
+atexit.register(shutil.rmtree, _DB_DIR, ignore_errors=True)
+os.environ["CLAUSEGUARD_RISK_INDEX_DB"] = os.path.join(_DB_DIR, "risks.db")
+os.environ["CLAUSEGUARD_BATCH_DB"] = os.path.join(_DB_DIR, "batch.db")
+
+from starlette.datastructures import Headers, UploadFile  # noqa: E402
+
+import main  # noqa: E402
+from guardian import agent, pdf_extraction  # noqa: E402
+from guardian.analysis_cache import AnalysisCache  # noqa: E402
+from corpus import contract, write_pdf  # noqa: E402
+from fake_runner import FakeRunner, install  # noqa: E402
+
+
+# ==================================================
+# STAGE TIMING
+# ==================================================
+
+class _Stages:
+    """Wraps module attributes to accumulate wall time per stage."""
+
+    def __init__(self):
+        self.seconds = defaultdict(float)
+        self.calls = defaultdict(int)
+
+    def wrap(self, owner, attribute: str, stage: str) -> None:
+        inner = getattr(owner, attribute)
+
+        if asyncio.iscoroutinefunction(inner):
+            async def timed(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await inner(*args, **kwargs)
+                finally:
+                    self._add(stage, start)
+        else:
+            def timed(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return inner(*args, **kwargs)
+                finally:
+                    self._add(stage, start)
+
+        setattr(owner, attribute, timed)
+
+    def _add(self, stage: str, start: float) -> None:
+        self.seconds[stage] += time.perf_counter() - start
+        self.calls[stage] += 1
+
+    def report(self, wall: float) -> list:
+        return [
+            {
+                "stage": stage,
+                "calls": self.calls[stage],
+                "total_s": round(seconds, 4),
+                "mean_ms": round(seconds / self.calls[stage] * 1000, 3),
+                "share_of_wall": round(seconds / wall, 4) if wall else 0.0,
+            }
+            for stage, seconds in sorted(self.seconds.items(), key=lambda i: -i[1])
+        ]
+
+
+def _instrument(stages: _Stages) -> None:
+    stages.wrap(agent, "classify_intent", "intent")
+    stages.wrap(agent, "resolve_personas_async", "routing")
+    stages.wrap(agent, "_screen_document", "rules")
+    stages.wrap(agent, "_run_persona_pass", "persona_pass")
+    stages.wrap(agent, "_collect_text", "model_call")
+    stages.wrap(agent, "score_risks", "scoring")
+    stages.wrap(main, "extract_pdf_text", "pdf_extract")
+    stages.wrap(main.document_store, "put", "store")
+    stages.wrap(main, "index_for", "index")
+
+
+# ==================================================
+# SCENARIOS
+# ==================================================
+
+def _percentiles(latencies: list) -> dict:
+    ordered = sorted(latencies)
+
+    def pick(pct):
+        return ordered[min(int(len(ordered) * pct), len(ordered) - 1)]
+
+    return {
+        "n": len(ordered),
+        "p50_ms": round(pick(0.50) * 1000, 2),
+        "p95_ms": round(pick(0.95) * 1000, 2),
+        "p99_ms": round(pick(0.99) * 1000, 2),
+    }
+
+
+def _upload_file(data: bytes, filename: str, content_type: str) -> UploadFile:
+    return UploadFile(
+        file=io.BytesIO(data), filename=filename,
+        headers=Headers({"content-type": content_type}),
+    )
+
+
+async def _bench_upload(size: int, repeat: int, workdir: str) -> list:
+    rows = []
+    for kind in ("text", "pdf"):
+        latencies = []
+        for seed in range(repeat):
+            text = contract(size, seed=10_000 + seed)
+            if kind == "pdf":
+                path = os.path.join(workdir, f"upload_{size}_{seed}.pdf")
+                write_pdf(text, path)
+                with open(path, "rb") as f:
+                    upload = _upload_file(f.read(), "contract.pdf", "application/pdf")
+            else:
+                upload = _upload_file(text.encode("utf-8"), "contract.txt", "text/plain")
+            start = time.perf_counter()
+            await main.upload_document(upload)
+            latencies.append(time.perf_counter() - start)
+        rows.append({"scenario": f"upload {kind}", "size": size, **_percentiles(latencies)})
+    return rows
+
+
+async def _bench_analyze(size: int, clients: int, requests: int, persona_mode: str) -> dict:
+    # Fresh cache and distinct documents: every pass really reaches the runner.
+    agent.analysis_cache = AnalysisCache(db_path=None)
+    documents = [
+        [main.document_store.put(contract(size, seed=client * 1000 + r)).document_id
+         for r in range(requests)]
+        for client in range(clients)
+    ]
+    latencies = []
+
+    async def client(document_ids):
+        for document_id in document_ids:
+            request = main.AnalysisRequest(
+                document_id=document_id, context="is this safe to sign",
+                persona_mode=persona_mode,
+            )
+            start = time.perf_counter()
+            await main.analyze_content(request)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(ids) for ids in documents))
+    wall = time.perf_counter() - start
+    return {
+        "scenario": f"analyze x{clients}",
+        "size": size,
+        **_percentiles(latencies),
+        "throughput_per_s": round(len(latencies) / wall, 2),
+    }
+
+
+def _max_rss_mb() -> dict:
+    # ru_maxrss is in KiB on Linux (bytes on macOS).
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return {
+        "process_max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale, 1),
+        "pdf_workers_max_rss_mb": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale, 1),
+    }
+
+
+async def _run(args) -> dict:
+    runner = install(FakeRunner(args.latency, risks=args.risks, explanation=args.explanation))
+    stages = _Stages()
+    _instrument(stages)
+    if args.tracemalloc:
+        tracemalloc.start()
+
+    rows = []
+    began = time.perf_counter()
+    with tempfile.TemporaryDirectory(prefix="clauseguard-bench-") as workdir:
+        for size in args.sizes:
+            rows.extend(await _bench_upload(size, args.upload_repeat, workdir))
+            for clients in args.clients:
+                rows.append(await _bench_analyze(size, clients, args.requests, args.persona_mode))
+    wall = time.perf_counter() - began
+
+    # RUSAGE_CHILDREN only covers workers that have exited.
+    if pdf_extraction._pool is not None:
+        pdf_extraction._pool.shutdown()
+        pdf_extraction._pool = None
+    memory = _max_rss_mb()
+    if args.tracemalloc:
+        memory["python_heap_peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 2**20, 1)
+        tracemalloc.stop()
+    return {
+        "config": vars(args),
+        "scenarios": rows,
+        "memory": memory,
+        "stages": stages.report(wall),
+        "model": {
+            "calls": runner.calls,
+            "prompt_chars": runner.prompt_chars,
+            "response_chars": runner.response_chars,
+        },
+        "wall_s": round(wall, 2),
+    }
+
+
+def _print(report: dict) -> None:
+    print(f"{'scenario':<14} {'size':>8} {'n':>5} {'p50 ms':>9} {'p95 ms':>9} "
+          f"{'p99 ms':>9} {'req/s':>8}")
+    for row in report["scenarios"]:
+        print(f"{row['scenario']:<14} {row['size']:>8} {row['n']:>5} {row['p50_ms']:>9.1f} "
+              f"{row['p95_ms']:>9.1f} {row['p99_ms']:>9.1f} "
+              f"{row.get('throughput_per_s', float('nan')):>8.2f}")
+
+    print()
+    for key, value in report["memory"].items():
+        print(f"{key:<26} {value:>8.1f}")
+
+    print(f"\n{'stage':<14} {'calls':>7} {'total s':>9} {'mean ms':>9} {'share':>7}")
+    for row in report["stages"]:
+        print(f"{row['stage']:<14} {row['calls']:>7} {row['total_s']:>9.3f} "
+              f"{row['mean_ms']:>9.3f} {row['share_of_wall']:>7.1%}")
+
+    model = report["model"]
+    print(f"\nmodel calls: {model['calls']}, prompt chars: {model['prompt_chars']}, "
+          f"response chars: {model['response_chars']}, wall: {report['wall_s']}s")
+
+
+def main_():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--latency", type=float, default=0.2,
+                        help="simulated seconds per model call")
+    parser.add_argument("--risks", type=int, default=3, help="risks per model response")
+    parser.add_argument("--explanation", type=int, default=160,
+                        help="characters of explanation per risk")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[2000, 20000, 200000])
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=3, help="analyses per client")
+    parser.add_argument("--upload-repeat", type=int, default=5)
+    parser.add_argument("--persona-mode", default="full")
+    parser.add_argument("--tracemalloc", action="store_true",
+                        help="also report the Python heap peak (slower)")
+    parser.add_argument("--json", help="write the report to this file")
+    args = parser.parse_args()
+
+    report = asyncio.run(_run(args))
+    _print(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main_()
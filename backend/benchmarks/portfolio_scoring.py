@@ -0,0 +1,128 @@
+"""
+Benchmark of portfolio scoring: per-document loop vs vectorized pass.
+
+Generates a synthetic portfolio (documents of 0-40 risks with mixed
+severities, personas, irreversibility and a few malformed entries) and
+scores it under several profiles, including float weights and custom
+thresholds:
+
+- loop:       score_risks on every document, as the analyses do
+- columns:    building RiskColumns once from the risk dicts
+- vectorized: score_portfolio + portfolio_aggregates on those columns
+
+Every document's vectorized result is checked against score_risks, value
+and type, before any timing is printed.
+
+Usage:
+    cd backend
+    python benchmarks/portfolio_scoring.py --documents 20000 --repeat 3
+"""
+
+import argparse
+import copy
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from guardian.portfolio_scoring import (  # noqa: E402
+    RiskColumns,
+    portfolio_aggregates,
+    profile_from,
+    score_portfolio,
+)
+from guardian.risk_scoring import score_risks  # noqa: E402
+
+SEVERITIES = ["LOW", "MEDIUM", "HIGH", "CRITICAL"]
+ODD_SEVERITIES = ["SEVERE", None, 3]
+PERSONAS = ["legal", "financial", "privacy", "employment", "consumer"]
+TITLES = [
+    "Automatic renewal", "Unlimited liability", "Non-compete", "Arbitration clause",
+    "Data sharing with third parties", "Termination without notice", "Late payment fees",
+    "IP assignment", "Unilateral changes", "Indemnification",
+]
+
+PROFILES = {
+    "default": profile_from(),
+    "float weights": profile_from({"LOW": 0.5, "MEDIUM": 2.5, "HIGH": 7.25}, 22.5, 10.1),
+    "strict": profile_from({"HIGH": 9, "CRITICAL": 20, "SEVERE": 8}, 15, 6),
+}
+
+SCORE_FIELDS = ("total_risk_score", "irreversibility_index", "irreversible_risks", "critical_risks", "verdict")
+
+
+def _portfolio(documents: int, seed: int = 7) -> dict:
+    rng = random.Random(seed)
+    portfolio = {}
+    for i in range(documents):
+        risks = []
+        for _ in range(rng.randint(0, 40)):
+            risk = {
+                "persona": rng.choice(PERSONAS),
+                "title": rng.choice(TITLES),
+                "irreversible": rng.random() < 0.2,
+            }
+            if rng.random() < 0.97:
+                risk["severity"] = rng.choice(SEVERITIES if rng.random() < 0.98 else ODD_SEVERITIES)
+            risks.append(risk)
+        portfolio[f"doc-{i}"] = risks
+    return portfolio
+
+
+def _time(fn, repeat: int):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), result
+
+
+def _vectorized(columns: RiskColumns, profile) -> dict:
+    scored = score_portfolio(columns, profile)
+    portfolio_aggregates(columns, scored)
+    return scored
+
+
+def _check(portfolio: dict, expected: dict, scored: dict) -> None:
+    for document in scored["documents"]:
+        want = expected[document["document_id"]]
+        for name in SCORE_FIELDS:
+            got = document[name]
+            if got != want[name] or type(got) is not type(want[name]):
+                raise AssertionError(f"{document['document_id']} {name}: {got!r} != {want[name]!r}")
+        assert document["risks"] == len(portfolio[document["document_id"]])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--documents", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    portfolio = _portfolio(args.documents)
+    risks = sum(len(r) for r in portfolio.values())
+    print(f"{args.documents} documents, {risks} risks")
+
+    columns_ms, columns = _time(lambda: RiskColumns.from_documents(portfolio), args.repeat)
+    print(f"{'profile':<15} {'loop ms':>9} {'columns ms':>11} {'vectorized ms':>14} {'speedup':>8}")
+    for label, profile in PROFILES.items():
+        # score_risks writes each risk's score; keep the inputs untouched.
+        copies = copy.deepcopy(portfolio)
+        loop_ms, expected = _time(
+            lambda: {k: score_risks(v, profile) for k, v in copies.items()}, args.repeat
+        )
+        vector_ms, scored = _time(lambda: _vectorized(columns, profile), args.repeat)
+        _check(portfolio, expected, scored)
+        print(
+            f"{label:<15} {loop_ms:>9.2f} {columns_ms:>11.2f} {vector_ms:>14.2f} "
+            f"{loop_ms / max(vector_ms, 1e-9):>7.1f}x"
+        )
+    print("all documents match score_risks")
+
+
+if __name__ == "__main__":
+    main()
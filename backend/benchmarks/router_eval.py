@@ -0,0 +1,103 @@
+"""
+Accuracy and latency of the offline persona router.
+
+Evaluates guardian/router_model.json on the "eval" split of a labeled
+sample file and compares it with the substring rules resolve_personas
+used before the router existed. The shipped samples are synthetic: eval
+samples are built from clause sentences that never appear in training.
+
+Reports:
+- exact persona-set accuracy and per-persona accuracy
+- routing latency (featurize + predict) p50 / p99 per call
+- share of samples below the confidence threshold, i.e. the ones that
+  would be sent to the Gemini persona_router
+
+Usage:
+    cd backend
+    python benchmarks/router_eval.py [guardian/data/router_samples.jsonl]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from guardian.routing import (  # noqa: E402
+    ROUTED_PERSONAS,
+    ROUTER_CONFIDENCE_THRESHOLD,
+    PersonaRouter,
+    load_samples,
+)
+
+DEFAULT_SAMPLES = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "guardian", "data", "router_samples.jsonl",
+)
+
+
+def _substring_rules(text: str) -> set:
+    text = text.lower()
+    personas = set()
+    if "payment" in text or "fee" in text:
+        personas.add("financial")
+    if "insurance" in text:
+        personas.add("insurance")
+    if "data" in text or "privacy" in text:
+        personas.add("compliance")
+    return personas
+
+
+def _report(name: str, predictions: list, samples: list) -> None:
+    exact = sum(p == set(s["labels"]) for p, s in zip(predictions, samples))
+    per_label = {
+        label: sum(
+            (label in p) == (label in s["labels"]) for p, s in zip(predictions, samples)
+        ) / len(samples)
+        for label in ROUTED_PERSONAS
+    }
+    labels = "  ".join(f"{k} {v:.2f}" for k, v in per_label.items())
+    print(f"{name:<16} exact {exact / len(samples):.2f}  {labels}")
+
+
+def _percentile(values: list, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("samples", nargs="?", default=DEFAULT_SAMPLES,
+                        help="labeled sample file (JSONL)")
+    args = parser.parse_args()
+
+    path = args.samples
+    samples = load_samples(path, split="eval")
+    router = PersonaRouter.load()
+
+    routed, latencies, low_confidence = [], [], 0
+    for sample in samples:
+        start = time.perf_counter()
+        personas, confidence, _ = router.route(sample["text"])
+        latencies.append((time.perf_counter() - start) * 1000)
+        routed.append(set(personas) - {"legal"})
+        low_confidence += confidence < ROUTER_CONFIDENCE_THRESHOLD
+
+    print(f"{len(samples)} eval samples from {path}\n")
+    _report("offline router", routed, samples)
+    _report("substring rules", [_substring_rules(s["text"]) for s in samples], samples)
+
+    print(
+        f"\nrouting latency: p50 {statistics.median(latencies):.3f} ms, "
+        f"p99 {_percentile(latencies, 0.99):.3f} ms"
+    )
+    print(
+        f"below confidence {ROUTER_CONFIDENCE_THRESHOLD:.2f} (LLM fallback): "
+        f"{low_confidence / len(samples):.0%}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Microbenchmark for the intent and sufficiency heuristics.
+
+Compares, on synthetic 1 MB and 10 MB documents:
+
+- legacy:      the per-heuristic `text.lower()` + `any(k in text ...)`
+               substring checks (including the old auto persona rules)
+- scan:        one KeywordScanner pass per text, as a request uses it
+               (the document scan is lazy and skipped when length decides)
+- scan (hits): the same, but forcing every document keyword hit with
+               offsets to be materialized
+
+Two document flavours are used: "contract" (keywords everywhere) and
+"no-match" (no keyword at all, the worst case for substring checks).
+
+Usage:
+    cd backend
+    python benchmarks/scan_microbench.py --repeat 5
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from guardian import agent  # noqa: E402
+
+QUERY = "Is this agreement safe to sign? Please explain the risks."
+
+CONTRACT_WORDS = (
+    "the company shall pay all fees within thirty days of invoice and may "
+    "terminate this agreement for material breach subject to the terms and "
+    "conditions data privacy insurance liability confidentiality"
+).split()
+NO_MATCH_WORDS = "lorem ipsum dolor sit amet consectetur adipiscing elit sed".split()
+
+
+def _document(words, size_bytes: int, seed: int = 7) -> str:
+    rng = random.Random(seed)
+    parts, size = [], 0
+    while size < size_bytes:
+        word = rng.choice(words)
+        parts.append(word)
+        size += len(word) + 1
+    return " ".join(parts)
+
+
+def _legacy(query: str, document: str) -> None:
+    """The pre-scanner heuristics, verbatim in behaviour."""
+    keywords = [
+        "agreement", "offer", "shall", "may", "terms", "conditions",
+        "liability", "employment", "internship", "payment",
+        "termination", "contract", "policy", "confidentiality"
+    ]
+    any(k in document.lower() for k in keywords) or len(document.strip()) > 150
+    triggers = [
+        "explain", "clarify", "what does this mean", "why",
+        "who are the parties", "when does it end", "benefits", "risks"
+    ]
+    any(t in query.lower() for t in triggers)
+    q = query.lower()
+    any(t in q for t in ["i want to", "i plan to", "i am planning", "before i"])
+    any(t in q for t in ["what is", "about", "describe", "overview", "summary", "purpose"])
+    any(t in q for t in ["risk", "safe", "sign", "accept", "danger", "legal", "fair"])
+    text = document.lower()
+    "payment" in text or "fee" in text
+    "insurance" in text
+    "data" in text or "privacy" in text
+
+
+def _scan(query: str, document: str) -> None:
+    query_scan = agent.scan_text(query)
+    has_doc = agent.is_document_sufficient(document)
+    agent.classify_intent(query, has_doc, query_scan)
+    agent.is_situation_description(query, query_scan)
+
+
+def _scan_hits(query: str, document: str) -> None:
+    _scan(query, document)
+    agent.scan_text(document).hits
+
+
+def _time(fn, query, document, repeat) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(query, document)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'document':<18} {'legacy ms':>10} {'scan ms':>9} {'scan+hits ms':>13} {'hits':>8}")
+    for label, words in (("contract", CONTRACT_WORDS), ("no-match", NO_MATCH_WORDS)):
+        for size_mb in (1, 10):
+            document = _document(words, size_mb * 1024 * 1024)
+            hits = sum(len(v) for v in agent.scan_text(document).hits.values())
+            print(
+                f"{label + f' {size_mb} MB':<18} "
+                f"{_time(_legacy, QUERY, document, args.repeat):>10.2f} "
+                f"{_time(_scan, QUERY, document, args.repeat):>9.2f} "
+                f"{_time(_scan_hits, QUERY, document, args.repeat):>13.2f} "
+                f"{hits:>8}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Interactive latency under batch load, with and without call priorities.
+
+A stand-in model call takes --latency seconds and the scheduler is capped
+at --concurrency calls and --rps requests per second. --batch background
+calls are queued first, then --interactive calls arrive every --spacing
+seconds while that backlog drains.
+We report interactive p50/p95 wait with every call at batch priority
+(plain FIFO) and with interactive calls at interactive priority.
+
+A fraction of calls (--error-rate) fail with a retryable 503 to exercise
+the retry path; the retry count is reported as well.
+
+Usage:
+    cd backend
+    python benchmarks/scheduler_priority.py --batch 400 --interactive 20
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from guardian.scheduler import (  # noqa: E402
+    PRIORITY_BATCH,
+    PRIORITY_INTERACTIVE,
+    LLMScheduler,
+)
+
+
+class _Unavailable(Exception):
+    code = 503
+
+
+def _fake_call(latency: float, error_rate: float, rng: random.Random):
+    async def call():
+        await asyncio.sleep(latency)
+        if rng.random() < error_rate:
+            raise _Unavailable("503 UNAVAILABLE")
+        return "[]"
+    return call
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * pct), len(ordered) - 1)]
+
+
+async def _run(args, interactive_priority: int) -> dict:
+    rng = random.Random(7)
+    scheduler = LLMScheduler(
+        requests_per_second=args.rps,
+        tokens_per_minute=0,
+        concurrency=args.concurrency,
+        max_queue=0,
+        backoff_seconds=0.01,
+        breaker_failures=0,
+    )
+    call = _fake_call(args.latency, args.error_rate, rng)
+
+    background = [
+        asyncio.ensure_future(scheduler.submit(call, priority=PRIORITY_BATCH))
+        for _ in range(args.batch)
+    ]
+    await asyncio.sleep(0)
+
+    async def interactive():
+        start = time.perf_counter()
+        try:
+            await scheduler.submit(call, priority=interactive_priority)
+        except _Unavailable:
+            pass
+        return time.perf_counter() - start
+
+    arrivals = []
+    for _ in range(args.interactive):
+        arrivals.append(asyncio.ensure_future(interactive()))
+        await asyncio.sleep(args.spacing)
+    waits = await asyncio.gather(*arrivals)
+
+    await asyncio.gather(*background, return_exceptions=True)
+    return {
+        "p50": statistics.median(waits),
+        "p95": _percentile(waits, 0.95),
+        "retries": scheduler.stats()["retries"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--latency", type=float, default=0.05,
+                        help="simulated seconds per model call")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rps", type=float, default=100)
+    parser.add_argument("--batch", type=int, default=400)
+    parser.add_argument("--interactive", type=int, default=20)
+    parser.add_argument("--spacing", type=float, default=0.05,
+                        help="seconds between interactive arrivals")
+    parser.add_argument("--error-rate", type=float, default=0.05)
+    args = parser.parse_args()
+
+    print(f"{'interactive priority':<22} {'p50 s':>8} {'p95 s':>8} {'retries':>8}")
+    for label, priority in (("batch (FIFO)", PRIORITY_BATCH),
+                            ("interactive", PRIORITY_INTERACTIVE)):
+        row = asyncio.run(_run(args, priority))
+        print(f"{label:<22} {row['p50']:>8.3f} {row['p95']:>8.3f} {row['retries']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,9 @@
 import os
 import json
+import asyncio
+import contextvars
 from dotenv import load_dotenv
-from typing import List, Optional
+from typing import Callable, List, Optional
 
 from google.adk.agents import LlmAgent
 from google.adk.runners import Runner
@@ -10,6 +12,24 @@ from google.genai.types import Content, Part
 
 from guardian.personas import legal, financial, insurance, compliance
 from guardian.risk_scoring import score_risks
+from guardian.deduplication import merge_duplicate_risks
+from guardian.document_ingestion import content_hash
+from guardian.analysis_cache import analysis_cache, make_cache_key
+from guardian.sessions import SessionManager
+from guardian.segmentation import segment_clauses, chunk_clauses, merge_chunk_risks
+from guardian.routing import ROUTER_CONFIDENCE_THRESHOLD, get_router
+from guardian.text_scan import KeywordScanner, TextScan
+from guardian.rule_engine import run_rules, narrow_for_rules, skipped_clauses, standing_rule_risks
+from guardian.speculation import SpeculativePrefetcher
+from guardian.scheduler import SchedulerRejected, estimate_tokens, scheduler
+from guardian.metrics import metrics, span
+from guardian.json_stream import RiskParseError, RiskStreamParser
+from guardian.compaction import (
+    PROMPT_TOKEN_BUDGET,
+    compact_document,
+    document_budget_chars,
+    fit_to_budget,
+)
 
 load_dotenv(os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), '.env'))
 
@@ -17,8 +37,14 @@ load_dotenv(os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file_
 # CONSTANTS
 # ==================================================
 
+MODEL_NAME = "gemini-3-flash-preview"
+
+# Bump whenever a prompt template below changes, so cached results produced
+# by the old wording are not served for the new one.
+PROMPT_VERSION = "2"
+
+APP_NAME = "guardian_app"
 USER_ID = "clauseguard_user"
-SESSION_ID = "clauseguard_session"
 
 INTENT_SUMMARY = "DOCUMENT_SUMMARY"
 INTENT_RISK = "RISK_ASSESSMENT"
@@ -27,6 +53,31 @@ INTENT_CHAT = "GENERAL_CHAT"
 
 ALLOWED_PERSONAS = {"legal", "financial", "insurance", "compliance", "full", "auto"}
 
+# "fanout" sends the document once per persona; "consolidated" sends it once
+# with every selected persona's instructions and gets persona-tagged risks.
+ANALYSIS_FANOUT = "fanout"
+ANALYSIS_CONSOLIDATED = "consolidated"
+ANALYSIS_MODES = (ANALYSIS_FANOUT, ANALYSIS_CONSOLIDATED)
+
+# Persona passes are fanned out concurrently (at most PERSONA_CONCURRENCY at a
+# time); a pass that runs longer than PERSONA_TIMEOUT_SECONDS is dropped and
+# the remaining results are kept.
+PERSONA_CONCURRENCY = int(os.getenv("CLAUSEGUARD_PERSONA_CONCURRENCY", "4"))
+PERSONA_TIMEOUT_SECONDS = float(os.getenv("CLAUSEGUARD_PERSONA_TIMEOUT", "60"))
+
+# Documents longer than CHUNK_CHARS are segmented into clauses and each
+# persona pass maps over clause chunks (up to CHUNK_CONCURRENCY at a time)
+# before the per-chunk risks are merged. A chunk never exceeds what the
+# prompt token budget leaves for the document.
+CHUNK_CHARS = min(
+    int(os.getenv("CLAUSEGUARD_CHUNK_CHARS", "24000")), document_budget_chars()
+)
+CHUNK_CONCURRENCY = int(os.getenv("CLAUSEGUARD_CHUNK_CONCURRENCY", "8"))
+
+# Clauses a persona's deterministic rules fully cover (a match in every
+# sentence) are left out of that persona's model pass. Off by default.
+RULE_NARROWING = os.getenv("CLAUSEGUARD_RULE_NARROWING", "0") == "1"
+
 # ==================================================
 # PERSONA REGISTRY
 # ==================================================
@@ -44,7 +95,7 @@ PERSONA_MAP = {
 
 clause_guard = LlmAgent(
     name="ClauseGuard_Core",
-    model="gemini-3-flash-preview",
+    model=MODEL_NAME,
     instruction="""
 You are ClauseGuard — a data-centric risk intelligence system for high-stakes documents.
 
@@ -70,67 +121,81 @@ If the input is not a document, do NOT analyze it.
 # ==================================================
 
 session_service = InMemorySessionService()
-session_service.create_session_sync(
-    app_name="guardian_app",
-    user_id=USER_ID,
-    session_id=SESSION_ID,
-)
 
 runner = Runner(
     agent=clause_guard,
-    app_name="guardian_app",
+    app_name=APP_NAME,
     session_service=session_service,
 )
 
+# Persona passes and summaries run in throwaway sessions; chat turns get one
+# bounded session per conversation_id.
+sessions = SessionManager(session_service, app_name=APP_NAME, user_id=USER_ID)
+
 # ==================================================
 # GUARDS & INTENT DETECTION
 # ==================================================
 
-def is_document_sufficient(text: str) -> bool:
-    if not text or len(text.strip()) < 50:
-        return False
-
-    keywords = [
+# Keyword groups for every heuristic below. They are matched as whole
+# words/phrases by one shared scanner; each text is lowercased and scanned
+# once per request and the heuristics read from that single result.
+KEYWORD_GROUPS = {
+    "document": [
         "agreement", "offer", "shall", "may", "terms", "conditions",
         "liability", "employment", "internship", "payment",
         "termination", "contract", "policy", "confidentiality"
-    ]
-    return any(k in text.lower() for k in keywords) or len(text.strip()) > 150
-
-
-def is_followup_query(query: str) -> bool:
-    triggers = [
+    ],
+    "followup": [
         "explain", "clarify", "what does this mean", "why",
         "who are the parties", "when does it end", "benefits", "risks"
-    ]
-    return any(t in query.lower() for t in triggers)
-
-def is_situation_description(query: str) -> bool:
-    """Detects if user is describing a real-world context without a document."""
-    triggers = [
+    ],
+    "situation": [
         "i want to", "i plan to", "i am planning",
         "i don't have a document", "before i",
         "what should i know", "what documents",
         "requirements", "process"
-    ]
-    q = query.lower()
-    return any(t in q for t in triggers)
+    ],
+    "summary": ["what is", "about", "describe", "overview", "summary", "purpose"],
+    "risk": [
+        "risk", "risks", "risky", "safe", "sign", "signing", "accept",
+        "danger", "dangerous", "legal", "fair"
+    ],
+}
+
+keyword_scanner = KeywordScanner(KEYWORD_GROUPS)
+
 
+def scan_text(text: str) -> TextScan:
+    return keyword_scanner.scan(text)
+
+
+def is_document_sufficient(text: str, scan: Optional[TextScan] = None) -> bool:
+    scan = scan or scan_text(text)
+    if scan.stripped_length < 50:
+        return False
+    # Long enough on its own; only short texts need the keyword scan.
+    return scan.stripped_length > 150 or scan.has("document")
 
-def classify_intent(query: str, has_doc: bool) -> str:
-    q = query.lower().strip()
 
+def is_followup_query(query: str, scan: Optional[TextScan] = None) -> bool:
+    return (scan or scan_text(query)).has("followup")
+
+def is_situation_description(query: str, scan: Optional[TextScan] = None) -> bool:
+    """Detects if user is describing a real-world context without a document."""
+    return (scan or scan_text(query)).has("situation")
+
+
+def classify_intent(query: str, has_doc: bool, scan: Optional[TextScan] = None) -> str:
     if not has_doc:
         return INTENT_CHAT
 
-    if is_followup_query(query):
-        return INTENT_FOLLOWUP
+    scan = scan or scan_text(query)
 
-    summary_triggers = ["what is", "about", "describe", "overview", "summary", "purpose"]
-    risk_triggers = ["risk", "safe", "sign", "accept", "danger", "legal", "fair"]
+    if is_followup_query(query, scan):
+        return INTENT_FOLLOWUP
 
-    is_summary = any(t in q for t in summary_triggers)
-    is_risk = any(t in q for t in risk_triggers)
+    is_summary = scan.has("summary")
+    is_risk = scan.has("risk")
 
     if is_summary and not is_risk:
         return INTENT_SUMMARY
@@ -145,33 +210,183 @@ def classify_intent(query: str, has_doc: bool) -> str:
 # ==================================================
 
 def resolve_personas(mode: str, document: str) -> List[str]:
+    personas, _ = _resolve_personas_with_confidence(mode, document)
+    return personas
+
+
+def _resolve_personas_with_confidence(mode: str, document: str):
     if mode == "full":
-        return ["legal", "financial", "insurance", "compliance"]
+        return ["legal", "financial", "insurance", "compliance"], 1.0
 
     if mode in ["financial", "insurance", "compliance"]:
-        return ["legal", mode]
+        return ["legal", mode], 1.0
 
     if mode == "legal":
-        return ["legal"]
+        return ["legal"], 1.0
+
+    # auto: offline router (hashed n-grams + linear model, sub-millisecond)
+    router = get_router()
+    if router is None:
+        return ["legal"], 0.0
+    personas, confidence, _ = router.route(document)
+    return personas, confidence
+
 
-    # auto
-    personas = {"legal"}
-    text = document.lower()
+async def resolve_personas_async(mode: str, document: str, user_query: str = "") -> List[str]:
+    """
+    resolve_personas, but in auto mode a low-confidence routing decision
+    is handed to the Gemini persona_router agent.
+    """
+    personas, confidence = _resolve_personas_with_confidence(mode, document)
+    if confidence >= ROUTER_CONFIDENCE_THRESHOLD:
+        return personas
 
-    if "payment" in text or "fee" in text:
-        personas.add("financial")
-    if "insurance" in text:
-        personas.add("insurance")
-    if "data" in text or "privacy" in text:
-        personas.add("compliance")
+    # Imported lazily: persona_router builds its own ADK runner.
+    from persona_router import determine_relevant_personas_async
 
-    return list(personas)
+    selected = await determine_relevant_personas_async(user_query, document)
+    if not selected:
+        return personas
+    return ["legal"] + [p for p in selected if p != "legal"]
+
+# ==================================================
+# MODEL CALLS
+# ==================================================
+
+async def _run_prompt(
+    prompt: str,
+    conversation_id: Optional[str] = None,
+    parser: Optional[RiskStreamParser] = None
+) -> str:
+    """
+    Sends one prompt through the ADK runner without blocking the event loop
+    and returns the concatenated text of the response events.
+
+    Without a conversation_id the prompt runs in a one-shot session that
+    keeps no history. A parser, if given, is fed the text as it arrives.
+    """
+    if conversation_id:
+        async with sessions.conversation(conversation_id) as session_id:
+            return await _collect_text(prompt, session_id, parser)
+
+    async with sessions.ephemeral() as session_id:
+        return await _collect_text(prompt, session_id, parser)
+
+
+async def _collect_text(
+    prompt: str, session_id: str, parser: Optional[RiskStreamParser] = None
+) -> str:
+    # Every model call goes through the scheduler: rate limits, priority,
+    # retries and the circuit breaker all apply here.
+    return await scheduler.submit(
+        lambda: _stream_text(prompt, session_id, parser), estimate_tokens(prompt)
+    )
+
+
+async def _stream_text(
+    prompt: str, session_id: str, parser: Optional[RiskStreamParser] = None
+) -> str:
+    message = Content(role="user", parts=[Part(text=prompt)])
+    chunks = []
+    if parser is not None:
+        # A retried call streams the response again from the start.
+        parser.reset()
+    async for e in runner.run_async(
+        user_id=USER_ID, session_id=session_id, new_message=message
+    ):
+        if e.content:
+            for p in e.content.parts:
+                if p.text:
+                    chunks.append(p.text)
+                    if parser is not None:
+                        parser.feed(p.text)
+    return "".join(chunks)
+
+
+def _parsed_risks(parser: RiskStreamParser, kind: str) -> List[dict]:
+    """
+    Closes the parser and returns its risks. Whatever had to be dropped is
+    counted; a response with problems and no usable risk at all raises
+    RiskParseError, so the pass is reported as failed rather than clean.
+    """
+    risks = parser.close()
+    if parser.failures:
+        for reason, count in parser.failures.items():
+            metrics.inc("clauseguard_parse_failures_total", count, kind=kind, reason=reason)
+        print(f"[Parse Warning] {kind}: kept {len(risks)} risks, dropped {parser.failures}")
+        if not risks:
+            raise RiskParseError(parser.failures)
+    return risks
 
 # ==================================================
 # PERSONA PASS
 # ==================================================
 
-def _run_persona_pass(persona, document: str) -> List[dict]:
+# Set by a caller that wants risks as soon as they are parsed, before their
+# pass finishes; called as listener(persona_key, risk).
+risk_listener: contextvars.ContextVar[Optional[Callable[[str, dict], None]]] = (
+    contextvars.ContextVar("clauseguard_risk_listener", default=None)
+)
+
+
+def _persona_key(persona) -> str:
+    return persona.__name__.rsplit(".", 1)[-1]
+
+
+async def _run_persona_pass(
+    persona, document: str, document_hash: Optional[str] = None
+) -> List[dict]:
+    with span("persona_pass", persona=_persona_key(persona)):
+        if len(document) > CHUNK_CHARS:
+            return await _run_chunked_persona_pass(persona, document)
+        return await _run_single_persona_pass(persona, document, document_hash)
+
+
+async def _run_chunked_persona_pass(persona, document: str) -> List[dict]:
+    """
+    Map-reduce pass for long documents: one call per clause chunk, run in
+    parallel, then merged and de-duplicated. Chunks that fail are dropped
+    as long as at least one succeeds.
+    """
+    chunks = chunk_clauses(segment_clauses(document), CHUNK_CHARS)
+    slots = asyncio.Semaphore(max(CHUNK_CONCURRENCY, 1))
+
+    async def _map(chunk):
+        async with slots:
+            return await _run_single_persona_pass(persona, chunk["text"])
+
+    outcomes = await asyncio.gather(
+        *(_map(c) for c in chunks), return_exceptions=True
+    )
+    results = [o for o in outcomes if not isinstance(o, BaseException)]
+    errors = [o for o in outcomes if isinstance(o, BaseException)]
+    if errors:
+        if not results:
+            raise errors[0]
+        print(
+            f"[Persona Pass Warning] {_persona_key(persona)}: "
+            f"{len(errors)}/{len(chunks)} chunks failed"
+        )
+    return merge_chunk_risks(results)
+
+
+async def _run_single_persona_pass(
+    persona, document: str, document_hash: Optional[str] = None
+) -> List[dict]:
+    key = make_cache_key(
+        "persona", document_hash or content_hash(document), _persona_key(persona),
+        PROMPT_VERSION, MODEL_NAME,
+    )
+    # Empty results are not cached: they are also what a parse failure
+    # looks like, and we do not want to pin a bad response.
+    return await analysis_cache.get_or_compute(
+        key,
+        lambda: _call_persona_pass(persona, document),
+        should_cache=bool,
+    )
+
+
+async def _call_persona_pass(persona, document: str) -> List[dict]:
     prompt = f"""
 [SYSTEM MODE: ACTIVATE PERSONA '{persona.NAME}']
 {persona.SYSTEM_INSTRUCTION}
@@ -182,47 +397,364 @@ No explanations.
 [DOCUMENT]
 {document}
 """
-    message = Content(role="user", parts=[Part(text=prompt)])
-    events = runner.run(user_id=USER_ID, session_id=SESSION_ID, new_message=message)
+    key = _persona_key(persona)
+    listener = risk_listener.get()
+    parser = RiskStreamParser(
+        on_risk=(lambda risk: listener(key, risk)) if listener else None
+    )
+    await _run_prompt(prompt, parser=parser)
+    return _parsed_risks(parser, "persona")
+
+
+# ==================================================
+# CONSOLIDATED PASS
+# ==================================================
+
+async def _run_consolidated_pass(
+    personas: List[str], document: str, document_hash: Optional[str] = None
+) -> List[dict]:
+    """
+    One model call covering every persona in personas. Long documents are
+    mapped over clause chunks like the per-persona pass.
+    """
+    if len(document) > CHUNK_CHARS:
+        chunks = chunk_clauses(segment_clauses(document), CHUNK_CHARS)
+        slots = asyncio.Semaphore(max(CHUNK_CONCURRENCY, 1))
+
+        async def _map(chunk):
+            async with slots:
+                return await _run_single_consolidated_pass(personas, chunk["text"])
+
+        results = await asyncio.gather(*(_map(c) for c in chunks))
+        # Merge within a persona only; the same clause flagged by two
+        # personas is two findings.
+        return [
+            r for p in personas
+            for r in merge_chunk_risks(
+                [[x for x in chunk_risks if x["persona"] == p] for chunk_risks in results]
+            )
+        ]
+    return await _run_single_consolidated_pass(personas, document, document_hash)
+
+
+async def _run_single_consolidated_pass(
+    personas: List[str], document: str, document_hash: Optional[str] = None
+) -> List[dict]:
+    key = make_cache_key(
+        "consolidated", document_hash or content_hash(document),
+        "+".join(sorted(personas)), PROMPT_VERSION, MODEL_NAME,
+    )
+    return await analysis_cache.get_or_compute(
+        key,
+        lambda: _call_consolidated_pass(personas, document),
+        should_cache=bool,
+    )
+
+
+async def _call_consolidated_pass(personas: List[str], document: str) -> List[dict]:
+    sections = "\n".join(
+        f"""
+[PERSONA '{key}': {PERSONA_MAP[key].NAME}]
+{PERSONA_MAP[key].SYSTEM_INSTRUCTION}"""
+        for key in personas
+    )
+    prompt = f"""
+[SYSTEM MODE: MULTI-PERSONA REVIEW]
+Review the document once, as each of the following personas in turn.
+{sections}
+
+Extract risks as JSON only.
+No explanations.
+Return a single JSON array. Every element must be an object:
+{{
+  "persona": one of {json.dumps(personas)},
+  "title": "short name of the risk",
+  "clause": "exact quoted clause text",
+  "severity": "LOW" | "MEDIUM" | "HIGH" | "CRITICAL",
+  "irreversible": true | false,
+  "explanation": "why this is risky, in plain language"
+}}
+
+[DOCUMENT]
+{document}
+"""
+    # Findings without a recognised persona are kept under legal, which is
+    # part of every analysis.
+    def _owner(risk):
+        return risk.get("persona") if risk.get("persona") in personas else "legal"
+
+    listener = risk_listener.get()
+    parser = RiskStreamParser(
+        on_risk=(lambda risk: listener(_owner(risk), risk)) if listener else None
+    )
+    await _run_prompt(prompt, parser=parser)
+    return [{**r, "persona": _owner(r)} for r in _parsed_risks(parser, "consolidated")]
+
+
+async def _iter_consolidated_pass(
+    personas: List[str],
+    document: str,
+    document_hash: Optional[str] = None,
+    on_risk: Optional[Callable[[str, dict], None]] = None
+):
+    """
+    Same contract as _iter_persona_passes, backed by one consolidated call.
+    """
+    async def _run():
+        # Runs as its own task, so the listener stays local to this pass.
+        risk_listener.set(on_risk)
+        return await _run_consolidated_pass(personas, document, document_hash)
 
-    raw = "".join(p.text for e in events if e.content for p in e.content.parts if p.text)
     try:
-        return json.loads(raw)
-    except Exception:
-        return []
+        risks = await asyncio.wait_for(_run(), timeout=PERSONA_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        for key in personas:
+            yield key, [], {"persona": key, "reason": "timeout"}
+        return
+    except RiskParseError as e:
+        for key in personas:
+            yield key, [], {"persona": key, "reason": "unparseable", "detail": str(e)}
+        return
+    except SchedulerRejected:
+        raise
+    except Exception as e:
+        print(f"[Consolidated Pass Error] {e}")
+        for key in personas:
+            yield key, [], {"persona": key, "reason": "error", "detail": str(e)}
+        return
+
+    for key in personas:
+        yield key, [dict(r) for r in risks if r["persona"] == key], None
+
+# ==================================================
+# PERSONA FAN-OUT
+# ==================================================
+
+async def _iter_persona_passes(
+    personas: List[str],
+    document: str,
+    document_hash: Optional[str] = None,
+    analysis_mode: str = ANALYSIS_FANOUT,
+    documents: Optional[dict] = None,
+    on_risk: Optional[Callable[[str, dict], None]] = None
+):
+    """
+    Runs the persona passes concurrently and yields each outcome as soon as
+    that pass finishes.
+
+    Each pass gets its own timeout, measured from when it acquires a
+    concurrency slot. Slow or failing personas are reported instead of
+    failing the whole analysis.
+
+    documents optionally maps a persona to the (narrowed) text its pass
+    should read instead of document.
+
+    on_risk(persona_key, risk) is called for each risk as soon as it is
+    parsed from a streaming response (not for cached passes).
+
+    Yields:
+        (persona_key, risks, failure) where failure is None on success or
+        {"persona": ..., "reason": "timeout" | "unparseable" | "error", ...}
+
+    Raises SchedulerRejected if the scheduler refuses a pass's model call.
+    """
+    if analysis_mode == ANALYSIS_CONSOLIDATED:
+        async for outcome in _iter_consolidated_pass(
+            personas, document, document_hash, on_risk
+        ):
+            yield outcome
+        return
+
+    slots = asyncio.Semaphore(max(PERSONA_CONCURRENCY, 1))
+
+    async def _task(key):
+        text = documents.get(key, document) if documents else document
+        # Each pass is its own task, so the listener stays local to it.
+        risk_listener.set(on_risk)
+        text_hash = document_hash if text is document else None
+        try:
+            async with slots:
+                risks = await asyncio.wait_for(
+                    _run_persona_pass(PERSONA_MAP[key], text, text_hash),
+                    timeout=PERSONA_TIMEOUT_SECONDS,
+                )
+            # Copy so scoring never mutates the cached objects, and tag each
+            # risk with the persona that raised it.
+            return key, [{**r, "persona": key} for r in risks], None
+        except asyncio.TimeoutError:
+            return key, [], {"persona": key, "reason": "timeout"}
+        except RiskParseError as e:
+            return key, [], {"persona": key, "reason": "unparseable", "detail": str(e)}
+        except SchedulerRejected:
+            # Not a persona failure: the whole request is refused (429/503).
+            raise
+        except Exception as e:
+            print(f"[Persona Pass Error] {key}: {e}")
+            return key, [], {"persona": key, "reason": "error", "detail": str(e)}
+
+    tasks = [asyncio.ensure_future(_task(p)) for p in personas]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def _screen_document(
+    document: str, personas: List[str], analysis_mode: str = ANALYSIS_FANOUT
+):
+    """
+    Runs the rule pre-screen and returns (rule_risks, documents, skipped),
+    where documents is the per-persona text for _iter_persona_passes and
+    skipped the clauses left out of each pass (None and {} when narrowing
+    is off).
+    """
+    clauses = segment_clauses(document)
+    rule_risks = run_rules(document, personas, clauses)
+    documents, skipped = None, {}
+    if RULE_NARROWING and analysis_mode != ANALYSIS_CONSOLIDATED:
+        documents = narrow_for_rules(document, personas, clauses, rule_risks)
+        skipped = skipped_clauses(personas, clauses, rule_risks)
+    return rule_risks, documents, skipped
+
+
+# ==================================================
+# SPECULATIVE PREFETCH
+# ==================================================
+
+async def _speculative_pass(key: str, text: str, text_hash: Optional[str]):
+    await asyncio.wait_for(
+        _run_persona_pass(PERSONA_MAP[key], text, text_hash),
+        timeout=PERSONA_TIMEOUT_SECONDS,
+    )
+
+
+speculation = SpeculativePrefetcher(_speculative_pass)
+
 
 # ==================================================
 # SUMMARY GENERATOR
 # ==================================================
 
-def generate_document_summary(document: str) -> str:
+async def generate_document_summary(
+    document: str, document_hash: Optional[str] = None
+) -> str:
+    key = make_cache_key(
+        "summary", document_hash or content_hash(document), "-",
+        PROMPT_VERSION, MODEL_NAME,
+    )
+    with span("summary"):
+        return await analysis_cache.get_or_compute(
+            key,
+            lambda: _call_document_summary(document),
+            should_cache=bool,
+        )
+
+
+async def _call_document_summary(document: str) -> str:
+    # The summary reads the document in one call, so an over-budget
+    # document is cut at a clause boundary rather than sent whole.
+    document, budget = fit_to_budget(document)
+    note = ""
+    if budget["decision"] == "truncate":
+        note = "\nOnly the beginning of the document is included; say so.\n"
     prompt = f"""
 Provide a neutral explanation of what this document is about.
 Describe purpose, parties, and scope.
 Do NOT assess risk.
-
+{note}
 [DOCUMENT]
 {document}
 """
-    message = Content(role="user", parts=[Part(text=prompt)])
-    events = runner.run(user_id=USER_ID, session_id=SESSION_ID, new_message=message)
-    return "".join(p.text for e in events if e.content for p in e.content.parts if p.text).strip()
+    return (await _run_prompt(prompt)).strip()
 
 # ==================================================
 # MAIN ENTRY
 # ==================================================
 
-def run_clauseguard_consensus(
+def _event(name: str, data: dict) -> dict:
+    return {"event": name, "data": data}
+
+
+async def _with_early_risks(outcomes, found: asyncio.Queue):
+    """
+    Interleaves the outcomes of _iter_persona_passes with the risks their
+    passes report while still streaming (queued as (persona, risk) pairs).
+
+    Yields ("risk", (persona, risk)) and ("outcome", outcome); a pass's
+    early risks always come before its outcome.
+    """
+    next_outcome = asyncio.ensure_future(outcomes.__anext__())
+    next_risk = asyncio.ensure_future(found.get())
+    try:
+        while True:
+            await asyncio.wait(
+                {next_outcome, next_risk}, return_when=asyncio.FIRST_COMPLETED
+            )
+            if next_risk.done():
+                yield "risk", next_risk.result()
+                next_risk = asyncio.ensure_future(found.get())
+            if not next_outcome.done():
+                continue
+            while not found.empty():
+                yield "risk", found.get_nowait()
+            try:
+                outcome = next_outcome.result()
+            except StopAsyncIteration:
+                return
+            yield "outcome", outcome
+            next_outcome = asyncio.ensure_future(outcomes.__anext__())
+    finally:
+        next_risk.cancel()
+        next_outcome.cancel()
+        await asyncio.gather(next_outcome, return_exceptions=True)
+        await outcomes.aclose()
+
+
+async def stream_clauseguard_consensus(
     user_query: str,
     file_context: str,
-    persona_mode: Optional[str] = "auto"
+    persona_mode: Optional[str] = "auto",
+    conversation_id: Optional[str] = None,
+    document_hash: Optional[str] = None,
+    analysis_mode: str = ANALYSIS_FANOUT
 ):
-    has_doc = is_document_sufficient(file_context)
-    intent = classify_intent(user_query, has_doc)
+    """
+    Runs the consensus engine and yields progress events as they happen.
+
+    Events (dicts of {"event": name, "data": {...}}):
+        intent          {"intent": ...}
+        personas        {"personas": [...]}                 risk analysis only
+        provisional     rule-engine risks and their verdict, before any model call
+        persona_risk    {"persona": ..., "risk": {...}}     a risk parsed while its
+                                                            pass is still streaming
+        persona_result  {"persona": ..., "risks": [...]}    one per finished pass
+        persona_failed  {"persona": ..., "reason": ...}
+        partial_score   score of the risks received so far (no verdict)
+        result          the final response, same shape as
+                        run_clauseguard_consensus_async returns
+
+    document_hash may be passed by callers that already hashed the
+    document (e.g. the document store) so it is not re-hashed per pass.
+    analysis_mode selects fan-out (one call per persona) or a single
+    consolidated call.
+
+    Prompts are built from the compacted document; each scored risk gets
+    the "location" of its quote in file_context as uploaded. Scores count
+    a clause flagged by several personas once (see merge_duplicate_risks).
+    """
+    compaction = compact_document(file_context)
+    file_context = compaction.text
+    with span("intent"):
+        query_scan = scan_text(user_query)
+        has_doc = is_document_sufficient(file_context)
+        intent = classify_intent(user_query, has_doc, query_scan)
+    yield _event("intent", {"intent": intent})
 
     # ---------- CHAT / PREVENTIVE ----------
     if intent == INTENT_CHAT:
-        if is_situation_description(user_query):
+        if is_situation_description(user_query, query_scan):
             preventive_prompt = f"""
 You are ClauseGuard operating in PREVENTIVE MODE.
 
@@ -239,15 +771,13 @@ TASK:
 • Do NOT ask for a document immediately
 • Be structured and calm
 """
-            message = Content(role="user", parts=[Part(text=preventive_prompt)])
-            events = runner.run(user_id=USER_ID, session_id=SESSION_ID, new_message=message)
-            reply = "".join(
-                p.text for e in events if e.content for p in e.content.parts if p.text
-            )
-            return {
+            with span("preventive"):
+                reply = await _run_prompt(preventive_prompt, conversation_id)
+            yield _event("result", {
                 "status": "PREVENTIVE_GUIDANCE",
                 "message": reply.strip()
-            }
+            })
+            return
 
         # General chat
         chat_prompt = f"""
@@ -260,57 +790,192 @@ Task:
 - Keep responses concise and professional.
 - Do NOT give specific legal or financial advice.
 """
-        message = Content(role="user", parts=[Part(text=chat_prompt)])
-        events = runner.run(user_id=USER_ID, session_id=SESSION_ID, new_message=message)
-        reply = "".join(
-            p.text for e in events if e.content for p in e.content.parts if p.text
-        )
-        return {
+        with span("chat"):
+            reply = await _run_prompt(chat_prompt, conversation_id)
+        yield _event("result", {
             "status": "INFO",
             "message": reply.strip()
-        }
+        })
+        return
 
     # ---------- SUMMARY ----------
     if intent == INTENT_SUMMARY:
-        return {
+        yield _event("result", {
             "status": "INFO",
-            "message": generate_document_summary(file_context)
-        }
+            "message": await generate_document_summary(file_context, document_hash)
+        })
+        return
 
     # ---------- PERSONA SELECTION ----------
     if intent == INTENT_RISK and persona_mode == "auto":
-        return {
+        recommended = resolve_personas("auto", file_context)
+        # Start the likely passes now; the request with the chosen mode
+        # then joins them through the analysis cache.
+        document_hash = document_hash or content_hash(file_context)
+        _, documents, _ = _screen_document(file_context, recommended)
+        speculation.start(
+            conversation_id or document_hash, file_context, document_hash,
+            documents or {p: file_context for p in recommended},
+        )
+        yield _event("result", {
             "status": "AWAITING_PERSONA_SELECTION",
             "message": "How would you like this analyzed?",
-            "persona_options": ["Legal", "Financial", "Compliance", "Full Analysis"]
-        }
+            "persona_options": ["Legal", "Financial", "Compliance", "Full Analysis"],
+            "recommended_personas": recommended
+        })
+        return
 
     # ---------- RISK ANALYSIS ----------
-    personas = resolve_personas(persona_mode, file_context)
-    risks = []
-
-    for p in personas:
-        risks.extend(_run_persona_pass(PERSONA_MAP[p], file_context))
+    with span("routing"):
+        personas = await resolve_personas_async(persona_mode, file_context, user_query)
+    document_hash = document_hash or content_hash(file_context)
+    speculation.settle(
+        conversation_id or document_hash, document_hash,
+        personas if analysis_mode != ANALYSIS_CONSOLIDATED else [],
+    )
+    yield _event("personas", {"personas": personas})
+
+    # Deterministic pre-screen: instant provisional verdict, and clauses it
+    # already covers are not sent to the model again.
+    with span("rules"):
+        rule_risks, documents, skipped = _screen_document(file_context, personas, analysis_mode)
+    if rule_risks:
+        provisional = score_risks(merge_duplicate_risks([dict(r) for r in rule_risks]))
+        yield _event("provisional", {
+            "total_risk_score": provisional["total_risk_score"],
+            "irreversible_risks": provisional["irreversible_risks"],
+            "critical_risks": provisional["critical_risks"],
+            "verdict": provisional["verdict"],
+            "risks": rule_risks,
+        })
+
+
+    by_persona = {}
+    failed = []
+    found = asyncio.Queue()
+    outcomes = _iter_persona_passes(
+        personas, file_context, document_hash, analysis_mode, documents,
+        on_risk=lambda key, risk: found.put_nowait((key, risk)),
+    )
+    async for kind, item in _with_early_risks(outcomes, found):
+        if kind == "risk":
+            key, risk = item
+            # Provisional: the pass's persona_result is authoritative.
+            yield _event("persona_risk", {"persona": key, "risk": {**risk, "persona": key}})
+            continue
+
+        key, persona_risks, failure = item
+        if failure:
+            failed.append(failure)
+            yield _event("persona_failed", failure)
+            continue
+
+        # The pass replaces the rule hits on every clause it read.
+        persona_risks = [dict(r) for r in standing_rule_risks(rule_risks, key, skipped)] + persona_risks
+        by_persona[key] = persona_risks
+        yield _event("persona_result", {"persona": key, "risks": persona_risks})
+
+        received = [dict(r) for p in personas for r in by_persona.get(p, [])]
+        partial = score_risks(merge_duplicate_risks(received))
+        yield _event("partial_score", {
+            "personas_done": [p for p in personas if p in by_persona],
+            "total_risk_score": partial["total_risk_score"],
+            "irreversible_risks": partial["irreversible_risks"],
+            "critical_risks": partial["critical_risks"],
+        })
+
+    risks = [r for p in personas for r in by_persona.get(p, [])]
+    # A persona whose pass failed still contributes its rule hits.
+    risks += [dict(r) for r in rule_risks if r["persona"] not in by_persona]
 
     if not risks:
-        return {
+        if failed:
+            yield _event("result", {
+                "status": "INFO",
+                "message": (
+                    "The analysis could not be completed for every persona. "
+                    "Please try again."
+                ),
+                "personas_failed": failed
+            })
+            return
+        yield _event("result", {
             "status": "INFO",
             "message": (
                 "No clear risk clauses were detected. "
                 "This does NOT guarantee safety and may indicate limited or informal content."
             )
-        }
-
-    scoring = score_risks(risks)
-
-    return {
+        })
+        return
+
+    with span("dedup"):
+        merged = merge_duplicate_risks(risks)
+    with span("scoring"):
+        scoring = score_risks(merged)
+    for risk in scoring["scored_risks"]:
+        # Only offsets into this text: drop any the risk brought along.
+        risk.pop("location", None)
+        location = compaction.locate(risk.get("clause"))
+        if location is not None:
+            risk["location"] = {"start": location[0], "end": location[1]}
+
+    yield _event("result", {
         "status": "RISK_ANALYSIS",
         "personas_used": personas,
+        "personas_failed": failed,
+        "analysis_mode": analysis_mode,
+        "rule_hits": len(rule_risks),
+        "duplicates_merged": len(risks) - len(merged),
+        "compaction": {
+            **compaction.stats(),
+            "budget_tokens": PROMPT_TOKEN_BUDGET,
+            "decision": "chunk" if len(file_context) > CHUNK_CHARS else "fits",
+        },
         "risk_analysis": scoring
-    }
+    })
+
+
+async def run_clauseguard_consensus_async(
+    user_query: str,
+    file_context: str,
+    persona_mode: Optional[str] = "auto",
+    conversation_id: Optional[str] = None,
+    document_hash: Optional[str] = None,
+    analysis_mode: str = ANALYSIS_FANOUT
+):
+    """
+    Runs the consensus engine and returns only the final response.
+    """
+    result = None
+    async for event in stream_clauseguard_consensus(
+        user_query, file_context, persona_mode, conversation_id, document_hash,
+        analysis_mode
+    ):
+        if event["event"] == "result":
+            result = event["data"]
+    return result
+
+
+def run_clauseguard_consensus(
+    user_query: str,
+    file_context: str,
+    persona_mode: Optional[str] = "auto",
+    conversation_id: Optional[str] = None,
+    analysis_mode: str = ANALYSIS_FANOUT
+):
+    """
+    Blocking wrapper around run_clauseguard_consensus_async for scripts
+    and other callers that are not running an event loop.
+    """
+    return asyncio.run(
+        run_clauseguard_consensus_async(
+            user_query, file_context, persona_mode, conversation_id,
+            analysis_mode=analysis_mode
+        )
+    )
 
 # ==================================================
 # ENTRY POINT
 # ==================================================
 
-root_agent = clause_guard
\ No newline at end of file
+root_agent = clause_guard
@@ -0,0 +1,252 @@
+"""
+Analysis Cache for ClauseGuard
+
+Responsibility:
+- Remember model outputs for identical (document, persona, prompt, model) inputs
+- Bound memory with LRU + TTL eviction
+- Optionally persist entries to SQLite so they survive restarts
+- Collapse identical concurrent requests into a single model call
+"""
+
+import asyncio
+import contextvars
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Optional
+
+from guardian.scheduler import (
+    SchedulerRejected,
+    SharedPriority,
+    call_priority,
+    current_priority,
+    shared_priority,
+)
+
+CACHE_MAX_ENTRIES = int(os.getenv("CLAUSEGUARD_CACHE_SIZE", "512"))
+CACHE_TTL_SECONDS = float(os.getenv("CLAUSEGUARD_CACHE_TTL", str(24 * 3600)))
+CACHE_DB_PATH = os.getenv("CLAUSEGUARD_CACHE_DB")  # unset = memory only
+
+
+# Set to True in a task whose model calls are optional (e.g. speculative
+# prefetch). Work requested only by such tasks is cancelled when they are;
+# as soon as a regular caller joins, it runs to completion.
+abandonable_loads = contextvars.ContextVar("clauseguard_abandonable_loads", default=False)
+
+
+class _Flight:
+    """An in-flight load shared by every caller of one key."""
+
+    def __init__(self, task: asyncio.Future, priority: SharedPriority):
+        self.task = task
+        self.priority = priority
+        self.waiters = 0
+        self.keep = False
+
+
+def make_cache_key(
+    kind: str,
+    document_hash: str,
+    persona: str,
+    prompt_version: str,
+    model: str,
+) -> str:
+    """
+    Builds the cache key for one model call.
+
+    kind distinguishes call types that share a document (e.g. "persona"
+    vs "summary"); persona is "-" when the call is persona-independent.
+    """
+    return "|".join([kind, document_hash, persona, prompt_version, model])
+
+
+class AnalysisCache:
+    """
+    Two-tier (memory, optional SQLite) cache with single-flight loading.
+
+    Values must be JSON-serializable.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = CACHE_MAX_ENTRIES,
+        ttl_seconds: float = CACHE_TTL_SECONDS,
+        db_path: Optional[str] = CACHE_DB_PATH,
+    ):
+        self.max_entries = max(max_entries, 1)
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple[float, Any]]" = OrderedDict()
+        self._inflight: dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+        self._counters = {
+            "hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "abandoned": 0,
+            "evictions": 0,
+            "expirations": 0,
+        }
+
+        self._db = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS analysis_cache ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    # ---------- lookup ----------
+
+    def get(self, key: str, default: Any = None) -> Any:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                created, value = entry
+                if now - created <= self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    self._counters["hits"] += 1
+                    return value
+                del self._entries[key]
+                self._counters["expirations"] += 1
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, created FROM analysis_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    value, created = json.loads(row[0]), row[1]
+                    if now - created <= self.ttl_seconds:
+                        self._store(key, value, created)
+                        self._counters["disk_hits"] += 1
+                        return value
+                    self._db.execute("DELETE FROM analysis_cache WHERE key = ?", (key,))
+                    self._db.commit()
+                    self._counters["expirations"] += 1
+
+            self._counters["misses"] += 1
+            return default
+
+    def set(self, key: str, value: Any) -> None:
+        created = time.time()
+        with self._lock:
+            self._store(key, value, created)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO analysis_cache (key, value, created) "
+                    "VALUES (?, ?, ?)",
+                    (key, json.dumps(value), created),
+                )
+                self._db.commit()
+
+    def _store(self, key: str, value: Any, created: float) -> None:
+        self._entries[key] = (created, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    # ---------- single flight ----------
+
+    async def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+        should_cache: Callable[[Any], bool] = lambda value: True,
+    ) -> Any:
+        """
+        Returns the cached value for key, or runs compute() once.
+
+        Concurrent callers with the same key share one in-flight call. The
+        call runs in its own task, so a caller that times out or is
+        cancelled does not abort the work for the others, and the result
+        still lands in the cache.
+
+        The exception is work only abandonable callers asked for (see
+        abandonable_loads): once the last of them is cancelled, the call
+        itself is cancelled too.
+
+        The load's model calls run at the most urgent priority among its
+        callers: an interactive request joining a speculative or batch
+        load promotes it. If the scheduler refused the load at the
+        priority it started with, a more urgent caller runs it again at
+        its own.
+        """
+        missing = object()
+        value = self.get(key, missing)
+        if value is not missing:
+            return value
+
+        priority = current_priority()
+        flight = self._inflight.get(key)
+        if flight is not None:
+            with self._lock:
+                self._counters["coalesced"] += 1
+            flight.priority.promote(priority)
+        else:
+            shared = SharedPriority(call_priority.get(), shared_priority.get())
+
+            async def _load():
+                shared_priority.set(shared)
+                try:
+                    result = await compute()
+                    if should_cache(result):
+                        self.set(key, result)
+                    return result
+                finally:
+                    self._inflight.pop(key, None)
+
+            flight = _Flight(asyncio.ensure_future(_load()), shared)
+            self._inflight[key] = flight
+
+        if not abandonable_loads.get():
+            flight.keep = True
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        except SchedulerRejected:
+            if priority < flight.priority.initial:
+                return await self.get_or_compute(key, compute, should_cache)
+            raise
+        except asyncio.CancelledError:
+            if flight.waiters == 1 and not flight.keep and not flight.task.done():
+                flight.task.cancel()
+                with self._lock:
+                    self._counters["abandoned"] += 1
+            raise
+        finally:
+            flight.waiters -= 1
+
+    # ---------- introspection ----------
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+            size = len(self._entries)
+        lookups = counters["hits"] + counters["disk_hits"] + counters["misses"]
+        return {
+            **counters,
+            "size": size,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "inflight": len(self._inflight),
+            "persistent": self._db is not None,
+            "hit_rate": round(
+                (counters["hits"] + counters["disk_hits"]) / lookups, 4
+            ) if lookups else 0.0,
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM analysis_cache")
+                self._db.commit()
+
+
+analysis_cache = AnalysisCache()
@@ -0,0 +1,450 @@
+"""
+Batch Analysis for ClauseGuard
+
+Responsibility:
+- Accept many documents as one job and hand back a job id
+- Run them on a small worker pool, so a large batch cannot flood the model
+- Persist jobs, progress and per-document results in SQLite, and resume
+  unfinished work after a restart
+- Publish per-document progress to pollers and streaming subscribers
+- Keep SQLite work off the event loop, and put a document the scheduler
+  refused back in the queue instead of failing it
+"""
+
+import os
+import json
+import time
+import uuid
+import asyncio
+import sqlite3
+import threading
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+from guardian import agent
+from guardian.risk_index import risk_index
+from guardian.scheduler import PRIORITY_BATCH, SchedulerRejected, call_priority
+
+BATCH_DB_PATH = os.getenv(
+    "CLAUSEGUARD_BATCH_DB",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "clauseguard_batch.db"),
+)
+# Documents analyzed at once across all jobs.
+BATCH_WORKERS = int(os.getenv("CLAUSEGUARD_BATCH_WORKERS", "4"))
+BATCH_MAX_DOCUMENTS = int(os.getenv("CLAUSEGUARD_BATCH_MAX_DOCUMENTS", "500"))
+
+# Batches cannot stop to ask for a persona selection, so "auto" is not
+# accepted; the default reviews every document with all personas.
+BATCH_PERSONA_MODES = {"legal", "financial", "insurance", "compliance", "full"}
+# Must classify as a risk analysis: "what are the risks"-style wording
+# reads as a follow-up question.
+BATCH_DEFAULT_CONTEXT = "Review this contract before signing."
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+
+ITEM_QUEUED = "queued"
+ITEM_RUNNING = "running"
+ITEM_DONE = "done"
+ITEM_FAILED = "failed"
+
+
+async def _analyze_document(
+    context: str, content: str, document_hash: Optional[str],
+    persona_mode: str, analysis_mode: str,
+) -> dict:
+    return await agent.run_clauseguard_consensus_async(
+        user_query=context,
+        file_context=content,
+        persona_mode=persona_mode,
+        document_hash=document_hash,
+        analysis_mode=analysis_mode,
+    )
+
+
+def _summarize(result: Optional[dict]) -> dict:
+    """The headline numbers of one document's result, for progress views."""
+    if not result:
+        return {}
+    scoring = result.get("risk_analysis") or {}
+    return {
+        "result_status": result.get("status"),
+        "verdict": scoring.get("verdict"),
+        "total_risk_score": scoring.get("total_risk_score"),
+        "critical_risks": scoring.get("critical_risks"),
+        "irreversible_risks": scoring.get("irreversible_risks"),
+    }
+
+
+class BatchQueue:
+    """
+    SQLite-backed job queue drained by a fixed pool of asyncio workers.
+
+    Document text is copied into the database at submission, so queued
+    work survives both a restart and eviction from the document store.
+    """
+
+    def __init__(
+        self,
+        db_path: str = BATCH_DB_PATH,
+        workers: int = BATCH_WORKERS,
+        analyze: Callable[..., Awaitable[dict]] = _analyze_document,
+    ):
+        self.workers = max(workers, 1)
+        self._analyze = analyze
+        self._lock = threading.Lock()
+        self.db_path = db_path
+        self._connection: Optional[sqlite3.Connection] = None
+        self._open_lock = threading.Lock()
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._retries: Set[asyncio.TimerHandle] = set()
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+
+    @property
+    def _db(self) -> sqlite3.Connection:
+        """The job database, opened (and created) on first use."""
+        if self._connection is None:
+            with self._open_lock:
+                if self._connection is None:
+                    db = sqlite3.connect(self.db_path, check_same_thread=False)
+                    db.executescript(
+                        "CREATE TABLE IF NOT EXISTS batch_jobs ("
+                        " job_id TEXT PRIMARY KEY, status TEXT NOT NULL,"
+                        " context TEXT NOT NULL, persona_mode TEXT NOT NULL,"
+                        " analysis_mode TEXT NOT NULL, total INTEGER NOT NULL,"
+                        " created REAL NOT NULL, finished REAL);"
+                        "CREATE TABLE IF NOT EXISTS batch_items ("
+                        " job_id TEXT NOT NULL, position INTEGER NOT NULL,"
+                        " document_id TEXT, filename TEXT, content TEXT NOT NULL,"
+                        " content_hash TEXT, status TEXT NOT NULL, result TEXT, error TEXT,"
+                        " started REAL, finished REAL, PRIMARY KEY (job_id, position));"
+                    )
+                    db.commit()
+                    self._connection = db
+        return self._connection
+
+    # ---------- lifecycle ----------
+
+    async def start(self) -> int:
+        """
+        Starts the workers and re-queues every unfinished document,
+        including ones that were running when the process stopped.
+        Returns the number of documents resumed.
+        """
+        if self._tasks:
+            return 0
+        self._queue = asyncio.Queue()
+        pending = await asyncio.to_thread(self._unfinished)
+        for job_id, position in pending:
+            self._queue.put_nowait((job_id, position))
+        self._tasks = [
+            asyncio.ensure_future(self._worker()) for _ in range(self.workers)
+        ]
+        return len(pending)
+
+    async def stop(self) -> None:
+        """Stops the workers; running documents are resumed on the next start."""
+        for handle in self._retries:
+            handle.cancel()
+        self._retries.clear()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def _unfinished(self) -> list:
+        """Marks running documents queued again; returns every queued one."""
+        with self._lock:
+            self._db.execute(
+                "UPDATE batch_items SET status = ?, started = NULL WHERE status = ?",
+                (ITEM_QUEUED, ITEM_RUNNING),
+            )
+            self._db.commit()
+            return self._db.execute(
+                "SELECT i.job_id, i.position FROM batch_items i"
+                " JOIN batch_jobs j ON j.job_id = i.job_id"
+                " WHERE i.status = ? ORDER BY j.created, i.position",
+                (ITEM_QUEUED,),
+            ).fetchall()
+
+    # ---------- submission ----------
+
+    async def submit(
+        self,
+        documents: List[dict],
+        context: str = BATCH_DEFAULT_CONTEXT,
+        persona_mode: str = "full",
+        analysis_mode: str = agent.ANALYSIS_FANOUT,
+    ) -> dict:
+        """
+        Queues a job. documents are dicts with "content" and optionally
+        "content_hash", "document_id" and "filename".
+        """
+        if not documents:
+            raise ValueError("A batch needs at least one document.")
+        if len(documents) > BATCH_MAX_DOCUMENTS:
+            raise ValueError(f"A batch may hold at most {BATCH_MAX_DOCUMENTS} documents.")
+        if persona_mode not in BATCH_PERSONA_MODES:
+            raise ValueError(
+                f"persona_mode must be one of {sorted(BATCH_PERSONA_MODES)} for batches."
+            )
+        if analysis_mode not in agent.ANALYSIS_MODES:
+            raise ValueError(f"analysis_mode must be one of {list(agent.ANALYSIS_MODES)}.")
+
+        job_id = uuid.uuid4().hex
+        await asyncio.to_thread(
+            self._insert_job, job_id, documents, context, persona_mode, analysis_mode
+        )
+        if self._queue is not None:
+            for position in range(len(documents)):
+                self._queue.put_nowait((job_id, position))
+        return await asyncio.to_thread(self.job, job_id)
+
+    def _insert_job(
+        self, job_id: str, documents: List[dict], context: str,
+        persona_mode: str, analysis_mode: str,
+    ) -> None:
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO batch_jobs (job_id, status, context, persona_mode,"
+                " analysis_mode, total, created) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, JOB_QUEUED, context, persona_mode, analysis_mode,
+                 len(documents), time.time()),
+            )
+            self._db.executemany(
+                "INSERT INTO batch_items (job_id, position, document_id, filename,"
+                " content, content_hash, status) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (job_id, position, d.get("document_id"), d.get("filename"),
+                     d["content"], d.get("content_hash"), ITEM_QUEUED)
+                    for position, d in enumerate(documents)
+                ],
+            )
+            self._db.commit()
+
+    # ---------- workers ----------
+
+    async def _worker(self) -> None:
+        # Interactive requests are served ahead of batch model calls.
+        call_priority.set(PRIORITY_BATCH)
+        while True:
+            job_id, position = await self._queue.get()
+            try:
+                await self._run_item(job_id, position)
+            except Exception as e:
+                print(f"[Batch Error] {job_id}/{position}: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _run_item(self, job_id: str, position: int) -> None:
+        claimed = await asyncio.to_thread(self._claim, job_id, position)
+        if claimed is None:
+            return
+        (context, persona_mode, analysis_mode), item = claimed
+        content, document_hash, _, document_id, filename = item
+        result, error = None, None
+        try:
+            result = await self._analyze(
+                context, content, document_hash, persona_mode, analysis_mode
+            )
+        except asyncio.CancelledError:
+            raise
+        except SchedulerRejected as e:
+            # Not the document's fault: it runs again once the scheduler
+            # accepts work (batch calls are the first to be shed).
+            print(f"[Batch Retry] {job_id}/{position}: {e} Retrying in {e.retry_after:.0f}s")
+            await asyncio.to_thread(self._requeue, job_id, position)
+            self._retry_later(job_id, position, e.retry_after)
+            return
+        except Exception as e:
+            print(f"[Batch Item Error] {job_id}/{position}: {e}")
+            error = str(e)
+        if result is not None:
+            try:
+                await asyncio.to_thread(
+                    risk_index.record, result, content, document_hash, document_id, filename
+                )
+            except Exception as e:
+                print(f"[Risk Index Error] {job_id}/{position}: {e}")
+
+        status = ITEM_FAILED if error else ITEM_DONE
+        await asyncio.to_thread(self._store_result, job_id, position, status, result, error)
+        progress = await asyncio.to_thread(self._finish_job_if_done, job_id)
+
+        self._publish(job_id, {
+            "event": "item",
+            "data": {"position": position, "status": status, "error": error, **_summarize(result)},
+        })
+        self._publish(job_id, {"event": "progress", "data": progress})
+        if progress["status"] == JOB_COMPLETED:
+            self._publish(job_id, None)
+
+    def _claim(self, job_id: str, position: int) -> Optional[tuple]:
+        """Marks a queued document running; returns (job row, item row) or None."""
+        with self._lock:
+            job = self._db.execute(
+                "SELECT context, persona_mode, analysis_mode FROM batch_jobs"
+                " WHERE job_id = ?", (job_id,),
+            ).fetchone()
+            item = self._db.execute(
+                "SELECT content, content_hash, status, document_id, filename FROM batch_items"
+                " WHERE job_id = ? AND position = ?", (job_id, position),
+            ).fetchone()
+            if job is None or item is None or item[2] != ITEM_QUEUED:
+                return
+            self._db.execute(
+                "UPDATE batch_items SET status = ?, started = ?"
+                " WHERE job_id = ? AND position = ?",
+                (ITEM_RUNNING, time.time(), job_id, position),
+            )
+            self._db.execute(
+                "UPDATE batch_jobs SET status = ? WHERE job_id = ? AND status = ?",
+                (JOB_RUNNING, job_id, JOB_QUEUED),
+            )
+            self._db.commit()
+        return job, item
+
+    def _requeue(self, job_id: str, position: int) -> None:
+        with self._lock:
+            self._db.execute(
+                "UPDATE batch_items SET status = ?, started = NULL"
+                " WHERE job_id = ? AND position = ?",
+                (ITEM_QUEUED, job_id, position),
+            )
+            self._db.commit()
+
+    def _retry_later(self, job_id: str, position: int, delay: float) -> None:
+        def _enqueue() -> None:
+            self._retries.discard(handle)
+            self._queue.put_nowait((job_id, position))
+
+        handle = asyncio.get_running_loop().call_later(max(delay, 0.0), _enqueue)
+        self._retries.add(handle)
+
+    def _store_result(
+        self, job_id: str, position: int, status: str,
+        result: Optional[dict], error: Optional[str],
+    ) -> None:
+        with self._lock:
+            self._db.execute(
+                "UPDATE batch_items SET status = ?, result = ?, error = ?, finished = ?"
+                " WHERE job_id = ? AND position = ?",
+                (status, json.dumps(result) if result is not None else None,
+                 error, time.time(), job_id, position),
+            )
+            self._db.commit()
+
+    def _finish_job_if_done(self, job_id: str) -> dict:
+        with self._lock:
+            progress = self._progress(job_id)
+            if progress["done"] + progress["failed"] == progress["total"]:
+                self._db.execute(
+                    "UPDATE batch_jobs SET status = ?, finished = ? WHERE job_id = ?",
+                    (JOB_COMPLETED, time.time(), job_id),
+                )
+                self._db.commit()
+                progress["status"] = JOB_COMPLETED
+            return progress
+
+    # ---------- progress ----------
+
+    def _progress(self, job_id: str) -> Optional[dict]:
+        row = self._db.execute(
+            "SELECT status, total, created, finished FROM batch_jobs WHERE job_id = ?",
+            (job_id,),
+        ).fetchone()
+        if row is None:
+            return None
+        counts = dict(self._db.execute(
+            "SELECT status, COUNT(*) FROM batch_items WHERE job_id = ? GROUP BY status",
+            (job_id,),
+        ).fetchall())
+        return {
+            "job_id": job_id,
+            "status": row[0],
+            "total": row[1],
+            "queued": counts.get(ITEM_QUEUED, 0),
+            "running": counts.get(ITEM_RUNNING, 0),
+            "done": counts.get(ITEM_DONE, 0),
+            "failed": counts.get(ITEM_FAILED, 0),
+            "created": row[2],
+            "finished": row[3],
+        }
+
+    def job(self, job_id: str, include_results: bool = False) -> Optional[dict]:
+        """
+        Progress of a job and the status of each document; full per-document
+        results only when include_results is set.
+        """
+        with self._lock:
+            progress = self._progress(job_id)
+            if progress is None:
+                return None
+            rows = self._db.execute(
+                "SELECT position, document_id, filename, status, result, error"
+                " FROM batch_items WHERE job_id = ? ORDER BY position",
+                (job_id,),
+            ).fetchall()
+
+        items = []
+        for position, document_id, filename, status, result, error in rows:
+            result = json.loads(result) if result else None
+            item = {
+                "position": position,
+                "document_id": document_id,
+                "filename": filename,
+                "status": status,
+                "error": error,
+                **_summarize(result),
+            }
+            if include_results:
+                item["result"] = result
+            items.append(item)
+        return {**progress, "documents": items}
+
+    def _publish(self, job_id: str, event: Optional[dict]) -> None:
+        for queue in self._subscribers.get(job_id, ()):
+            queue.put_nowait(event)
+
+    async def events(self, job_id: str):
+        """
+        Yields progress events for a job until it completes: first a
+        snapshot, then one "item" and one "progress" event per finished
+        document.
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers.setdefault(job_id, set()).add(queue)
+        try:
+            snapshot = await asyncio.to_thread(self.job, job_id)
+            if snapshot is None:
+                return
+            yield {"event": "snapshot", "data": snapshot}
+            if snapshot["status"] == JOB_COMPLETED:
+                return
+            while True:
+                event = await queue.get()
+                if event is None:
+                    return
+                yield event
+        finally:
+            subscribers = self._subscribers.get(job_id)
+            if subscribers is not None:
+                subscribers.discard(queue)
+                if not subscribers:
+                    del self._subscribers[job_id]
+
+    def stats(self) -> dict:
+        with self._lock:
+            jobs = dict(self._db.execute(
+                "SELECT status, COUNT(*) FROM batch_jobs GROUP BY status"
+            ).fetchall())
+        return {
+            "jobs": jobs,
+            "queued_documents": self._queue.qsize() if self._queue else 0,
+            "workers": self.workers,
+            "running": bool(self._tasks),
+        }
+
+
+batch_queue = BatchQueue()
@@ -0,0 +1,367 @@
+"""
+Document Compaction for ClauseGuard
+
+Responsibility:
+- Strip extraction boilerplate before a document is put into prompts:
+  repeated page headers/footers, page numbers, hyphenated line breaks,
+  runs of whitespace and blank lines, duplicated signature blocks
+- Keep a map from compacted offsets back to the original text, so quoted
+  clauses can still be located in what the user uploaded
+- Report token estimates before and after
+- Fit a document into the per-prompt token budget by a deliberate
+  truncation (at a clause boundary) instead of an oversized call
+"""
+
+import os
+import re
+from bisect import bisect_right
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+from guardian.document_ingestion import normalize_text
+from guardian.scheduler import CHARS_PER_TOKEN, estimate_tokens
+from guardian.segmentation import segment_clauses
+
+# Upper bound on the estimated tokens of a single prompt, instructions
+# included. Documents over the remainder are chunked or truncated.
+PROMPT_TOKEN_BUDGET = int(os.getenv("CLAUSEGUARD_PROMPT_TOKEN_BUDGET", "100000"))
+# Room kept for the prompt template and persona instructions.
+PROMPT_OVERHEAD_TOKENS = 2000
+
+# A short line seen this often at the top or bottom of a page is a
+# running header or footer.
+_REPEAT_MIN = 3
+_MAX_HEADER_CHARS = 100
+# Lines at each end of a page that may be header/footer.
+_EDGE_LINES = 2
+
+_PAGE_TOKEN = re.compile(r"\bpage\s+\d+(?:\s*(?:of|/)\s*\d+)?\b", re.IGNORECASE)
+_PAGE_NUMBER_LINE = re.compile(
+    r"^\s*(?:page\s+\d+(?:\s*(?:of|/)\s*\d+)?|-\s*\d+\s*-|\d+\s*(?:of|/)\s*\d+|\d{1,4})\s*$",
+    re.IGNORECASE,
+)
+_BARE_NUMBER = re.compile(r"^\s*\d{1,4}\s*$")
+_SIGNATURE = re.compile(
+    r"_{4,}|in witness whereof|^\s*(?:signature|signed|by|name|title|date)\s*:",
+    re.IGNORECASE | re.MULTILINE,
+)
+_INNER_SPACES = re.compile(r"[ \t]{2,}")
+_HYPHENATED = re.compile(r"[a-z]-$")
+
+
+def document_budget_tokens(budget_tokens: int = PROMPT_TOKEN_BUDGET) -> int:
+    """Tokens left for the document itself in a prompt of budget_tokens."""
+    return max(budget_tokens - PROMPT_OVERHEAD_TOKENS, 1)
+
+
+def document_budget_chars(budget_tokens: int = PROMPT_TOKEN_BUDGET) -> int:
+    return document_budget_tokens(budget_tokens) * CHARS_PER_TOKEN
+
+
+# ==================================================
+# OFFSET MAP
+# ==================================================
+
+class OffsetMap:
+    """
+    Piecewise map from compacted offsets to original offsets: each piece
+    of the compacted text starts at a recorded original position.
+    """
+
+    def __init__(self):
+        self._compact: List[int] = []
+        self._original: List[int] = []
+
+    def add(self, compact_start: int, original_start: int) -> None:
+        self._compact.append(compact_start)
+        self._original.append(original_start)
+
+    def to_original(self, offset: int) -> int:
+        i = bisect_right(self._compact, offset) - 1
+        if i < 0:
+            return offset
+        return self._original[i] + (offset - self._compact[i])
+
+
+class Compaction:
+    """The compacted text of a document, its offset map and statistics."""
+
+    def __init__(self, original: str, text: str, offsets: OffsetMap, removed: dict):
+        self.text = text
+        self.offsets = offsets
+        self.removed = removed
+        self.original_length = len(original)
+        self.tokens_before = estimate_tokens(original)
+
+    def stats(self) -> dict:
+        return {
+            "chars_before": self.original_length,
+            "chars_after": len(self.text),
+            "tokens_before": self.tokens_before,
+            "tokens_after": estimate_tokens(self.text),
+            "removed": dict(self.removed),
+        }
+
+    def original_span(self, start: int, end: int) -> Tuple[int, int]:
+        """Original offsets of the compacted range [start, end)."""
+        if end <= start:
+            position = self.offsets.to_original(start)
+            return position, position
+        return self.offsets.to_original(start), self.offsets.to_original(end - 1) + 1
+
+    def locate(self, quote: str) -> Optional[Tuple[int, int]]:
+        """
+        Original (start, end) of a quote taken from the compacted text, or
+        None if it is not found. Differences in whitespace are tolerated.
+        """
+        if not isinstance(quote, str) or not quote.strip():
+            return None
+        found = self.text.find(quote.strip())
+        if found != -1:
+            return self.original_span(found, found + len(quote.strip()))
+        words = normalize_text(quote).split(" ")
+        match = re.search(r"\s+".join(re.escape(w) for w in words), self.text, re.IGNORECASE)
+        if match is None:
+            return None
+        return self.original_span(match.start(), match.end())
+
+
+# ==================================================
+# COMPACTION
+# ==================================================
+
+def _lines(text: str) -> List[Tuple[int, int, str]]:
+    """(start, end, line) for every line; end excludes the newline."""
+    lines = []
+    start = 0
+    for line in text.split("\n"):
+        lines.append((start, start + len(line), line))
+        start += len(line) + 1
+    return lines
+
+
+def _paragraphs(lines) -> List[List[int]]:
+    """Indexes of the lines of each blank-line separated paragraph."""
+    paragraphs, current = [], []
+    for i, (_, _, line) in enumerate(lines):
+        if line.strip():
+            current.append(i)
+        elif current:
+            paragraphs.append(current)
+            current = []
+    if current:
+        paragraphs.append(current)
+    return paragraphs
+
+
+def _page_edges(lines, page_numbers: set, skip: set) -> set:
+    """
+    Indexes of the first and last _EDGE_LINES non-blank lines of every
+    page. Pages are separated by page-number lines and form feeds; text
+    with neither is one page.
+    """
+    # (last line of the page before, first line of the page after)
+    boundaries = [(None, 0), (len(lines) - 1, None)]
+    for i, (_, _, line) in enumerate(lines):
+        if i in page_numbers:
+            boundaries.append((i - 1, i + 1))
+        elif "\f" in line:
+            boundaries.append((i - 1, i))
+
+    edges = set()
+
+    def walk(i: Optional[int], step: int) -> None:
+        found = 0
+        while i is not None and 0 <= i < len(lines) and found < _EDGE_LINES:
+            if i in page_numbers:
+                break
+            if lines[i][2].strip() and i not in skip:
+                edges.add(i)
+                found += 1
+            i += step
+
+    for before, after in boundaries:
+        walk(before, -1)
+        walk(after, 1)
+    return edges
+
+
+def _boilerplate(lines) -> Tuple[dict, dict]:
+    """
+    Returns ({line_index: reason} for lines to drop, counts by reason).
+    Drops never remove most of the document: text that repeats that much
+    is content, not page furniture, so headers/footers are kept then (and
+    everything, if page numbers alone would be the majority).
+    """
+    drop = {}
+    signature_lines = set()
+    seen_signatures = set()
+    for paragraph in _paragraphs(lines):
+        block = "\n".join(lines[i][2] for i in paragraph)
+        if not _SIGNATURE.search(block):
+            continue
+        signature_lines.update(paragraph)
+        key = normalize_text(block).lower()
+        if key in seen_signatures:
+            for i in paragraph:
+                drop[i] = "signature_blocks"
+        seen_signatures.add(key)
+
+    bare_numbers = sum(1 for _, _, line in lines if _BARE_NUMBER.match(line))
+    page_numbers = set()
+    for i, (_, _, line) in enumerate(lines):
+        stripped = line.strip()
+        if not stripped or i in drop or i in signature_lines:
+            continue
+        if _PAGE_NUMBER_LINE.match(stripped) and (
+            not _BARE_NUMBER.match(stripped) or bare_numbers >= _REPEAT_MIN
+        ):
+            drop[i] = "page_numbers"
+            page_numbers.add(i)
+
+    repeats = {}
+    for i in sorted(_page_edges(lines, page_numbers, set(drop))):
+        stripped = lines[i][2].strip()
+        if i in signature_lines or len(stripped) > _MAX_HEADER_CHARS:
+            continue
+        key = _PAGE_TOKEN.sub("#", normalize_text(stripped).lower())
+        repeats.setdefault(key, []).append(i)
+    for occurrences in repeats.values():
+        if len(occurrences) >= _REPEAT_MIN:
+            for i in occurrences:
+                drop[i] = "headers_footers"
+
+    content_lines = sum(1 for _, _, line in lines if line.strip())
+    if 2 * len(drop) > content_lines:
+        drop = {i: reason for i, reason in drop.items() if reason != "headers_footers"}
+        if 2 * len(drop) > content_lines:
+            drop = {}
+
+    counts = {}
+    for reason in drop.values():
+        counts[reason] = counts.get(reason, 0) + 1
+    return drop, counts
+
+
+def _compact(text: str) -> Compaction:
+    lines = _lines(text)
+    drop, counts = _boilerplate(lines)
+    removed = {
+        "headers_footers": 0, "page_numbers": 0, "signature_blocks": 0,
+        "hyphenations": 0, "whitespace_runs": 0, "blank_lines": 0,
+        **counts,
+    }
+    out: List[str] = []
+    offsets = OffsetMap()
+    length = 0
+
+    def emit(piece: str, original_start: int) -> None:
+        nonlocal length
+        if piece:
+            offsets.add(length, original_start)
+            out.append(piece)
+            length += len(piece)
+
+    previous_blank = True   # no blank lines at the start
+    joined_from = None      # original offset to resume at after a hyphen join
+    i = 0
+    while i < len(lines):
+        start, end, line = lines[i]
+        if i in drop:
+            i += 1
+            continue
+        if joined_from is not None:
+            start, line, joined_from = joined_from, text[joined_from:end], None
+        elif not line.strip():
+            if previous_blank:
+                removed["blank_lines"] += 1
+            else:
+                emit("\n", end)
+                previous_blank = True
+            i += 1
+            continue
+
+        # Join "indemni-" + "fication", skipping page furniture in between.
+        following = i + 1
+        while following < len(lines) and (following in drop or not lines[following][2].strip()):
+            following += 1
+        hyphenated = (
+            following < len(lines)
+            and _HYPHENATED.search(line.rstrip())
+            and lines[following][2].lstrip()[:1].islower()
+        )
+        if hyphenated:
+            line = line.rstrip()[:-1]
+            removed["hyphenations"] += 1
+
+        # Collapse inner runs of spaces, keeping the leading indent.
+        indent = len(line) - len(line.lstrip(" \t"))
+        if indent:
+            emit(line[:indent], start)
+        cursor = indent
+        for match in _INNER_SPACES.finditer(line, indent):
+            emit(line[cursor:match.start()], start + cursor)
+            emit(" ", start + match.start())
+            cursor = match.end()
+            removed["whitespace_runs"] += 1
+        emit(line[cursor:].rstrip(), start + cursor)
+
+        if hyphenated:
+            next_start, _, next_line = lines[following]
+            joined_from = next_start + len(next_line) - len(next_line.lstrip())
+            i = following
+            continue
+        previous_blank = False
+        if i + 1 < len(lines):
+            emit("\n", end)
+        i += 1
+
+    # Only trailing whitespace is stripped; a leading cut would shift offsets.
+    return Compaction(text, "".join(out).rstrip(), offsets, removed)
+
+
+@lru_cache(maxsize=32)
+def compact_document(text: str) -> Compaction:
+    """
+    Compacted form of a document. Cached, since every prompt built for the
+    same document text compacts it again.
+    """
+    return _compact(text or "")
+
+
+# ==================================================
+# TOKEN BUDGET
+# ==================================================
+
+def fit_to_budget(text: str, budget_tokens: int = PROMPT_TOKEN_BUDGET) -> Tuple[str, dict]:
+    """
+    Returns (text, decision) with text cut down to the document share of
+    budget_tokens. The cut falls on the last clause boundary that fits, so
+    no clause is sent half-quoted.
+
+    decision: {"decision": "fits" | "truncate", "tokens": ..., "budget_tokens": ...,
+               "kept_tokens": ...}
+    """
+    budget_chars = document_budget_chars(budget_tokens)
+    decision = {
+        "decision": "fits",
+        "tokens": estimate_tokens(text),
+        "budget_tokens": budget_tokens,
+    }
+    if len(text) <= budget_chars:
+        decision["kept_tokens"] = decision["tokens"]
+        return text, decision
+
+    cut = 0
+    for clause in segment_clauses(text):
+        if clause["end"] > budget_chars:
+            break
+        cut = clause["end"]
+    if cut == 0:
+        # A single clause over the budget: cut it at whitespace.
+        cut = text.rfind(" ", 0, budget_chars)
+        if cut <= 0:
+            cut = budget_chars
+    kept = text[:cut].rstrip()
+    decision.update(decision="truncate", kept_tokens=estimate_tokens(kept))
+    return kept, decision
@@ -0,0 +1,163 @@
+"""
+Cross-persona Risk De-duplication for ClauseGuard
+
+Responsibility:
+- Find risks from different personas that quote the same or a
+  near-identical clause (word shingles, MinHash signatures and LSH
+  banding, so the work stays near-linear in the number of risks)
+- Merge each such group into one risk carrying every contributing
+  persona, the highest severity and irreversibility if any had it
+- Run before score_risks, so one clause is not weighted once per persona
+"""
+
+import os
+import zlib
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from guardian.document_ingestion import normalize_text
+from guardian.risk_scoring import SEVERITY_WEIGHTS
+from guardian.routing import tokenize
+
+# Minimum Jaccard similarity of two quotes' shingle sets for the risks to
+# count as the same finding. Candidates from LSH are always checked
+# against the exact sets.
+DEDUP_SIMILARITY = float(os.getenv("CLAUSEGUARD_DEDUP_SIMILARITY", "0.7"))
+
+SHINGLE_WORDS = 3
+MINHASH_PERMUTATIONS = 64
+# 16 bands of 4 rows: pairs from about 0.5 similarity up become
+# candidates, and a 0.7 pair is missed less than 2% of the time.
+LSH_BANDS = 16
+
+_QUOTE_FIELDS = ("clause", "quote", "clause_text", "text")
+
+# Universal hashing a*x + b mod a Mersenne prime; x is reduced below the
+# prime first so products fit in int64. Seeded: merges are reproducible.
+_PRIME = (1 << 31) - 1
+_rng = np.random.default_rng(20240531)
+_HASH_A = _rng.integers(1, _PRIME, MINHASH_PERMUTATIONS, dtype=np.int64)
+_HASH_B = _rng.integers(0, _PRIME, MINHASH_PERMUTATIONS, dtype=np.int64)
+
+
+def quoted_clause(risk: dict) -> Optional[str]:
+    """The clause text a risk quotes, if it quotes one."""
+    for field in _QUOTE_FIELDS:
+        value = risk.get(field)
+        if isinstance(value, str) and value.strip():
+            return value
+    return None
+
+
+def shingles(text: str) -> frozenset:
+    """Hashed word SHINGLE_WORDS-grams of the normalized text."""
+    tokens = tokenize(normalize_text(text))
+    if len(tokens) < SHINGLE_WORDS:
+        grams = [" ".join(tokens)] if tokens else []
+    else:
+        grams = [" ".join(tokens[i:i + SHINGLE_WORDS]) for i in range(len(tokens) - SHINGLE_WORDS + 1)]
+    return frozenset(zlib.crc32(g.encode("utf-8")) for g in grams)
+
+
+def minhash_signatures(sets: List[frozenset]) -> np.ndarray:
+    """
+    MinHash signature of each (non-empty) shingle set, one row per set,
+    computed for all sets in one pass.
+    """
+    sizes = [len(s) for s in sets]
+    values = np.fromiter((v for s in sets for v in s), dtype=np.int64, count=sum(sizes))
+    hashed = (_HASH_A[:, None] * (values % _PRIME)[None, :] + _HASH_B[:, None]) % _PRIME
+    starts = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+    return np.minimum.reduceat(hashed, starts, axis=1).T
+
+
+def _jaccard(a: frozenset, b: frozenset) -> float:
+    return len(a & b) / len(a | b)
+
+
+def _severity_weight(risk: dict) -> int:
+    severity = risk.get("severity", "LOW")
+    return SEVERITY_WEIGHTS.get(severity, 1) if isinstance(severity, str) else 1
+
+
+def _merge(members: List[dict]) -> dict:
+    """One risk for a group: the most severe member, with every persona."""
+    merged = dict(max(members, key=_severity_weight))
+    personas = []
+    for risk in members:
+        if risk.get("persona") not in personas:
+            personas.append(risk.get("persona"))
+    merged["personas"] = personas
+    merged["merged_risks"] = len(members)
+    if any(risk.get("irreversible") is True for risk in members):
+        merged["irreversible"] = True
+    return merged
+
+
+def merge_duplicate_risks(risks: List[dict], similarity: float = DEDUP_SIMILARITY) -> List[dict]:
+    """
+    Returns risks with cross-persona duplicates merged. A merged risk
+    takes the place of its first member and adds "personas" (in order of
+    appearance) and "merged_risks"; everything else passes through
+    unchanged, in order. A group holds at most one risk per persona (one
+    persona's two findings on a clause stay two), and risks without a
+    quoted clause are left alone.
+    """
+    candidates = []   # indexes of risks with a usable quote
+    sets = []
+    by_quote: Dict[str, frozenset] = {}
+    for i, risk in enumerate(risks):
+        quote = quoted_clause(risk)
+        if quote is None:
+            continue
+        grams = by_quote.get(quote)
+        if grams is None:
+            grams = by_quote[quote] = shingles(quote)
+        if grams:
+            candidates.append(i)
+            sets.append(grams)
+    if len(candidates) < 2:
+        return list(risks)
+
+    signatures = minhash_signatures(sets)
+    rows = MINHASH_PERMUTATIONS // LSH_BANDS
+    parent = list(range(len(candidates)))
+    # Personas in each group, kept on the group's root.
+    personas = [{risks[i].get("persona")} for i in candidates]
+
+    def _root(x: int) -> int:
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    checked = set()
+    for band in range(LSH_BANDS):
+        buckets: Dict[bytes, List[int]] = {}
+        for position, row in enumerate(signatures[:, band * rows:(band + 1) * rows]):
+            buckets.setdefault(row.tobytes(), []).append(position)
+        for bucket in buckets.values():
+            for n, a in enumerate(bucket):
+                for b in bucket[n + 1:]:
+                    if (a, b) in checked:
+                        continue
+                    checked.add((a, b))
+                    root_a, root_b = _root(a), _root(b)
+                    if root_a == root_b or personas[root_a] & personas[root_b]:
+                        continue
+                    if _jaccard(sets[a], sets[b]) >= similarity:
+                        parent[root_b] = root_a
+                        personas[root_a] |= personas[root_b]
+
+    groups: Dict[int, List[int]] = {}
+    for position, index in enumerate(candidates):
+        groups.setdefault(_root(position), []).append(index)
+
+    replaced = {}     # first member index -> merged risk
+    dropped = set()   # indexes folded into an earlier member
+    for members in groups.values():
+        if len(members) > 1:
+            replaced[members[0]] = _merge([risks[i] for i in members])
+            dropped.update(members[1:])
+    return [replaced.get(i, risk) for i, risk in enumerate(risks) if i not in dropped]
@@ -2,14 +2,146 @@
 Document Ingestion Layer for ClauseGuard
 
 Responsibility:
-- Accept raw documents
+- Accept raw documents (text, markdown, PDF)
 - Normalize them into clean text
 - Prepare them for semantic risk analysis
+- Bulk-ingest a directory or archive of contracts in parallel, skipping
+  files a manifest shows as unchanged
 """
 
+import argparse
+import codecs
+import hashlib
+import io
+import json
+import mmap
+import os
+import re
+import sys
+import tarfile
+import unicodedata
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+from guardian.pdf_extraction import MAX_UPLOAD_MB, read_pdf_text
+
+TEXT_EXTENSIONS = {".txt", ".md"}
+SUPPORTED_EXTENSIONS = TEXT_EXTENSIONS | {".pdf"}
+
+# Text files at least this large are memory-mapped and decoded in place
+# instead of being read into a bytes copy first.
+MMAP_THRESHOLD_BYTES = 1024 * 1024
+MAX_FILE_BYTES = int(MAX_UPLOAD_MB * 1024 * 1024)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """
+    Canonical form used for hashing and de-duplication.
+
+    Unicode is NFKC-normalized and every run of whitespace collapses to a
+    single space, so the same contract re-exported with different line
+    breaks or ligatures hashes identically.
+    """
+    text = unicodedata.normalize("NFKC", text or "")
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+_TRAILING_SPACE = re.compile(r"[ \t\f\v]+\n")
+_BLANK_RUNS = re.compile(r"\n{3,}")
+
+
+def normalize_document(text: str) -> str:
+    """
+    Cleans extracted text for storage and prompting.
+
+    Unlike normalize_text this keeps line and paragraph breaks, which
+    carry the clause structure of the document.
+    """
+    text = unicodedata.normalize("NFKC", text or "")
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    text = _TRAILING_SPACE.sub("\n", text)
+    return _BLANK_RUNS.sub("\n\n", text).strip()
+
+
+def content_hash(text: str) -> str:
+    """
+    SHA-256 of the normalized text (hex).
+    """
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+# ==================================================
+# DECODING
+# ==================================================
+
+_BOMS = [
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+]
+_SNIFF_BYTES = 4096
+
+
+def detect_encoding(data) -> List[str]:
+    """
+    Candidate encodings for data (bytes or an mmap), most likely first: a
+    byte-order mark wins, then BOM-less UTF-16 (NUL bytes in every other
+    position), then UTF-8 with the Windows and Latin-1 code pages as
+    fallbacks. Latin-1 decodes anything, so the list always ends in a match.
+    """
+    head = data[:_SNIFF_BYTES]
+    for bom, encoding in _BOMS:
+        if head.startswith(bom):
+            return [encoding]
+    if len(head) >= 2:
+        odd_nuls = head[1::2].count(0)
+        even_nuls = head[0::2].count(0)
+        if odd_nuls > len(head) // 4 and even_nuls == 0:
+            return ["utf-16-le", "latin-1"]
+        if even_nuls > len(head) // 4 and odd_nuls == 0:
+            return ["utf-16-be", "latin-1"]
+    return ["utf-8", "cp1252", "latin-1"]
+
+
+def decode_text(data) -> Tuple[str, str]:
+    """Returns (text, encoding) using the first candidate that decodes."""
+    candidates = detect_encoding(data)
+    for encoding in candidates[:-1]:
+        try:
+            return codecs.decode(data, encoding), encoding
+        except UnicodeDecodeError:
+            continue
+    return codecs.decode(data, candidates[-1], errors="replace"), candidates[-1]
+
+
+def _read_text_file(path: str) -> Tuple[str, str, str]:
+    """(text, encoding, sha256 of the raw bytes) of a text file."""
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        if size < MMAP_THRESHOLD_BYTES:
+            data = f.read()
+            text, encoding = decode_text(data)
+            return text, encoding, hashlib.sha256(data).hexdigest()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            text, encoding = decode_text(mapped)
+            return text, encoding, hashlib.sha256(mapped).hexdigest()
+
+
+def _record(source: str, path: str, text: str) -> dict:
+    content = normalize_document(text)
+    return {
+        "source": source,
+        "path": path,
+        "content": content,
+        "length": len(content)
+    }
 
-SUPPORTED_EXTENSIONS = {".txt", ".md"}
 
 def ingest_document(path: str) -> dict:
     """
@@ -29,17 +161,243 @@ def ingest_document(path: str) -> dict:
     if not file_path.exists():
         raise FileNotFoundError(f"Document not found: {path}")
 
-    if file_path.suffix.lower() not in SUPPORTED_EXTENSIONS:
-        raise ValueError(
-            f"Unsupported format {file_path.suffix}. "
-            "PDF/OCR support will be added next."
-        )
+    suffix = file_path.suffix.lower()
+    if suffix not in SUPPORTED_EXTENSIONS:
+        raise ValueError(f"Unsupported format {file_path.suffix}.")
+
+    if suffix == ".pdf":
+        content = read_pdf_text(str(file_path))
+    else:
+        content, _, _ = _read_text_file(str(file_path))
+
+    return _record("file", str(file_path), content)
 
-    content = file_path.read_text(encoding="utf-8")
+# ==================================================
+# BULK INGESTION
+# ==================================================
 
+# A unit of work: (source, key, path, member) where member is None for a
+# plain file, or the member name inside the archive at path.
+_Item = Tuple[str, str, str, Optional[str]]
+
+_ARCHIVE_SUFFIXES = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz")
+
+
+def _is_archive(path: str) -> bool:
+    return path.lower().endswith(_ARCHIVE_SUFFIXES)
+
+
+def _supported(name: str) -> bool:
+    return os.path.splitext(name)[1].lower() in SUPPORTED_EXTENSIONS
+
+
+def _archive_members(path: str) -> Iterator[Tuple[str, int, int]]:
+    """
+    (member name, size, version) of the supported files in an archive; the
+    version is the CRC for zip members and the mtime for tar members.
+    """
+    if path.lower().endswith(".zip"):
+        with zipfile.ZipFile(path) as archive:
+            for info in archive.infolist():
+                if not info.is_dir() and _supported(info.filename):
+                    yield info.filename, info.file_size, info.CRC
+        return
+    with tarfile.open(path) as archive:
+        for info in archive:
+            if info.isfile() and _supported(info.name):
+                yield info.name, info.size, int(info.mtime)
+
+
+def _discover(source: str) -> Iterator[Tuple[_Item, dict]]:
+    """
+    Yields each supported document under source (a file, a directory
+    walked recursively, or an archive; archives found in a directory are
+    opened too) with the {"size", "version"} stamp the manifest compares.
+    """
+    def _from_archive(path):
+        for member, size, version in _archive_members(path):
+            key = f"{path}!{member}"
+            yield ("archive", key, path, member), {"size": size, "version": version}
+
+    if os.path.isdir(source):
+        for directory, subdirs, files in os.walk(source):
+            subdirs.sort()
+            for name in sorted(files):
+                path = os.path.join(directory, name)
+                if _is_archive(path):
+                    yield from _from_archive(path)
+                elif _supported(name):
+                    stat = os.stat(path)
+                    yield ("file", path, path, None), {
+                        "size": stat.st_size, "version": stat.st_mtime_ns
+                    }
+    elif _is_archive(source):
+        yield from _from_archive(source)
+    elif _supported(source):
+        stat = os.stat(source)
+        yield ("file", source, source, None), {"size": stat.st_size, "version": stat.st_mtime_ns}
+    else:
+        raise ValueError(f"Unsupported source {source}.")
+
+
+def _open_member(path: str, member: str) -> bytes:
+    if path.lower().endswith(".zip"):
+        with zipfile.ZipFile(path) as archive:
+            return archive.read(member)
+    with tarfile.open(path) as archive:
+        return archive.extractfile(member).read()
+
+
+def _ingest_item(item: _Item) -> dict:
+    """
+    Worker: reads one document and returns its record plus the raw-bytes
+    digest and detected encoding. Runs in a child process.
+    """
+    source, key, path, member = item
+    is_pdf = key.lower().endswith(".pdf")
+    if member is None:
+        if os.path.getsize(path) > MAX_FILE_BYTES:
+            raise ValueError(f"larger than the {MAX_UPLOAD_MB:g} MB limit")
+        if is_pdf:
+            with open(path, "rb") as f:
+                digest = hashlib.file_digest(f, "sha256").hexdigest()
+            text, encoding = read_pdf_text(path), None
+        else:
+            text, encoding, digest = _read_text_file(path)
+    else:
+        data = _open_member(path, member)
+        if len(data) > MAX_FILE_BYTES:
+            raise ValueError(f"larger than the {MAX_UPLOAD_MB:g} MB limit")
+        digest = hashlib.sha256(data).hexdigest()
+        if is_pdf:
+            text, encoding = read_pdf_text(io.BytesIO(data)), None
+        else:
+            text, encoding = decode_text(data)
+    record = _record(source, key, text)
     return {
-        "source": "file",
-        "path": str(file_path),
-        "content": content.strip(),
-        "length": len(content)
+        "record": record,
+        "sha256": digest,
+        "content_hash": content_hash(record["content"]),
+        "encoding": encoding,
+    }
+
+
+def load_manifest(path: Optional[str]) -> dict:
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(path: str, manifest: dict) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def ingest_tree(
+    source: str,
+    manifest_path: Optional[str] = None,
+    workers: Optional[int] = None
+) -> Iterator[dict]:
+    """
+    Ingests every .txt/.md/.pdf under source (directory, archive or single
+    file) in a process pool and yields one event per document:
+
+        {"status": "ingested", "record": {...}, "encoding": ...}
+        {"status": "unchanged", "path": ...}         manifest stamp or digest match
+        {"status": "duplicate", "path": ..., "duplicate_of": ...}
+        {"status": "error", "path": ..., "detail": ...}
+
+    Records have the shape ingest_document returns. With a manifest_path,
+    files whose size and mtime (zip: CRC) or else raw-bytes SHA-256 match
+    the previous run are skipped without being parsed again, and the
+    manifest is rewritten at the end.
+    """
+    manifest = load_manifest(manifest_path)
+    seen_content = {
+        entry["content_hash"]: key for key, entry in manifest.items() if "content_hash" in entry
     }
+    pending = []
+    for item, stamp in _discover(source):
+        entry = manifest.get(item[1])
+        if entry and entry.get("size") == stamp["size"] and entry.get("version") == stamp["version"]:
+            yield {"status": "unchanged", "path": item[1]}
+            continue
+        pending.append((item, stamp))
+
+    try:
+        with ProcessPoolExecutor(max_workers=max(workers or os.cpu_count() or 2, 1)) as pool:
+            futures = {pool.submit(_ingest_item, item): (item, stamp) for item, stamp in pending}
+            for future in as_completed(futures):
+                item, stamp = futures[future]
+                key = item[1]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    yield {"status": "error", "path": key, "detail": str(e)}
+                    continue
+
+                previous = manifest.get(key)
+                manifest[key] = {
+                    **stamp, "sha256": result["sha256"], "content_hash": result["content_hash"]
+                }
+                if previous and previous.get("sha256") == result["sha256"]:
+                    # Touched but not modified.
+                    yield {"status": "unchanged", "path": key}
+                    continue
+                first = seen_content.setdefault(result["content_hash"], key)
+                if first != key:
+                    yield {"status": "duplicate", "path": key, "duplicate_of": first}
+                    continue
+                yield {
+                    "status": "ingested",
+                    "record": result["record"],
+                    "encoding": result["encoding"],
+                }
+    finally:
+        if manifest_path:
+            save_manifest(manifest_path, manifest)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Bulk-ingest a directory or archive of contracts."
+    )
+    parser.add_argument("source", help="directory, .zip/.tar(.gz) archive or file")
+    parser.add_argument("--out", help="write records as JSON lines here (default: stdout)")
+    parser.add_argument("--manifest", help="content-hash manifest; unchanged files are skipped")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes")
+    parser.add_argument(
+        "--batch", action="store_true",
+        help="write one /api/analyze/batch request body instead of JSON lines",
+    )
+    args = parser.parse_args(argv)
+
+    out = open(args.out, "w", encoding="utf-8") if args.out else sys.stdout
+    counts = {}
+    documents = []
+    try:
+        for event in ingest_tree(args.source, args.manifest, args.workers):
+            counts[event["status"]] = counts.get(event["status"], 0) + 1
+            if event["status"] == "error":
+                print(f"[Ingestion Error] {event['path']}: {event['detail']}", file=sys.stderr)
+            if event["status"] != "ingested":
+                continue
+            record = event["record"]
+            if args.batch:
+                documents.append({
+                    "content": record["content"],
+                    "filename": os.path.basename(record["path"].split("!")[-1]),
+                })
+            else:
+                out.write(json.dumps(record) + "\n")
+        if args.batch:
+            json.dump({"documents": documents, "persona_mode": "full"}, out)
+            out.write("\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(json.dumps(counts), file=sys.stderr)
+    return 1 if counts.get("error") else 0
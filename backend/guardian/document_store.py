@@ -0,0 +1,133 @@
+"""
+Document Store for ClauseGuard
+
+Responsibility:
+- Keep uploaded, normalized documents server-side
+- Hand out document ids so the client never re-sends the full text
+- Bound memory by document count, total size and idle TTL
+"""
+
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Optional
+
+from guardian.document_ingestion import content_hash, normalize_document
+
+DOCUMENT_STORE_MAX_DOCS = int(os.getenv("CLAUSEGUARD_DOCUMENT_STORE_SIZE", "256"))
+DOCUMENT_STORE_MAX_MB = float(os.getenv("CLAUSEGUARD_DOCUMENT_STORE_MB", "256"))
+DOCUMENT_TTL_SECONDS = float(os.getenv("CLAUSEGUARD_DOCUMENT_TTL", str(6 * 3600)))
+
+
+@dataclass
+class StoredDocument:
+    document_id: str
+    filename: Optional[str]
+    content: str
+    content_hash: str
+    size_bytes: int
+    created: float
+    last_used: float
+    # Derived artifacts (segmentation, indexes, prior analysis) built once
+    # per document and reused by later requests.
+    extras: dict = field(default_factory=dict)
+
+
+class DocumentStore:
+    """
+    LRU store of uploaded documents.
+
+    Uploading the same text twice returns the existing document id.
+    """
+
+    def __init__(
+        self,
+        max_documents: int = DOCUMENT_STORE_MAX_DOCS,
+        max_bytes: int = int(DOCUMENT_STORE_MAX_MB * 1024 * 1024),
+        ttl_seconds: float = DOCUMENT_TTL_SECONDS,
+    ):
+        self.max_documents = max(max_documents, 1)
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._docs: "OrderedDict[str, StoredDocument]" = OrderedDict()
+        self._by_hash: dict[str, str] = {}
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def put(self, text: str, filename: Optional[str] = None) -> StoredDocument:
+        content = normalize_document(text)
+        digest = content_hash(content)
+        now = time.time()
+
+        with self._lock:
+            existing = self._by_hash.get(digest)
+            if existing is not None and existing in self._docs:
+                doc = self._docs[existing]
+                doc.last_used = now
+                self._docs.move_to_end(existing)
+                return doc
+
+            doc = StoredDocument(
+                document_id=uuid.uuid4().hex,
+                filename=filename,
+                content=content,
+                content_hash=digest,
+                size_bytes=len(content.encode("utf-8")),
+                created=now,
+                last_used=now,
+            )
+            self._docs[doc.document_id] = doc
+            self._by_hash[digest] = doc.document_id
+            self._total_bytes += doc.size_bytes
+            self._evict(now)
+            return doc
+
+    def get(self, document_id: str) -> Optional[StoredDocument]:
+        now = time.time()
+        with self._lock:
+            doc = self._docs.get(document_id)
+            if doc is None:
+                return None
+            if now - doc.last_used > self.ttl_seconds:
+                self._remove(document_id)
+                return None
+            doc.last_used = now
+            self._docs.move_to_end(document_id)
+            return doc
+
+    def _evict(self, now: float) -> None:
+        for document_id, doc in list(self._docs.items()):
+            if now - doc.last_used <= self.ttl_seconds:
+                break
+            self._remove(document_id)
+
+        # Keep at least the newest document even if it alone exceeds max_bytes.
+        while len(self._docs) > 1 and (
+            len(self._docs) > self.max_documents or self._total_bytes > self.max_bytes
+        ):
+            self._remove(next(iter(self._docs)))
+
+    def _remove(self, document_id: str) -> None:
+        doc = self._docs.pop(document_id)
+        self._total_bytes -= doc.size_bytes
+        if self._by_hash.get(doc.content_hash) == document_id:
+            del self._by_hash[doc.content_hash]
+        self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "documents": len(self._docs),
+                "total_bytes": self._total_bytes,
+                "max_documents": self.max_documents,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "evictions": self.evictions,
+            }
+
+
+document_store = DocumentStore()
@@ -0,0 +1,151 @@
+"""
+Follow-up Q&A for ClauseGuard
+
+Responsibility:
+- Answer follow-up questions ("what does clause 7 mean?") about a stored
+  document from a few retrieved clauses instead of a full risk analysis
+- Reuse the risks an earlier analysis attributed to those clauses
+- Keep the clause index with the document so it is built only once
+"""
+
+import os
+from typing import List, Optional
+
+from guardian import agent
+from guardian.document_store import StoredDocument
+from guardian.retrieval import ClauseIndex, select_within_budget
+from guardian.revisions import clauses_for
+from guardian.risk_scoring import SEVERITY_WEIGHTS
+
+FOLLOWUP_TOP_K = int(os.getenv("CLAUSEGUARD_FOLLOWUP_TOP_K", "5"))
+# Upper bound on clause text sent with one follow-up question.
+FOLLOWUP_CONTEXT_CHARS = int(os.getenv("CLAUSEGUARD_FOLLOWUP_CONTEXT_CHARS", "8000"))
+FOLLOWUP_MAX_RISKS = 10
+
+STATUS_FOLLOWUP = "FOLLOW_UP_ANSWER"
+
+
+def index_for(doc: StoredDocument) -> ClauseIndex:
+    """BM25 index over the document's clauses, built once and kept with it."""
+    index = doc.extras.get("clause_index")
+    if index is None:
+        index = ClauseIndex(clauses_for(doc))
+        doc.extras["clause_index"] = index
+    return index
+
+
+def is_followup_question(user_query: str, content: str, scan=None) -> bool:
+    """True when the query about content classifies as a follow-up."""
+    intent = agent.classify_intent(
+        user_query, agent.is_document_sufficient(content), scan or agent.scan_text(user_query)
+    )
+    return intent == agent.INTENT_FOLLOWUP
+
+
+def wants_followup(user_query: str, doc: StoredDocument) -> bool:
+    """
+    True when the question should be answered from retrieved clauses.
+
+    "what are the risks?" also reads as a follow-up; until the document has
+    been analyzed there is nothing to reuse, so it still gets the full
+    risk analysis.
+    """
+    scan = agent.scan_text(user_query)
+    if not is_followup_question(user_query, doc.content, scan):
+        return False
+    return "analysis" in doc.extras or not scan.has("risk")
+
+
+def _related_risks(doc: StoredDocument, clauses: List[dict]) -> List[dict]:
+    """Risks the earlier analysis attributed to the given clauses, worst first."""
+    hashes = [c["hash"] for c in clauses]
+    related = []
+    for by_clause in doc.extras.get("clause_risks", {}).values():
+        for clause_hash in hashes:
+            related.extend(by_clause.get(clause_hash, []))
+    related.sort(key=lambda r: -SEVERITY_WEIGHTS.get(r.get("severity", "LOW"), 1))
+    return related[:FOLLOWUP_MAX_RISKS]
+
+
+def _clause_label(clause: dict) -> str:
+    return clause["heading"] or f"Clause {clause['index'] + 1}"
+
+
+def _followup_prompt(
+    user_query: str, clauses: List[dict], risks: List[dict], verdict: Optional[str]
+) -> str:
+    excerpts = "\n\n".join(f"[{_clause_label(c)}]\n{c['text']}" for c in clauses)
+    findings = "\n".join(
+        f"- ({r.get('severity', 'LOW')}, {r.get('persona', 'legal')}) "
+        f"{r.get('title', '')}: {r.get('explanation', '')}"
+        for r in risks
+    ) or "- None recorded for these clauses."
+    overall = f"\nOverall verdict of the earlier analysis: {verdict}\n" if verdict else ""
+    return f"""
+You are ClauseGuard answering a follow-up question about a document the user already shared.
+
+Question: "{user_query}"
+
+Relevant clauses retrieved from the document:
+{excerpts or "(no matching clauses)"}
+
+Earlier risk findings for these clauses:
+{findings}
+{overall}
+Task:
+- Answer using only the clauses above; if they do not contain the answer, say so.
+- Refer to clauses by their heading or number.
+- Do NOT give specific legal or financial advice.
+- Keep the answer concise and professional.
+"""
+
+
+async def stream_followup(
+    user_query: str,
+    doc: StoredDocument,
+    conversation_id: Optional[str] = None,
+):
+    """
+    Answers a follow-up question from the top-k clauses of the document.
+
+    Yields the same event shape as agent.stream_clauseguard_consensus:
+    intent, retrieval ({"clauses": [...]}) and result.
+    """
+    yield agent._event("intent", {"intent": agent.INTENT_FOLLOWUP})
+
+    hits = select_within_budget(
+        index_for(doc).search(user_query, FOLLOWUP_TOP_K), FOLLOWUP_CONTEXT_CHARS, user_query
+    )
+    clauses = [hit["clause"] for hit in hits]
+    retrieved = [
+        {"index": c["index"], "heading": c["heading"], "score": hit["score"]}
+        for c, hit in zip(clauses, hits)
+    ]
+    yield agent._event("retrieval", {"clauses": retrieved})
+
+    risks = _related_risks(doc, clauses)
+    analysis = doc.extras.get("analysis")
+    verdict = analysis["risk_analysis"].get("verdict") if analysis else None
+
+    reply = await agent._run_prompt(
+        _followup_prompt(user_query, clauses, risks, verdict), conversation_id
+    )
+    yield agent._event("result", {
+        "status": STATUS_FOLLOWUP,
+        "message": reply.strip(),
+        "clauses": retrieved,
+        "related_risks": risks,
+        "verdict": verdict,
+    })
+
+
+async def run_followup(
+    user_query: str,
+    doc: StoredDocument,
+    conversation_id: Optional[str] = None,
+) -> dict:
+    result = None
+    async for event in stream_followup(user_query, doc, conversation_id):
+        if event["event"] == "result":
+            result = event["data"]
+    return result
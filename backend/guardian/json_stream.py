@@ -0,0 +1,208 @@
+"""
+Streaming JSON extraction for ClauseGuard
+
+Responsibility:
+- Pull risk objects out of model output as the response streams in
+- Tolerate markdown fences, preambles and trailing prose around the JSON
+- Recover every complete object from a truncated array
+- Validate each object and count what had to be thrown away
+"""
+
+import json
+from typing import Callable, Dict, List, Optional
+
+from guardian.risk_scoring import SEVERITY_WEIGHTS
+
+# Failure reasons, used as metric labels.
+PARSE_NO_JSON = "no_json"          # nothing that looks like a JSON array/object
+PARSE_TRUNCATED = "truncated"      # the stream ended inside the JSON
+PARSE_MALFORMED = "malformed"      # an element was not valid JSON
+PARSE_INVALID = "invalid"          # valid JSON, but not a usable risk
+
+
+class RiskParseError(ValueError):
+    """The model response held no usable risks, only problems."""
+
+    def __init__(self, failures: Dict[str, int]):
+        super().__init__(
+            "unparseable model response (" +
+            ", ".join(f"{k}={v}" for k, v in sorted(failures.items())) + ")"
+        )
+        self.failures = failures
+
+
+def validate_risk(obj) -> Optional[dict]:
+    """
+    Returns the risk normalised for scoring, or None when it cannot be used:
+    it must be an object naming the clause or the risk.
+    """
+    if not isinstance(obj, dict):
+        return None
+    if not any(isinstance(obj.get(k), str) and obj[k].strip() for k in ("clause", "title")):
+        return None
+    risk = dict(obj)
+    severity = risk.get("severity")
+    if isinstance(severity, str) and severity.strip().upper() in SEVERITY_WEIGHTS:
+        risk["severity"] = severity.strip().upper()
+    irreversible = risk.get("irreversible")
+    if isinstance(irreversible, str):
+        risk["irreversible"] = irreversible.strip().lower() == "true"
+    return risk
+
+
+class RiskStreamParser:
+    """
+    Incremental extractor for a JSON array of risk objects.
+
+    feed() takes response text in arbitrary pieces and returns the risks
+    completed by that piece (also passed to on_risk); close() marks the
+    end of the response. Text before the first array or object (a
+    preamble, a ```json fence) and after the array is ignored. A top-level
+    object is accepted as a single risk, or as a wrapper whose "risks"
+    list holds them.
+
+    Only the text of the element being read is buffered.
+    """
+
+    def __init__(self, on_risk: Optional[Callable[[dict], None]] = None):
+        self.on_risk = on_risk
+        self.reset()
+
+    def reset(self) -> None:
+        """Starts over, e.g. when a failed call is retried."""
+        self.risks: List[dict] = []
+        self.failures: Dict[str, int] = {}
+        self._buffer = ""       # text of the element being read
+        self._mode = None       # None (seeking), "array", "object", "done"
+        self._depth = 0         # nesting depth inside the current element
+        self._in_string = False
+        self._escape = False
+        self._expect_element = False  # just opened "[": must see "{" or "]"
+        self._skipping = False        # inside a bare value between elements
+        self._saw_json = False
+
+    # ---------- input ----------
+
+    def feed(self, text: str) -> List[dict]:
+        found = []
+        for ch in text:
+            if self._mode == "done":
+                break
+            if self._mode is None:
+                self._seek(ch)
+            elif self._mode == "array":
+                self._read_array(ch, found)
+            else:
+                self._read_element(ch, found, top_level=True)
+        return found
+
+    def close(self) -> List[dict]:
+        """Ends the response and returns every risk read from it."""
+        if self._mode in ("array", "object"):
+            self._fail(PARSE_TRUNCATED)
+        elif not self._saw_json:
+            self._fail(PARSE_NO_JSON)
+        self._mode = "done"
+        return self.risks
+
+    # ---------- states ----------
+
+    def _seek(self, ch: str) -> None:
+        if ch == "[":
+            self._mode = "array"
+            self._expect_element = True
+        elif ch == "{":
+            self._mode = "object"
+            self._buffer = ch
+            self._depth = 1
+
+    def _read_array(self, ch: str, found: list) -> None:
+        if self._depth:
+            self._read_element(ch, found, top_level=False)
+            return
+        if self._in_string:
+            # Inside a bare string element that is being skipped.
+            if self._escape:
+                self._escape = False
+            elif ch == "\\":
+                self._escape = True
+            elif ch == '"':
+                self._in_string = False
+            return
+        if ch.isspace():
+            return
+        if self._expect_element and ch not in "{]":
+            # A "[" in prose (e.g. "[Note]"), not the start of the array.
+            self._mode = None
+            self._seek(ch)
+            return
+        self._expect_element = False
+        self._saw_json = True
+        if ch in "{[":
+            self._buffer = ch
+            self._depth = 1
+        elif ch == "]":
+            self._mode = "done"
+        elif ch == ",":
+            self._skipping = False
+        else:
+            # A bare value (string, number, literal) instead of a risk
+            # object: skipped up to the next separator.
+            if not self._skipping:
+                self._skipping = True
+                self._fail(PARSE_INVALID)
+            self._in_string = ch == '"'
+
+    def _read_element(self, ch: str, found: list, top_level: bool) -> None:
+        self._buffer += ch
+        if self._in_string:
+            if self._escape:
+                self._escape = False
+            elif ch == "\\":
+                self._escape = True
+            elif ch == '"':
+                self._in_string = False
+            return
+        if ch == '"':
+            self._in_string = True
+        elif ch in "{[":
+            self._depth += 1
+        elif ch in "}]":
+            self._depth -= 1
+            if self._depth == 0:
+                self._complete(found, top_level)
+
+    def _complete(self, found: list, top_level: bool) -> None:
+        text, self._buffer = self._buffer, ""
+        self._saw_json = True
+        if top_level:
+            self._mode = "done"
+        try:
+            obj = json.loads(text)
+        except ValueError:
+            self._fail(PARSE_MALFORMED)
+            return
+        if top_level and isinstance(obj, dict) and isinstance(obj.get("risks"), list):
+            candidates = obj["risks"]
+        else:
+            candidates = [obj]
+        for candidate in candidates:
+            risk = validate_risk(candidate)
+            if risk is None:
+                self._fail(PARSE_INVALID)
+                continue
+            self.risks.append(risk)
+            found.append(risk)
+            if self.on_risk is not None:
+                self.on_risk(risk)
+
+    def _fail(self, reason: str) -> None:
+        self.failures[reason] = self.failures.get(reason, 0) + 1
+
+
+def parse_risks(text: str) -> RiskStreamParser:
+    """Parses a complete response; inspect .risks and .failures."""
+    parser = RiskStreamParser()
+    parser.feed(text)
+    parser.close()
+    return parser
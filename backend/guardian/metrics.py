@@ -0,0 +1,170 @@
+"""
+Metrics for ClauseGuard
+
+Responsibility:
+- Time each stage of uploads and analyses (spans) into histograms
+- Count model calls, tokens, cache activity and parse failures
+- Render everything in the Prometheus text format for /metrics
+- Optionally collect the spans of one request for a timing breakdown
+"""
+
+import math
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Seconds; spans range from sub-millisecond scans to minute-long passes.
+STAGE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, math.inf)
+
+STAGE_METRIC = "clauseguard_stage_duration_seconds"
+
+# When set, spans also append {"stage", "ms", ...labels} to this list.
+_request_timings: contextvars.ContextVar[Optional[list]] = contextvars.ContextVar(
+    "clauseguard_request_timings", default=None
+)
+
+_Labels = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: dict) -> _Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items() if v is not None))
+
+
+def _format_labels(labels: _Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    body = ",".join(
+        '{}="{}"'.format(k, v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for k, v in pairs
+    )
+    return "{" + body + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class MetricsRegistry:
+    """Counters, histograms and scrape-time gauges, thread-safe."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._help: Dict[str, Tuple[str, str]] = {}
+        self._counters: Dict[str, Dict[_Labels, float]] = {}
+        self._histograms: Dict[str, Dict[_Labels, list]] = {}
+        self._gauges: List[Tuple[str, str, Callable[[], dict]]] = []
+
+    # ---------- recording ----------
+
+    def describe(self, name: str, kind: str, help_text: str) -> None:
+        self._help[name] = (kind, help_text)
+
+    def inc(self, name: str, value: float = 1.0, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            state = series.get(key)
+            if state is None:
+                # bucket counts..., sum, count
+                state = series[key] = [0] * len(STAGE_BUCKETS) + [0.0, 0]
+            for i, bound in enumerate(STAGE_BUCKETS):
+                if value <= bound:
+                    state[i] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def gauges(self, prefix: str, source: Callable[[], dict], help_text: str) -> None:
+        """
+        Exposes the numeric values of source() (e.g. a stats() method) as
+        gauges named prefix_<key>, read at scrape time.
+        """
+        self._gauges.append((prefix, help_text, source))
+
+    # ---------- exposition ----------
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                lines.extend(self._header(name, "counter"))
+                for labels, value in sorted(series.items()):
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+            for name, series in sorted(self._histograms.items()):
+                lines.extend(self._header(name, "histogram"))
+                for labels, state in sorted(series.items()):
+                    for bound, count in zip(STAGE_BUCKETS, state):
+                        le = ("le", _format_value(bound))
+                        lines.append(f"{name}_bucket{_format_labels(labels, le)} {count}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(state[-2])}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {state[-1]}")
+
+        for prefix, help_text, source in self._gauges:
+            try:
+                values = source()
+            except Exception as e:
+                print(f"[Metrics Error] {prefix}: {e}")
+                continue
+            for key, value in sorted(values.items()):
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                name = f"{prefix}_{key}"
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} gauge")
+                lines.append(f"{name} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def _header(self, name: str, kind: str) -> List[str]:
+        _, help_text = self._help.get(name, (kind, name))
+        return [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+
+
+metrics = MetricsRegistry()
+metrics.describe(STAGE_METRIC, "histogram", "Wall time of each upload and analysis stage.")
+metrics.describe("clauseguard_llm_calls_total", "counter", "Model calls by priority and outcome.")
+metrics.describe("clauseguard_llm_input_tokens_total", "counter", "Estimated prompt tokens sent to the model.")
+metrics.describe("clauseguard_llm_output_tokens_total", "counter", "Estimated tokens received from the model.")
+metrics.describe("clauseguard_parse_failures_total", "counter", "Model output dropped while parsing, by kind and reason.")
+
+
+# ==================================================
+# SPANS
+# ==================================================
+
+@contextmanager
+def span(stage: str, **labels):
+    """Times the enclosed block as one stage (works in async code too)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        metrics.observe(STAGE_METRIC, elapsed, stage=stage, **labels)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.append({"stage": stage, "ms": round(elapsed * 1000, 3), **labels})
+
+
+@contextmanager
+def collect_timings():
+    """
+    Collects the spans of the enclosed request (including tasks it starts)
+    into the yielded list.
+    """
+    timings: list = []
+    token = _request_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _request_timings.reset(token)
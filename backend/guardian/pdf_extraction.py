@@ -0,0 +1,192 @@
+"""
+PDF Extraction for ClauseGuard
+
+Responsibility:
+- Spool uploads to disk in chunks instead of holding them in memory
+- Enforce upload size and page-count limits
+- Extract pages in parallel in a process pool, off the event loop
+- Report per-page timings
+"""
+
+import asyncio
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import AsyncIterator, List, Optional, Tuple
+
+from pypdf import PdfReader
+
+MAX_UPLOAD_MB = float(os.getenv("CLAUSEGUARD_MAX_UPLOAD_MB", "50"))
+MAX_PDF_PAGES = int(os.getenv("CLAUSEGUARD_MAX_PDF_PAGES", "500"))
+PDF_WORKERS = int(os.getenv("CLAUSEGUARD_PDF_WORKERS", str(os.cpu_count() or 2)))
+# Pages handed to a worker at once; each task re-opens the PDF, so tiny
+# batches pay that cost per page while huge ones delay the first results.
+PDF_PAGES_PER_TASK = int(os.getenv("CLAUSEGUARD_PDF_PAGES_PER_TASK", "4"))
+
+SPOOL_CHUNK_BYTES = 1024 * 1024
+
+
+class UploadTooLarge(ValueError):
+    """The upload exceeds the configured size or page limit."""
+
+
+# ==================================================
+# SPOOLING
+# ==================================================
+
+async def spool_upload(
+    upload, max_bytes: int = int(MAX_UPLOAD_MB * 1024 * 1024), suffix: str = ""
+) -> str:
+    """
+    Streams an UploadFile to a temporary file and returns its path.
+
+    The caller owns the file and must remove it.
+    """
+    fd, path = tempfile.mkstemp(prefix="clauseguard-", suffix=suffix)
+    written = 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = await upload.read(SPOOL_CHUNK_BYTES)
+                if not chunk:
+                    break
+                written += len(chunk)
+                if written > max_bytes:
+                    raise UploadTooLarge(
+                        f"Upload exceeds the {max_bytes // (1024 * 1024)} MB limit."
+                    )
+                out.write(chunk)
+    except BaseException:
+        os.unlink(path)
+        raise
+    return path
+
+
+async def read_upload_limited(
+    upload, max_bytes: int = int(MAX_UPLOAD_MB * 1024 * 1024)
+) -> bytes:
+    """
+    Reads a (text) upload in chunks, refusing anything over max_bytes.
+    """
+    data = bytearray()
+    while True:
+        chunk = await upload.read(SPOOL_CHUNK_BYTES)
+        if not chunk:
+            return bytes(data)
+        data.extend(chunk)
+        if len(data) > max_bytes:
+            raise UploadTooLarge(
+                f"Upload exceeds the {max_bytes // (1024 * 1024)} MB limit."
+            )
+
+# ==================================================
+# WORKER FUNCTIONS (run in child processes)
+# ==================================================
+
+def _count_pages(path) -> int:
+    return len(PdfReader(path).pages)
+
+
+def _extract_page_range(path, start: int, stop: int) -> List[Tuple[int, str, float]]:
+    reader = PdfReader(path)
+    pages = []
+    for index in range(start, stop):
+        began = time.perf_counter()
+        # extract_text() can return None for image-only pages.
+        text = reader.pages[index].extract_text() or ""
+        pages.append((index, text, time.perf_counter() - began))
+    return pages
+
+
+def read_pdf_text(source, max_pages: int = MAX_PDF_PAGES) -> str:
+    """
+    Extracts a whole PDF (a path or a binary file object) in the calling
+    process, pages joined in order like extract_pdf_text. For callers that
+    already run in a worker process, such as bulk ingestion.
+    """
+    page_count = _count_pages(source)
+    if page_count > max_pages:
+        raise UploadTooLarge(
+            f"PDF has {page_count} pages; the limit is {max_pages}."
+        )
+    return "\n".join(text for _, text, _ in _extract_page_range(source, 0, page_count))
+
+# ==================================================
+# PARALLEL EXTRACTION
+# ==================================================
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=max(PDF_WORKERS, 1))
+    return _pool
+
+
+async def count_pdf_pages(path: str) -> int:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_pool(), _count_pages, path)
+
+
+async def iter_pdf_pages(
+    path: str, max_pages: int = MAX_PDF_PAGES
+) -> AsyncIterator[Tuple[int, str, float]]:
+    """
+    Yields (page_index, text, seconds) as pages finish, in completion order.
+
+    Raises UploadTooLarge before any extraction if the page limit is exceeded.
+    """
+    page_count = await count_pdf_pages(path)
+    if page_count > max_pages:
+        raise UploadTooLarge(
+            f"PDF has {page_count} pages; the limit is {max_pages}."
+        )
+
+    loop = asyncio.get_running_loop()
+    pool = _get_pool()
+    step = max(PDF_PAGES_PER_TASK, 1)
+    tasks = [
+        loop.run_in_executor(
+            pool, _extract_page_range, path, start, min(start + step, page_count)
+        )
+        for start in range(0, page_count, step)
+    ]
+
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            for page in await next_done:
+                yield page
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def extract_pdf_text(path: str, max_pages: int = MAX_PDF_PAGES) -> dict:
+    """
+    Extracts the whole PDF.
+
+    Returns:
+        {
+            "text": "...pages joined in order...",
+            "pages": int,
+            "page_timings_ms": [float, ...],   # by page index
+            "total_ms": float
+        }
+    """
+    began = time.perf_counter()
+    texts = {}
+    timings = {}
+    async for index, text, seconds in iter_pdf_pages(path, max_pages):
+        texts[index] = text
+        timings[index] = round(seconds * 1000, 2)
+
+    order = sorted(texts)
+    return {
+        "text": "\n".join(texts[i] for i in order),
+        "pages": len(order),
+        "page_timings_ms": [timings[i] for i in order],
+        "total_ms": round((time.perf_counter() - began) * 1000, 2),
+    }
@@ -23,3 +23,39 @@ DO NOT:
 - Provide legal advice.
 - Speculate about laws not referenced in the document.
 """
+
+# Deterministic pre-screen patterns (guardian/rule_engine.py).
+RULES = [
+    {
+        "id": "compliance.third_party_sharing",
+        "title": "Data shared with third parties",
+        "pattern": r"\b(?:share|disclose|sell|transfer)[sd]?\b[^.;]{0,80}?\b(?:personal\s+(?:data|information)|your\s+(?:data|information))\b[^.;]{0,80}?\bthird[-\s]part(?:y|ies)\b",
+        "severity": "HIGH",
+        "irreversible": True,
+        "explanation": "Your data can leave the company and cannot be recalled.",
+    },
+    {
+        "id": "compliance.ai_training",
+        "title": "Content used for AI training",
+        "pattern": r"\btrain(?:ing)?\b[^.;]{0,60}?\b(?:machine\s+learning|artificial\s+intelligence|ai|models?)\b",
+        "severity": "HIGH",
+        "irreversible": True,
+        "explanation": "Your content may be used to train models and cannot be removed from them.",
+    },
+    {
+        "id": "compliance.perpetual_license",
+        "title": "Perpetual, irrevocable rights",
+        "pattern": r"\b(?:perpetual|irrevocable)\b[^.;]{0,40}?\b(?:licen[cs]e|right)\b",
+        "severity": "HIGH",
+        "irreversible": True,
+        "explanation": "The rights granted can never be taken back.",
+    },
+    {
+        "id": "compliance.long_retention",
+        "title": "Long or indefinite data retention",
+        "pattern": r"\bretain(?:ed|s)?\b[^.;]{0,80}?\b(?:indefinitely|\d+\s+years)\b",
+        "severity": "MEDIUM",
+        "irreversible": False,
+        "explanation": "Your data is kept for a long time after you stop using the service.",
+    },
+]
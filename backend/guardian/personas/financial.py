@@ -26,3 +26,47 @@ DO NOT:
 - Estimate amounts not present in the text.
 - Offer investment advice.
 """
+
+# Deterministic pre-screen patterns (guardian/rule_engine.py).
+RULES = [
+    {
+        "id": "financial.late_interest",
+        "title": "Late payment interest or fees",
+        "pattern": r"\b(?:late|overdue)\s+(?:payment\s+)?(?:fees?|charges?|interest)\b|\binterest\s+(?:at|of)\s+[\d.]+\s*%\s*(?:per|a|each)\s+month\b",
+        "severity": "MEDIUM",
+        "irreversible": False,
+        "explanation": "Missing a payment date adds extra charges.",
+    },
+    {
+        "id": "financial.termination_fee",
+        "title": "Early termination fee",
+        "pattern": r"\b(?:early\s+)?(?:termination|cancellation|exit)\s+(?:fee|charge|penalty)\b",
+        "severity": "HIGH",
+        "irreversible": False,
+        "explanation": "Leaving the agreement early costs money.",
+    },
+    {
+        "id": "financial.price_escalation",
+        "title": "Unilateral price increase",
+        "pattern": r"\b(?:prices?|fees?|rates?|rent)\s+(?:may|will|shall)\s+(?:be\s+)?increase[sd]?\b",
+        "severity": "MEDIUM",
+        "irreversible": False,
+        "explanation": "What you pay can go up during the term.",
+    },
+    {
+        "id": "financial.non_refundable",
+        "title": "Non-refundable payment",
+        "pattern": r"\bnon-?refundable\b",
+        "severity": "MEDIUM",
+        "irreversible": True,
+        "explanation": "Money paid cannot be recovered.",
+    },
+    {
+        "id": "financial.liquidated_damages",
+        "title": "Penalties or liquidated damages",
+        "pattern": r"\bliquidated\s+damages\b|\bpenalt(?:y|ies)\s+of\b",
+        "severity": "HIGH",
+        "irreversible": False,
+        "explanation": "Fixed amounts are owed if you miss an obligation.",
+    },
+]
@@ -24,3 +24,31 @@ DO NOT:
 - Assume coverage beyond what is written.
 - Provide legal or financial advice.
 """
+
+# Deterministic pre-screen patterns (guardian/rule_engine.py).
+RULES = [
+    {
+        "id": "insurance.exclusion",
+        "title": "Coverage exclusion",
+        "pattern": r"\b(?:is|are)\s+not\s+covered\b|\bexclud(?:es|ed)\s+(?:from\s+)?(?:coverage|cover)\b|\bcoverage\s+excludes\b",
+        "severity": "MEDIUM",
+        "irreversible": False,
+        "explanation": "Some losses are explicitly outside the coverage.",
+    },
+    {
+        "id": "insurance.claim_deadline",
+        "title": "Claim notice deadline",
+        "pattern": r"\bclaims?\b[^.;]{0,80}?\bwithin\s+\d+\s+(?:calendar\s+|business\s+)?days\b",
+        "severity": "HIGH",
+        "irreversible": True,
+        "explanation": "A late claim can be rejected outright.",
+    },
+    {
+        "id": "insurance.coverage_void",
+        "title": "Coverage can be voided",
+        "pattern": r"\bcoverage\b[^.;]{0,60}?\b(?:void|lapses?|terminates?|cancell?ed)\b|\bpolicy\s+(?:is|becomes)\s+void\b",
+        "severity": "HIGH",
+        "irreversible": True,
+        "explanation": "Coverage can disappear when a condition is not met.",
+    },
+]
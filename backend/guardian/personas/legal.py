@@ -25,3 +25,68 @@ DO NOT:
 - Give financial, tax, or insurance advice.
 - Suggest litigation or legal strategies.
 """
+
+# Deterministic pre-screen patterns (guardian/rule_engine.py). Matched
+# case-insensitively; each hit is a provisional risk until the persona's
+# model pass has read its clause. "unless" vetoes hits in a clause it matches.
+RULES = [
+    {
+        "id": "legal.auto_renewal",
+        "title": "Automatic renewal",
+        "pattern": r"\b(?:automatically|auto-?)\s*renew(?:s|ed|al)?\b|\brenew(?:s|ed)?\s+automatically\b",
+        "severity": "MEDIUM",
+        "irreversible": False,
+        "explanation": "The agreement continues unless you actively cancel in time.",
+    },
+    {
+        "id": "legal.unilateral_termination",
+        "title": "Unilateral termination right",
+        "pattern": r"\bmay\s+terminate\b[^.;]{0,120}?\b(?:at\s+any\s+time|without\s+(?:cause|notice|reason))\b",
+        "severity": "HIGH",
+        "irreversible": False,
+        "explanation": "The other party can end the agreement whenever it wants.",
+    },
+    {
+        "id": "legal.sole_discretion",
+        "title": "Sole discretion",
+        "pattern": r"\b(?:sole|absolute|exclusive)\s+discretion\b",
+        "severity": "MEDIUM",
+        "irreversible": False,
+        "explanation": "One party decides alone, with no objective standard you can rely on.",
+    },
+    {
+        "id": "legal.uncapped_indemnity",
+        "title": "Uncapped indemnity",
+        "pattern": r"\bindemnif(?:y|ies|ication)\b[^.;]{0,160}?\b(?:any\s+and\s+all|without\s+limit|unlimited)\b",
+        # "including without limitation" is boilerplate, and a clause that
+        # mentions a cap or limit is not uncapped.
+        "unless": r"\b(?:cap(?:s|ped)?|maximum|not\s+(?:to\s+)?exceed|limitation\s+of\s+liability)\b|(?<!without\s)(?<!not\s)\blimit(?:s|ed)?\b",
+        "severity": "CRITICAL",
+        "irreversible": True,
+        "explanation": "You may have to cover the other party's losses with no upper limit.",
+    },
+    {
+        "id": "legal.non_compete",
+        "title": "Non-compete restriction",
+        "pattern": r"\bnon-?compet(?:e|ition)\b|\bnot\s+(?:to\s+)?compete\b",
+        "severity": "HIGH",
+        "irreversible": True,
+        "explanation": "Limits where you can work or do business after the agreement ends.",
+    },
+    {
+        "id": "legal.arbitration",
+        "title": "Mandatory arbitration",
+        "pattern": r"\bbinding\s+arbitration\b|\b(?:shall|must)\s+be\s+(?:resolved|settled)\s+(?:exclusively\s+)?by\s+arbitration\b",
+        "severity": "MEDIUM",
+        "irreversible": True,
+        "explanation": "Disputes go to private arbitration instead of a court.",
+    },
+    {
+        "id": "legal.class_action_waiver",
+        "title": "Class action / jury waiver",
+        "pattern": r"\bwaive[sd]?\b[^.;]{0,80}?\b(?:class\s+action|jury\s+trial|class-wide)\b",
+        "severity": "HIGH",
+        "irreversible": True,
+        "explanation": "You give up the right to join a class action or have a jury trial.",
+    },
+]
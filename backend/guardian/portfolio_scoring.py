@@ -0,0 +1,276 @@
+"""
+Portfolio Scoring for ClauseGuard
+
+Responsibility:
+- Hold the risks of many documents as columns (NumPy arrays)
+- Score every document in one vectorized pass under a ScoringProfile,
+  with exactly the numbers score_risks gives for each document alone
+- Aggregate a portfolio: verdict distribution, score spread, severity
+  mix and the most frequent risk categories
+"""
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from guardian.document_ingestion import normalize_text
+from guardian.risk_scoring import (
+    DEFAULT_PROFILE,
+    VERDICT_CAUTION,
+    VERDICT_DO_NOT_SIGN,
+    VERDICT_SAFE,
+    ScoringProfile,
+)
+
+_VERDICTS = np.array([VERDICT_DO_NOT_SIGN, VERDICT_CAUTION, VERDICT_SAFE], dtype=object)
+
+
+def _str_or_none(value) -> Optional[str]:
+    return value if isinstance(value, str) else None
+
+
+def risk_category(risk: dict) -> str:
+    """The rule id of a rule hit, otherwise the normalized title."""
+    rule_id = risk.get("rule_id")
+    if isinstance(rule_id, str) and rule_id:
+        return rule_id
+    title = risk.get("title")
+    return normalize_text(title).lower() if isinstance(title, str) and title.strip() else "(untitled)"
+
+
+def _encode(values: list) -> Tuple[np.ndarray, list]:
+    """Small integer codes for hashable values, labels in first-seen order."""
+    codes: dict = {}
+    encoded = [codes.setdefault(v, len(codes)) for v in values]
+    return np.asarray(encoded, dtype=np.int64), list(codes)
+
+
+class RiskColumns:
+    """
+    The risks of many documents as parallel arrays, one entry per risk,
+    grouped by document in input order.
+
+    Severities are kept as score_risks reads them: a missing severity is
+    "LOW", and any other value is looked up in the profile's weights as is.
+    persona holds one entry per persona behind each risk ("personas" of a
+    merged duplicate, otherwise its "persona"), so it is not aligned with
+    the other columns.
+    """
+
+    def __init__(
+        self,
+        document_ids: List[str],
+        document: np.ndarray,
+        severity: np.ndarray,
+        severity_labels: list,
+        irreversible: np.ndarray,
+        category: np.ndarray,
+        category_labels: list,
+        persona: np.ndarray,
+        persona_labels: list,
+    ):
+        self.document_ids = document_ids
+        self.document = document
+        self.severity = severity
+        self.severity_labels = severity_labels
+        self.irreversible = irreversible
+        self.category = category
+        self.category_labels = category_labels
+        self.persona = persona
+        self.persona_labels = persona_labels
+
+    @classmethod
+    def from_documents(cls, documents: Dict[str, Sequence[dict]]) -> "RiskColumns":
+        """documents maps a document id to its risk dicts (not modified)."""
+        flat = [risk for risks in documents.values() for risk in risks]
+        document = np.repeat(
+            np.arange(len(documents), dtype=np.int64), [len(r) for r in documents.values()]
+        )
+        severity, severity_labels = _encode([r.get("severity", "LOW") for r in flat])
+        persona, persona_labels = _encode([
+            p for r in flat for p in (r.get("personas") or [r.get("persona")])
+        ])
+        irreversible = np.fromiter(
+            (r.get("irreversible") is True for r in flat), dtype=bool, count=len(flat)
+        )
+        # Categorize each distinct (rule id, title) once, not every risk.
+        keys, key_labels = _encode([
+            (_str_or_none(r.get("rule_id")), _str_or_none(r.get("title"))) for r in flat
+        ])
+        key_category, category_labels = _encode([
+            risk_category({"rule_id": rule_id, "title": title}) for rule_id, title in key_labels
+        ])
+        return cls(
+            list(documents.keys()),
+            document,
+            severity, severity_labels,
+            irreversible,
+            key_category[keys] if len(flat) else keys, category_labels,
+            persona, persona_labels,
+        )
+
+    def __len__(self) -> int:
+        return len(self.document)
+
+
+# ==================================================
+# SCORING
+# ==================================================
+
+def score_portfolio(columns: RiskColumns, profile: ScoringProfile = DEFAULT_PROFILE) -> dict:
+    """
+    Scores every document in columns at once.
+
+    Per document the results equal score_risks(risks, profile): same
+    totals (int unless a float weight was involved), same rounded
+    irreversibility index, same counts and verdict.
+
+    Returns:
+        {
+            "documents": [{"document_id", "total_risk_score",
+                           "irreversibility_index", "irreversible_risks",
+                           "critical_risks", "verdict", "risks"}, ...],
+            "risk_scores": np.ndarray     # weight of each risk, column order
+        }
+    """
+    n_docs = len(columns.document_ids)
+    weight_table = [profile.weights.get(label, 1) for label in columns.severity_labels]
+    float_weight = np.asarray(
+        [not isinstance(w, int) for w in weight_table], dtype=bool
+    )
+
+    risk_counts = np.bincount(columns.document, minlength=n_docs)
+    if float_weight.any():
+        weights = np.asarray(weight_table, dtype=np.float64)
+        risk_scores = weights[columns.severity] if len(columns) else np.zeros(0)
+        # bincount adds the weights in order, as score_risks' loop does.
+        totals = np.bincount(columns.document, weights=risk_scores, minlength=n_docs)
+        has_float = np.bincount(
+            columns.document, weights=float_weight[columns.severity], minlength=n_docs
+        ) > 0
+    else:
+        weights = np.asarray(weight_table, dtype=np.int64)
+        risk_scores = weights[columns.severity] if len(columns) else np.zeros(0, np.int64)
+        # Integer sums are exact in any order: per document severity
+        # counts times the weight table.
+        n_labels = len(weight_table)
+        counts = np.bincount(
+            columns.document * n_labels + columns.severity, minlength=n_docs * n_labels
+        ).reshape(n_docs, n_labels)
+        totals = counts @ weights if n_labels else np.zeros(n_docs, np.int64)
+        has_float = np.zeros(n_docs, dtype=bool)
+
+    irreversible = np.bincount(columns.document[columns.irreversible], minlength=n_docs)
+    critical_code = (
+        columns.severity_labels.index("CRITICAL") if "CRITICAL" in columns.severity_labels else -1
+    )
+    critical = np.bincount(columns.document[columns.severity == critical_code], minlength=n_docs)
+
+    verdict = np.select(
+        [
+            (critical >= 1) & (irreversible >= 1),
+            totals >= profile.do_not_sign_score,
+            totals >= profile.caution_score,
+        ],
+        [0, 0, 1],
+        default=2,
+    )
+    # Python's round (correctly rounded) rather than np.round, which
+    # scales by 100 first and can land on the other side of a half.
+    index = irreversible / np.maximum(risk_counts, 1)
+
+    documents = [
+        {
+            "document_id": document_id,
+            "total_risk_score": float(total) if is_float else int(total),
+            "irreversibility_index": round(ratio, 2),
+            "irreversible_risks": irr,
+            "critical_risks": crit,
+            "verdict": label,
+            "risks": count,
+        }
+        for document_id, total, is_float, ratio, irr, crit, label, count in zip(
+            columns.document_ids, totals.tolist(), has_float.tolist(), index.tolist(),
+            irreversible.tolist(), critical.tolist(), _VERDICTS[verdict].tolist(),
+            risk_counts.tolist(),
+        )
+    ]
+    return {"documents": documents, "risk_scores": risk_scores}
+
+
+# ==================================================
+# AGGREGATES
+# ==================================================
+
+def portfolio_aggregates(columns: RiskColumns, scored: dict, top: int = 10) -> dict:
+    """
+    Portfolio-level view of score_portfolio's output:
+
+        {
+            "documents": int, "risks": int,
+            "verdicts": {verdict: documents},
+            "total_risk_score": {"mean", "p50", "p90", "max"},
+            "documents_with_irreversible_risks": int,
+            "severities": {severity: risks},
+            "personas": {persona: risks},
+            "top_categories": [{"category", "risks", "documents"}, ...]
+        }
+    """
+    documents = scored["documents"]
+    totals = np.asarray([d["total_risk_score"] for d in documents], dtype=np.float64)
+    verdicts = {v: 0 for v in _VERDICTS.tolist()}
+    for d in documents:
+        verdicts[d["verdict"]] += 1
+
+    def _distribution(codes: np.ndarray, labels: list) -> dict:
+        counts = np.bincount(codes, minlength=len(labels))
+        return {
+            str(label): int(count)
+            for label, count in sorted(zip(labels, counts.tolist()), key=lambda i: -i[1])
+        }
+
+    category_risks = np.bincount(columns.category, minlength=len(columns.category_labels))
+    # Distinct (category, document) pairs: documents per category.
+    n_docs = max(len(documents), 1)
+    pairs = np.sort(columns.category * n_docs + columns.document)
+    distinct = pairs[np.concatenate(([True], pairs[1:] != pairs[:-1]))] if len(pairs) else pairs
+    category_documents = np.bincount(distinct // n_docs, minlength=len(columns.category_labels))
+    order = np.lexsort((-category_documents, -category_risks))[:top]
+
+    return {
+        "documents": len(documents),
+        "risks": len(columns),
+        "verdicts": verdicts,
+        "total_risk_score": {
+            "mean": round(float(totals.mean()), 2) if len(totals) else 0.0,
+            "p50": float(np.percentile(totals, 50)) if len(totals) else 0.0,
+            "p90": float(np.percentile(totals, 90)) if len(totals) else 0.0,
+            "max": float(totals.max()) if len(totals) else 0.0,
+        },
+        "documents_with_irreversible_risks": sum(1 for d in documents if d["irreversible_risks"]),
+        "severities": _distribution(columns.severity, columns.severity_labels),
+        "personas": _distribution(columns.persona, columns.persona_labels),
+        "top_categories": [
+            {
+                "category": columns.category_labels[i],
+                "risks": int(category_risks[i]),
+                "documents": int(category_documents[i]),
+            }
+            for i in order.tolist()
+        ],
+    }
+
+
+def profile_from(
+    weights: Optional[dict] = None,
+    do_not_sign_score: Optional[float] = None,
+    caution_score: Optional[float] = None,
+) -> ScoringProfile:
+    """DEFAULT_PROFILE with the given overrides."""
+    return ScoringProfile(
+        weights={**DEFAULT_PROFILE.weights, **(weights or {})},
+        do_not_sign_score=(
+            DEFAULT_PROFILE.do_not_sign_score if do_not_sign_score is None else do_not_sign_score
+        ),
+        caution_score=DEFAULT_PROFILE.caution_score if caution_score is None else caution_score,
+    )
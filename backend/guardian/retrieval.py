@@ -0,0 +1,169 @@
+"""
+Clause Retrieval for ClauseGuard
+
+Responsibility:
+- Build a small BM25 index over a document's clauses, once per document
+- Return the clauses most relevant to a follow-up question, so only those
+  are sent to the model
+- Resolve explicit references such as "clause 7" or "section 4.2" directly
+"""
+
+import math
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from guardian.routing import tokenize
+
+# BM25 parameters (the usual defaults).
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# Question words carry no retrieval signal; dropping them keeps short
+# questions from matching every clause.
+_STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i if in is it its me "
+    "mean means my of on or our so that the their them there this to us was "
+    "we what when where which who why will with you your".split()
+)
+
+# "clause 7", "section 4.2", "article III", "§ 5", "paragraph (b)"
+_REFERENCE = re.compile(
+    r"(?:clause|section|article|paragraph|para|schedule|annex|exhibit|§)\s*"
+    r"([0-9]+(?:\.[0-9]+)*|\([a-z0-9]{1,4}\)|[ivxlc]+(?![a-z0-9]))",
+    re.IGNORECASE,
+)
+
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def _fold(token: str) -> str:
+    # Cheap plural folding so "payments" finds "payment".
+    if len(token) > 4 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def _terms(text: str) -> List[str]:
+    return [_fold(token) for token in tokenize(text) if token not in _STOPWORDS]
+
+
+def _label_pattern(label: str) -> "re.Pattern":
+    """Matches a clause whose first line opens with the given number."""
+    bare = label.strip("()")
+    return re.compile(
+        r"^\s*(?:(?:clause|section|article|paragraph|schedule|annex|exhibit|§)\s*)?"
+        r"\(?" + re.escape(bare) + r"(?:[.)]|\s)",
+        re.IGNORECASE,
+    )
+
+
+class ClauseIndex:
+    """
+    BM25 index over a list of clauses (as produced by segment_clauses).
+
+    Postings are built once; a search only touches the postings of the
+    query's terms, so its cost depends on the question, not on the
+    document length.
+    """
+
+    def __init__(self, clauses: List[dict]):
+        self.clauses = clauses
+        self._postings: Dict[str, List[Tuple[int, int]]] = {}
+        self._lengths: List[int] = []
+        for position, clause in enumerate(clauses):
+            counts = Counter(_terms(clause["text"]))
+            self._lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                self._postings.setdefault(term, []).append((position, tf))
+        self._avg_length = (sum(self._lengths) / len(self._lengths)) if clauses else 0.0
+
+    def __len__(self) -> int:
+        return len(self.clauses)
+
+    def _idf(self, term: str) -> float:
+        df = len(self._postings.get(term, ()))
+        n = len(self.clauses)
+        return math.log(1.0 + (n - df + 0.5) / (df + 0.5))
+
+    def referenced(self, query: str) -> List[int]:
+        """Positions of clauses the query names by number."""
+        positions = []
+        for match in _REFERENCE.finditer(query):
+            pattern = _label_pattern(match.group(1))
+            for position, clause in enumerate(self.clauses):
+                if position not in positions and pattern.match(clause["text"]):
+                    positions.append(position)
+                    break
+        return positions
+
+    def search(self, query: str, k: int = 5) -> List[dict]:
+        """
+        Returns up to k clauses for the query, best first, each as
+        {"clause": clause, "score": float}. Clauses referenced by number
+        come first regardless of their BM25 score.
+        """
+        scores: Dict[int, float] = {}
+        for term in set(_terms(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = self._idf(term)
+            for position, tf in postings:
+                norm = BM25_K1 * (
+                    1 - BM25_B + BM25_B * self._lengths[position] / (self._avg_length or 1.0)
+                )
+                scores[position] = scores.get(position, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+        pinned = self.referenced(query)
+        ranked = pinned + [
+            p for p, _ in sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+            if p not in pinned
+        ]
+        return [
+            {"clause": self.clauses[p], "score": round(scores.get(p, 0.0), 4)}
+            for p in ranked[:max(k, 0)]
+        ]
+
+
+def excerpt(text: str, query: str, max_chars: int) -> str:
+    """
+    max_chars of text around the first word of the query it contains,
+    starting a quarter of the window before it; the start of the text if
+    it contains none.
+    """
+    if len(text) <= max_chars:
+        return text
+    terms = set(_terms(query))
+    start = 0
+    for match in _WORD.finditer(text.lower()):
+        if _fold(match.group()) in terms:
+            start = max(match.start() - max_chars // 4, 0)
+            break
+    start = min(start, len(text) - max_chars)
+    return text[start:start + max_chars]
+
+
+def select_within_budget(
+    hits: List[dict], max_chars: Optional[int], query: str = ""
+) -> List[dict]:
+    """
+    Keeps hits in rank order until their clause text exceeds max_chars.
+    A first hit that alone exceeds it is cut to an excerpt of max_chars
+    around the query (its clause copied, with "truncated": True), so the
+    budget always holds.
+    """
+    if not max_chars:
+        return hits
+    kept, used = [], 0
+    for hit in hits:
+        text = hit["clause"]["text"]
+        if not kept and len(text) > max_chars:
+            clause = {**hit["clause"], "text": excerpt(text, query, max_chars), "truncated": True}
+            return [{**hit, "clause": clause}]
+        if used + len(text) > max_chars:
+            break
+        kept.append(hit)
+        used += len(text)
+    return kept
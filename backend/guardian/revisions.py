@@ -0,0 +1,460 @@
+"""
+Incremental Re-analysis for ClauseGuard
+
+Responsibility:
+- Remember which clause every risk of an analyzed document came from
+- Diff a revised upload against the previous version at clause level
+- Re-run persona passes only on added or changed clauses, reuse the
+  risks of unchanged clauses, and report what changed
+"""
+
+import asyncio
+import difflib
+from typing import List, Optional
+
+from guardian import agent
+from guardian.compaction import compact_document
+from guardian.deduplication import merge_duplicate_risks, quoted_clause
+from guardian.document_ingestion import content_hash, normalize_text
+from guardian.document_store import StoredDocument
+from guardian.json_stream import RiskParseError
+from guardian.risk_scoring import score_risks
+from guardian.rule_engine import run_rules, skipped_clauses, standing_rule_risks
+from guardian.scheduler import SchedulerRejected
+from guardian.segmentation import chunk_clauses, risk_fingerprint, segment_clauses
+
+# Bucket for risks whose quote could not be matched to a single clause.
+DOCUMENT_LEVEL = "*"
+
+_QUOTE_PROBE_CHARS = 120
+# Added by merge_duplicate_risks; not part of any one persona's finding.
+_MERGE_FIELDS = ("personas", "merged_risks")
+
+
+# ==================================================
+# CLAUSES & ATTRIBUTION
+# ==================================================
+
+def clauses_for(doc: StoredDocument) -> List[dict]:
+    """
+    Segmented clauses of a stored document's compacted text (the text
+    prompts and rules see), each with a "hash" of its normalized text.
+    Computed once and kept with the document.
+    """
+    clauses = doc.extras.get("clauses")
+    if clauses is None:
+        clauses = segment_clauses(compact_document(doc.content).text)
+        for clause in clauses:
+            clause["hash"] = content_hash(clause["text"])
+        doc.extras["clauses"] = clauses
+    return clauses
+
+
+def attribute_risks(risks: List[dict], clauses: List[dict]) -> dict:
+    """
+    Groups risks by the hash of the clause their quote comes from.
+
+    Returns:
+        {clause_hash | DOCUMENT_LEVEL: [risk, ...]}
+    """
+    haystacks = [(c["hash"], normalize_text(c["text"]).lower()) for c in clauses]
+    grouped = {}
+    for risk in risks:
+        bucket = DOCUMENT_LEVEL
+        quote = quoted_clause(risk)
+        if quote is not None:
+            probe = normalize_text(quote).lower()[:_QUOTE_PROBE_CHARS]
+            bucket = next((h for h, text in haystacks if probe in text), DOCUMENT_LEVEL)
+        grouped.setdefault(bucket, []).append(risk)
+    return grouped
+
+
+def record_clause_risks(doc: StoredDocument, result: dict) -> None:
+    """
+    Stores a finished risk analysis and its clause attribution on the
+    document, so a later revision or follow-up question can reuse it.
+    """
+    if not result or result.get("status") != "RISK_ANALYSIS":
+        return
+    doc.extras["analysis"] = result
+
+    clauses = clauses_for(doc)
+    by_persona = {}
+    for risk in result["risk_analysis"]["scored_risks"]:
+        # A merged risk stands for one finding of each of its personas.
+        personas = risk.get("personas") or [risk.get("persona", "legal")]
+        finding = {k: v for k, v in risk.items() if k not in _MERGE_FIELDS}
+        for persona in personas:
+            by_persona.setdefault(persona, []).append({**finding, "persona": persona})
+
+    stored = doc.extras.setdefault("clause_risks", {})
+    for persona in result.get("personas_used", []):
+        stored[persona] = attribute_risks(by_persona.get(persona, []), clauses)
+
+# ==================================================
+# DIFF
+# ==================================================
+
+def diff_clauses(old: List[dict], new: List[dict]) -> dict:
+    """
+    Clause-level diff by normalized-text hash.
+
+    Returns:
+        {
+            "unchanged": [(old_index, new_index), ...],
+            "changed":   [(old_index, new_index), ...],
+            "added":     [new_index, ...],
+            "removed":   [old_index, ...]
+        }
+    """
+    matcher = difflib.SequenceMatcher(
+        a=[c["hash"] for c in old], b=[c["hash"] for c in new], autojunk=False
+    )
+    diff = {"unchanged": [], "changed": [], "added": [], "removed": []}
+
+    for op, i1, i2, j1, j2 in matcher.get_opcodes():
+        if op == "equal":
+            diff["unchanged"].extend(zip(range(i1, i2), range(j1, j2)))
+        elif op == "insert":
+            diff["added"].extend(range(j1, j2))
+        elif op == "delete":
+            diff["removed"].extend(range(i1, i2))
+        else:  # replace: pair clauses up in order, the rest are added/removed
+            paired = min(i2 - i1, j2 - j1)
+            diff["changed"].extend(zip(range(i1, i1 + paired), range(j1, j1 + paired)))
+            diff["removed"].extend(range(i1 + paired, i2))
+            diff["added"].extend(range(j1 + paired, j2))
+    return diff
+
+# ==================================================
+# INCREMENTAL ANALYSIS
+# ==================================================
+
+async def _analyze_clauses(
+    persona_keys: List[str], clauses: List[dict], analysis_mode: str
+) -> dict:
+    """
+    Runs the personas over just the given clauses (chunked, in parallel):
+    one call per persona and chunk, or one call per chunk for all of them
+    in consolidated mode.
+
+    Returns {persona: {clause_hash: [risk, ...]}}.
+    """
+    grouped = {key: {} for key in persona_keys}
+    if not clauses:
+        return grouped
+
+    chunks = chunk_clauses(clauses, agent.CHUNK_CHARS)
+    slots = asyncio.Semaphore(max(agent.CHUNK_CONCURRENCY, 1))
+
+    async def _call(chunk, key=None):
+        async with slots:
+            if key is None:
+                risks = agent._run_single_consolidated_pass(persona_keys, chunk["text"])
+            else:
+                risks = agent._run_single_persona_pass(agent.PERSONA_MAP[key], chunk["text"])
+            risks = await asyncio.wait_for(risks, timeout=agent.PERSONA_TIMEOUT_SECONDS)
+        if key is not None:
+            risks = [{**r, "persona": key} for r in risks]
+        return chunk, risks
+
+    if analysis_mode == agent.ANALYSIS_CONSOLIDATED:
+        calls = [_call(c) for c in chunks]
+    else:
+        calls = [_call(c, key) for key in persona_keys for c in chunks]
+
+    by_index = {c["index"]: c for c in clauses}
+    for chunk, risks in await asyncio.gather(*calls):
+        chunk_clauses_ = [by_index[i] for i in chunk["clauses"]]
+        for key in persona_keys:
+            mine = [r for r in risks if r.get("persona") == key]
+            for bucket, items in attribute_risks(mine, chunk_clauses_).items():
+                # Unmatched quotes stay with the chunk they came from.
+                if bucket == DOCUMENT_LEVEL:
+                    bucket = chunk_clauses_[0]["hash"]
+                grouped[key].setdefault(bucket, []).extend(items)
+    return grouped
+
+
+def _is_rule_risk(risk: dict) -> bool:
+    return risk.get("source") == "rule"
+
+
+def _persona_plan(old_map: Optional[dict], rerun: List[dict], new_clauses: List[dict],
+                  unchanged_hashes: set, replaced_hashes: set, current_text: str):
+    """
+    What one persona has to re-run and what it can keep.
+
+    Returns (clauses to analyze, kept {clause_hash: [risk, ...]},
+    superseded model risks). Rule risks are never kept: the rules run
+    again over the whole revision.
+    """
+    if old_map is None:
+        # Never analyzed by this persona: nothing to reuse.
+        return new_clauses, {}, []
+    old = {h: [r for r in risks if not _is_rule_risk(r)] for h, risks in old_map.items()}
+    unplaced = old.get(DOCUMENT_LEVEL, [])
+    if any(quoted_clause(r) is None for r in unplaced):
+        # A risk without a quote cannot be checked against the revision.
+        return new_clauses, {}, [r for risks in old.values() for r in risks]
+
+    kept = {h: risks for h, risks in old.items() if h in unchanged_hashes and risks}
+    # A quote that matched no single clause is kept while the revision
+    # still contains it; the clause that lost it is re-run anyway.
+    text = normalize_text(current_text).lower()
+    still, gone = [], []
+    for risk in unplaced:
+        probe = normalize_text(quoted_clause(risk)).lower()[:_QUOTE_PROBE_CHARS]
+        (still if probe in text else gone).append(risk)
+    if still:
+        kept[DOCUMENT_LEVEL] = still
+    superseded = [r for h in replaced_hashes for r in old.get(h, [])] + gone
+    return rerun, kept, superseded
+
+
+def _selection_result(recommended: List[str]) -> dict:
+    return {
+        "status": "AWAITING_PERSONA_SELECTION",
+        "message": "How would you like this analyzed?",
+        "persona_options": ["Legal", "Financial", "Compliance", "Full Analysis"],
+        "recommended_personas": recommended,
+    }
+
+
+async def stream_incremental_analysis(
+    user_query: str,
+    current: StoredDocument,
+    previous: StoredDocument,
+    persona_mode: Optional[str] = "auto",
+    conversation_id: Optional[str] = None,
+    analysis_mode: str = agent.ANALYSIS_FANOUT,
+):
+    """
+    Risk analysis of a revised document that only re-runs persona passes
+    on clauses that differ from the previous version.
+
+    Prompts, rules and locations work on the compacted document as in
+    agent.stream_clauseguard_consensus, and the events have the same
+    shape (intent, personas, provisional, persona_result, persona_failed,
+    result); the result adds "revision". Requests that are not a risk
+    analysis go to the regular engine. Follow-up questions are answered
+    by the follow-up path before this is called; one that still gets
+    here asks for the risks of a revision not analyzed yet.
+
+    Raises SchedulerRejected if the scheduler refuses a model call.
+    """
+    compaction = compact_document(current.content)
+    intent = agent.classify_intent(
+        user_query, agent.is_document_sufficient(compaction.text)
+    )
+    if intent not in (agent.INTENT_RISK, agent.INTENT_FOLLOWUP):
+        async for event in agent.stream_clauseguard_consensus(
+            user_query, current.content, persona_mode, conversation_id,
+            current.content_hash, analysis_mode,
+        ):
+            yield event
+        return
+    yield agent._event("intent", {"intent": agent.INTENT_RISK})
+
+    if persona_mode == "auto":
+        # No speculative prefetch: most of a revision's passes are reused.
+        yield agent._event("result", _selection_result(
+            agent.resolve_personas("auto", compaction.text)
+        ))
+        return
+
+    old_clauses = clauses_for(previous)
+    new_clauses = clauses_for(current)
+    diff = diff_clauses(old_clauses, new_clauses)
+    rerun = [new_clauses[j] for _, j in diff["changed"]] + [
+        new_clauses[j] for j in diff["added"]
+    ]
+    replaced_hashes = {old_clauses[i]["hash"] for i, _ in diff["changed"]} | {
+        old_clauses[i]["hash"] for i in diff["removed"]
+    }
+    unchanged_hashes = {new_clauses[j]["hash"] for _, j in diff["unchanged"]}
+
+    personas = await agent.resolve_personas_async(persona_mode, compaction.text, user_query)
+    yield agent._event("personas", {"personas": personas})
+
+    rule_risks = run_rules(compaction.text, personas, new_clauses)
+    if rule_risks:
+        provisional = score_risks(merge_duplicate_risks([dict(r) for r in rule_risks]))
+        yield agent._event("provisional", {
+            "total_risk_score": provisional["total_risk_score"],
+            "irreversible_risks": provisional["irreversible_risks"],
+            "critical_risks": provisional["critical_risks"],
+            "verdict": provisional["verdict"],
+            "risks": rule_risks,
+        })
+    skipped = {}
+    if agent.RULE_NARROWING and analysis_mode != agent.ANALYSIS_CONSOLIDATED:
+        skipped = skipped_clauses(personas, new_clauses, rule_risks)
+
+    previous_maps = previous.extras.get("clause_risks", {})
+    plans = {}
+    for key in personas:
+        to_run, kept, superseded = _persona_plan(
+            previous_maps.get(key), rerun, new_clauses,
+            unchanged_hashes, replaced_hashes, current.content,
+        )
+        skip = skipped.get(key)
+        if skip:
+            to_run = [c for c in to_run if c["index"] not in skip]
+        plans[key] = (to_run, kept, superseded)
+
+    # Consolidated mode makes one call per chunk for every persona that
+    # re-runs the same clauses; fan-out makes one per persona.
+    if analysis_mode == agent.ANALYSIS_CONSOLIDATED:
+        groups = {}
+        for key in personas:
+            groups.setdefault(tuple(c["index"] for c in plans[key][0]), []).append(key)
+        groups = list(groups.values())
+    else:
+        groups = [[key] for key in personas]
+
+    async def _group(keys):
+        try:
+            return keys, await _analyze_clauses(keys, plans[keys[0]][0], analysis_mode), None
+        except asyncio.TimeoutError:
+            return keys, None, "timeout"
+        except SchedulerRejected:
+            raise
+        except RiskParseError:
+            return keys, None, "unparseable"
+        except Exception as e:
+            print(f"[Persona Pass Error] {', '.join(keys)}: {e}")
+            return keys, None, "error"
+
+    current_maps = current.extras.setdefault("clause_risks", {})
+    by_persona, failed = {}, []
+    new_risks, removed_risks = [], []
+    unchanged_count = 0
+
+    def _compare_rules(key, rules):
+        # The rule hits a persona ends up with, against those it had before.
+        nonlocal unchanged_count
+        old = [r for risks in previous_maps.get(key, {}).values() for r in risks if _is_rule_risk(r)]
+        old_prints = {risk_fingerprint(r) for r in old}
+        prints = {risk_fingerprint(r) for r in rules}
+        for risk in rules:
+            if risk_fingerprint(risk) in old_prints:
+                unchanged_count += 1
+            else:
+                new_risks.append(dict(risk))
+        removed_risks.extend(r for r in old if risk_fingerprint(r) not in prints)
+    tasks = [asyncio.ensure_future(_group(keys)) for keys in groups]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            keys, fresh, reason = await next_done
+            for key in keys:
+                if reason:
+                    current_maps.pop(key, None)
+                    _compare_rules(key, [r for r in rule_risks if r["persona"] == key])
+                    failure = {"persona": key, "reason": reason}
+                    failed.append(failure)
+                    yield agent._event("persona_failed", failure)
+                    continue
+                to_run, kept, superseded = plans[key]
+                fresh_risks = [r for risks in fresh[key].values() for r in risks]
+                old_prints = {risk_fingerprint(r) for r in superseded}
+                fresh_prints = {risk_fingerprint(r) for r in fresh_risks}
+                for risk in fresh_risks:
+                    if risk_fingerprint(risk) in old_prints:
+                        unchanged_count += 1
+                    else:
+                        new_risks.append(dict(risk))
+                removed_risks.extend(r for r in superseded if risk_fingerprint(r) not in fresh_prints)
+                kept_risks = [r for risks in kept.values() for r in risks]
+                unchanged_count += len(kept_risks)
+
+                # Only the rule hits on clauses no pass has read still count.
+                standing = standing_rule_risks(rule_risks, key, skipped)
+                _compare_rules(key, standing)
+                attributed = {**kept, **fresh[key]}
+                for risk in standing:
+                    clause_hash = new_clauses[risk["clause_index"]]["hash"]
+                    attributed.setdefault(clause_hash, []).append(risk)
+                current_maps[key] = attributed
+
+                persona_risks = [dict(r) for r in standing] + [
+                    dict(r) for r in kept_risks + fresh_risks
+                ]
+                by_persona[key] = persona_risks
+                yield agent._event("persona_result", {"persona": key, "risks": persona_risks})
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    risks = [r for key in personas for r in by_persona.get(key, [])]
+    # A persona whose pass failed still contributes its rule hits.
+    risks += [dict(r) for r in rule_risks if r["persona"] not in by_persona]
+    if not risks:
+        yield agent._event("result", {
+            "status": "INFO",
+            "message": (
+                "The analysis could not be completed for every persona. "
+                "Please try again."
+            ) if failed else (
+                "No clear risk clauses were detected. "
+                "This does NOT guarantee safety and may indicate limited or informal content."
+            ),
+            "personas_failed": failed,
+        })
+        return
+
+    merged = merge_duplicate_risks(risks)
+    scoring = score_risks(merged)
+    for risk in scoring["scored_risks"]:
+        # Offsets from an earlier text (a reused or stored risk) never carry over.
+        risk.pop("location", None)
+        location = compaction.locate(risk.get("clause"))
+        if location is not None:
+            risk["location"] = {"start": location[0], "end": location[1]}
+
+    result = {
+        "status": "RISK_ANALYSIS",
+        "personas_used": personas,
+        "personas_failed": failed,
+        "analysis_mode": analysis_mode,
+        "rule_hits": len(rule_risks),
+        "duplicates_merged": len(risks) - len(merged),
+        "compaction": {
+            **compaction.stats(),
+            "budget_tokens": agent.PROMPT_TOKEN_BUDGET,
+            "decision": "chunk" if len(compaction.text) > agent.CHUNK_CHARS else "fits",
+        },
+        "risk_analysis": scoring,
+        "revision": {
+            "previous_document_id": previous.document_id,
+            "clauses": {k: len(v) for k, v in diff.items()},
+            "clauses_reanalyzed": len({
+                c["index"] for key in by_persona for c in plans[key][0]
+            }),
+            "new_risks": new_risks,
+            "removed_risks": removed_risks,
+            "unchanged_risks": unchanged_count,
+        },
+    }
+    current.extras["analysis"] = result
+    yield agent._event("result", result)
+
+
+async def run_incremental_analysis(
+    user_query: str,
+    current: StoredDocument,
+    previous: StoredDocument,
+    persona_mode: Optional[str] = "auto",
+    conversation_id: Optional[str] = None,
+    analysis_mode: str = agent.ANALYSIS_FANOUT,
+) -> dict:
+    """
+    Runs stream_incremental_analysis and returns only the final response.
+    """
+    result = None
+    async for event in stream_incremental_analysis(
+        user_query, current, previous, persona_mode, conversation_id, analysis_mode
+    ):
+        if event["event"] == "result":
+            result = event["data"]
+    return result
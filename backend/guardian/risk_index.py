@@ -0,0 +1,396 @@
+"""
+Portfolio Risk Index for ClauseGuard
+
+Responsibility:
+- Persist every finished risk analysis (scores, verdict, each risk's
+  clause, personas, severity and irreversibility) in SQLite
+- Index risks and document clauses for full-text search (FTS5)
+- Answer portfolio questions ("which agreements auto-renew?") across all
+  analyzed documents in milliseconds, without model calls
+"""
+
+import os
+import re
+import json
+import time
+import sqlite3
+import threading
+from typing import List, Optional
+
+from guardian.document_ingestion import content_hash as hash_content
+from guardian.segmentation import segment_clauses
+
+RISK_INDEX_DB_PATH = os.getenv(
+    "CLAUSEGUARD_RISK_INDEX_DB",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "clauseguard_risks.db"),
+)
+
+SCOPE_RISKS = "risks"
+SCOPE_CLAUSES = "clauses"
+
+SEARCH_MAX_LIMIT = 500
+
+_TERM = re.compile(r"\w+", re.UNICODE)
+_OR = re.compile(r"\s+OR\s+")
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS documents ("
+    " content_hash TEXT PRIMARY KEY, document_id TEXT, filename TEXT,"
+    " analyzed REAL NOT NULL, verdict TEXT, total_risk_score INTEGER,"
+    " irreversibility_index REAL, irreversible_risks INTEGER,"
+    " critical_risks INTEGER, personas TEXT, scoring TEXT);"
+    "CREATE TABLE IF NOT EXISTS risks ("
+    " risk_id INTEGER PRIMARY KEY, content_hash TEXT NOT NULL, persona TEXT,"
+    " severity TEXT, irreversible INTEGER NOT NULL, score INTEGER,"
+    " title TEXT, clause TEXT, explanation TEXT);"
+    "CREATE INDEX IF NOT EXISTS risks_by_document ON risks (content_hash);"
+    # Every persona behind a risk; more than one for a merged duplicate.
+    "CREATE TABLE IF NOT EXISTS risk_personas ("
+    " risk_id INTEGER NOT NULL, persona TEXT NOT NULL, PRIMARY KEY (risk_id, persona));"
+    "CREATE INDEX IF NOT EXISTS risk_personas_by_persona ON risk_personas (persona);"
+    "CREATE TABLE IF NOT EXISTS clauses ("
+    " clause_id INTEGER PRIMARY KEY, content_hash TEXT NOT NULL,"
+    " position INTEGER NOT NULL, heading TEXT, text TEXT NOT NULL);"
+    "CREATE INDEX IF NOT EXISTS clauses_by_document ON clauses (content_hash);"
+)
+
+# External-content FTS tables kept in step with their base tables.
+_FTS_SCHEMA = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS risks_fts USING fts5("
+    " title, clause, explanation, content='risks', content_rowid='risk_id',"
+    " tokenize='porter unicode61');"
+    "CREATE TRIGGER IF NOT EXISTS risks_fts_insert AFTER INSERT ON risks BEGIN"
+    " INSERT INTO risks_fts (rowid, title, clause, explanation)"
+    " VALUES (new.risk_id, new.title, new.clause, new.explanation); END;"
+    "CREATE TRIGGER IF NOT EXISTS risks_fts_delete AFTER DELETE ON risks BEGIN"
+    " INSERT INTO risks_fts (risks_fts, rowid, title, clause, explanation)"
+    " VALUES ('delete', old.risk_id, old.title, old.clause, old.explanation); END;"
+    "CREATE VIRTUAL TABLE IF NOT EXISTS clauses_fts USING fts5("
+    " heading, text, content='clauses', content_rowid='clause_id',"
+    " tokenize='porter unicode61');"
+    "CREATE TRIGGER IF NOT EXISTS clauses_fts_insert AFTER INSERT ON clauses BEGIN"
+    " INSERT INTO clauses_fts (rowid, heading, text)"
+    " VALUES (new.clause_id, new.heading, new.text); END;"
+    "CREATE TRIGGER IF NOT EXISTS clauses_fts_delete AFTER DELETE ON clauses BEGIN"
+    " INSERT INTO clauses_fts (clauses_fts, rowid, heading, text)"
+    " VALUES ('delete', old.clause_id, old.heading, old.text); END;"
+)
+
+
+def match_expression(query: str) -> str:
+    """
+    FTS5 query for free text: words within a group must all match (as
+    quoted terms, so punctuation like "auto-renewal" is safe), and groups
+    separated by an upper-case OR are alternatives.
+    """
+    groups = []
+    for part in _OR.split(query.strip()):
+        terms = _TERM.findall(part)
+        if terms:
+            groups.append("(" + " ".join(f'"{t}"' for t in terms) + ")")
+    return " OR ".join(groups)
+
+
+class RiskIndex:
+    """
+    SQLite store of analyzed documents, their risks and clauses.
+
+    Documents are keyed by content hash, so the index outlives the
+    document store's short-lived ids; re-analyzing a document replaces
+    its previous entry.
+    """
+
+    def __init__(self, db_path: str = RISK_INDEX_DB_PATH):
+        self._lock = threading.Lock()
+        self.db_path = db_path
+        self.full_text = None  # known once the database is open
+        self._connection: Optional[sqlite3.Connection] = None
+        self._open_lock = threading.Lock()
+
+    @property
+    def _db(self) -> sqlite3.Connection:
+        """The index database, opened (and created) on first use."""
+        if self._connection is None:
+            with self._open_lock:
+                if self._connection is None:
+                    db = sqlite3.connect(self.db_path, check_same_thread=False)
+                    db.executescript(_SCHEMA)
+                    if db.execute("SELECT 1 FROM risk_personas LIMIT 1").fetchone() is None:
+                        # Index written before risk_personas existed.
+                        db.execute(
+                            "INSERT OR IGNORE INTO risk_personas (risk_id, persona)"
+                            " SELECT risk_id, persona FROM risks WHERE persona IS NOT NULL"
+                        )
+                    try:
+                        db.executescript(_FTS_SCHEMA)
+                        self.full_text = True
+                    except sqlite3.OperationalError as e:
+                        # SQLite built without FTS5: searches fall back to LIKE scans.
+                        print(f"[Risk Index Warning] full-text search unavailable: {e}")
+                        self.full_text = False
+                    db.commit()
+                    self._connection = db
+        return self._connection
+
+    # ---------- writing ----------
+
+    def record(
+        self,
+        result: dict,
+        content: str,
+        content_hash: Optional[str] = None,
+        document_id: Optional[str] = None,
+        filename: Optional[str] = None,
+        clauses: Optional[List[dict]] = None
+    ) -> bool:
+        """
+        Stores a finished risk analysis of content, replacing any earlier
+        one of the same document. Other results (chat, summaries,
+        follow-ups) are ignored. Returns whether anything was stored.
+        """
+        if not result or result.get("status") != "RISK_ANALYSIS":
+            return False
+        scoring = result["risk_analysis"]
+        content_hash = content_hash or hash_content(content)
+
+        risks = [
+            (
+                (
+                    content_hash, r.get("persona"), r.get("severity", "LOW"),
+                    1 if r.get("irreversible") is True else 0, r.get("score"),
+                    r.get("title"), r.get("clause"), r.get("explanation"),
+                ),
+                [p for p in (r.get("personas") or [r.get("persona")]) if p],
+            )
+            for r in scoring.get("scored_risks", [])
+        ]
+        # Same hash, same text: a re-analysis keeps the clauses already in.
+        if clauses is None and not self._has_clauses(content_hash):
+            clauses = segment_clauses(content)
+        with self._lock, self._db:
+            self._db.execute(
+                "DELETE FROM risk_personas WHERE risk_id IN"
+                " (SELECT risk_id FROM risks WHERE content_hash = ?)", (content_hash,),
+            )
+            self._db.execute("DELETE FROM risks WHERE content_hash = ?", (content_hash,))
+            indexed = self._db.execute(
+                "SELECT 1 FROM clauses WHERE content_hash = ? LIMIT 1", (content_hash,)
+            ).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    content_hash, document_id, filename, time.time(),
+                    scoring.get("verdict"), scoring.get("total_risk_score"),
+                    scoring.get("irreversibility_index"), scoring.get("irreversible_risks"),
+                    scoring.get("critical_risks"), json.dumps(result.get("personas_used", [])),
+                    json.dumps(scoring),
+                ),
+            )
+            for row, personas in risks:
+                risk_id = self._db.execute(
+                    "INSERT INTO risks (content_hash, persona, severity, irreversible,"
+                    " score, title, clause, explanation) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    row,
+                ).lastrowid
+                self._db.executemany(
+                    "INSERT OR IGNORE INTO risk_personas (risk_id, persona) VALUES (?, ?)",
+                    [(risk_id, persona) for persona in personas],
+                )
+            if not indexed and clauses:
+                self._db.executemany(
+                    "INSERT INTO clauses (content_hash, position, heading, text)"
+                    " VALUES (?, ?, ?, ?)",
+                    [(content_hash, c["index"], c.get("heading"), c["text"]) for c in clauses],
+                )
+        return True
+
+    def _has_clauses(self, content_hash: str) -> bool:
+        with self._lock:
+            return self._db.execute(
+                "SELECT 1 FROM clauses WHERE content_hash = ? LIMIT 1", (content_hash,)
+            ).fetchone() is not None
+
+    # ---------- searching ----------
+
+    def search(
+        self,
+        query: str,
+        scope: str = SCOPE_RISKS,
+        persona: Optional[str] = None,
+        severities: Optional[List[str]] = None,
+        irreversible: Optional[bool] = None,
+        verdict: Optional[str] = None,
+        limit: int = 50
+    ) -> dict:
+        """
+        Full-text search over risks (their title, clause and explanation)
+        or over the clauses of every analyzed document. persona,
+        severities and irreversible filter risks (persona matches any
+        persona behind a merged risk); verdict filters either.
+
+        Returns:
+            {
+                "query": ..., "scope": ...,
+                "documents": [{"content_hash", "document_id", "filename",
+                               "verdict", "total_risk_score", "matches"}, ...],
+                "hits": [...],     # best first, at most limit
+                "took_ms": float
+            }
+        """
+        if scope not in (SCOPE_RISKS, SCOPE_CLAUSES):
+            raise ValueError(f"scope must be '{SCOPE_RISKS}' or '{SCOPE_CLAUSES}'")
+        expression = match_expression(query)
+        if not expression:
+            raise ValueError("query has no searchable words")
+        limit = max(1, min(limit, SEARCH_MAX_LIMIT))
+
+        began = time.perf_counter()
+        db = self._db  # opening the index settles full_text
+        if scope == SCOPE_RISKS:
+            sql, params = self._risk_query(expression, query, persona, severities, irreversible)
+        else:
+            sql, params = self._clause_query(expression, query)
+        if verdict:
+            sql += " AND d.verdict = ?"
+            params.append(verdict)
+        sql += " ORDER BY rank LIMIT ?"
+        params.append(limit)
+
+        with self._lock:
+            cursor = db.execute(sql, params)
+            columns = [c[0] for c in cursor.description]
+            hits = [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+        documents = {}
+        for hit in hits:
+            if "irreversible" in hit:
+                hit["irreversible"] = bool(hit["irreversible"])
+            if "personas" in hit:
+                hit["personas"] = hit["personas"].split(",") if hit["personas"] else []
+            entry = documents.setdefault(hit["content_hash"], {
+                "content_hash": hit["content_hash"],
+                "document_id": hit["document_id"],
+                "filename": hit["filename"],
+                "verdict": hit["verdict"],
+                "total_risk_score": hit["total_risk_score"],
+                "matches": 0,
+            })
+            entry["matches"] += 1
+        return {
+            "query": query,
+            "scope": scope,
+            "documents": list(documents.values()),
+            "hits": hits,
+            "took_ms": round((time.perf_counter() - began) * 1000, 3),
+        }
+
+    def _risk_query(self, expression, query, persona, severities, irreversible):
+        columns = (
+            "r.content_hash, d.document_id, d.filename, d.verdict, d.total_risk_score,"
+            " r.persona, r.severity, r.irreversible, r.score, r.title, r.clause,"
+            " (SELECT group_concat(persona) FROM (SELECT persona FROM risk_personas"
+            " WHERE risk_id = r.risk_id ORDER BY rowid)) AS personas"
+        )
+        if self.full_text:
+            sql = (
+                f"SELECT {columns}, snippet(risks_fts, 1, '[', ']', '…', 16) AS snippet,"
+                " bm25(risks_fts) AS rank FROM risks_fts"
+                " JOIN risks r ON r.risk_id = risks_fts.rowid"
+                " JOIN documents d ON d.content_hash = r.content_hash"
+                " WHERE risks_fts MATCH ?"
+            )
+            params = [expression]
+        else:
+            sql, params = self._like_query(
+                columns, "risks r", "r", ("r.title", "r.clause", "r.explanation"), query
+            )
+        if persona:
+            sql += " AND r.risk_id IN (SELECT risk_id FROM risk_personas WHERE persona = ?)"
+            params.append(persona)
+        if severities:
+            sql += f" AND r.severity IN ({', '.join('?' * len(severities))})"
+            params.extend(s.upper() for s in severities)
+        if irreversible is not None:
+            sql += " AND r.irreversible = ?"
+            params.append(1 if irreversible else 0)
+        return sql, params
+
+    def _clause_query(self, expression, query):
+        columns = (
+            "c.content_hash, d.document_id, d.filename, d.verdict, d.total_risk_score,"
+            " c.position, c.heading"
+        )
+        if self.full_text:
+            sql = (
+                f"SELECT {columns}, snippet(clauses_fts, 1, '[', ']', '…', 16) AS snippet,"
+                " bm25(clauses_fts) AS rank FROM clauses_fts"
+                " JOIN clauses c ON c.clause_id = clauses_fts.rowid"
+                " JOIN documents d ON d.content_hash = c.content_hash"
+                " WHERE clauses_fts MATCH ?"
+            )
+            return sql, [expression]
+        return self._like_query(columns, "clauses c", "c", ("c.heading", "c.text"), query)
+
+    @staticmethod
+    def _like_query(columns, table, alias, fields, query):
+        # Without FTS5: every word must appear in one of the fields.
+        sql = (
+            f"SELECT {columns}, NULL AS snippet, 0 AS rank FROM {table}"
+            f" JOIN documents d ON d.content_hash = {alias}.content_hash WHERE 1"
+        )
+        params = []
+        for term in _TERM.findall(query):
+            sql += " AND (" + " OR ".join(f"{f} LIKE ?" for f in fields) + ")"
+            params.extend([f"%{term}%"] * len(fields))
+        return sql, params
+
+    # ---------- portfolio ----------
+
+    def portfolio(self) -> dict:
+        """
+        Every indexed document's risks, in their scored order, for
+        re-scoring the portfolio.
+
+        Returns:
+            {content_hash: {"document_id", "filename", "verdict", "risks": [...]}}
+        """
+        with self._lock:
+            documents = {
+                row[0]: {"document_id": row[1], "filename": row[2], "verdict": row[3], "risks": []}
+                for row in self._db.execute(
+                    "SELECT content_hash, document_id, filename, verdict FROM documents"
+                    " ORDER BY analyzed"
+                )
+            }
+            rows = self._db.execute(
+                "SELECT risk_id, content_hash, persona, severity, irreversible, title FROM risks"
+                " ORDER BY risk_id"
+            ).fetchall()
+            personas = {}
+            for risk_id, persona in self._db.execute(
+                "SELECT risk_id, persona FROM risk_personas ORDER BY rowid"
+            ):
+                personas.setdefault(risk_id, []).append(persona)
+        for risk_id, content_hash, persona, severity, irreversible, title in rows:
+            document = documents.get(content_hash)
+            if document is not None:
+                document["risks"].append({
+                    "persona": persona, "personas": personas.get(risk_id, []),
+                    "severity": severity, "irreversible": bool(irreversible), "title": title,
+                })
+        return documents
+
+    def stats(self) -> dict:
+        with self._lock:
+            documents, = self._db.execute("SELECT COUNT(*) FROM documents").fetchone()
+            risks, = self._db.execute("SELECT COUNT(*) FROM risks").fetchone()
+            clauses, = self._db.execute("SELECT COUNT(*) FROM clauses").fetchone()
+        return {
+            "documents": documents,
+            "risks": risks,
+            "clauses": clauses,
+            "full_text": self.full_text,
+        }
+
+
+risk_index = RiskIndex()
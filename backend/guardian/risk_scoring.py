@@ -1,5 +1,7 @@
 # guardian/risk_scoring.py
 
+from dataclasses import dataclass, field
+
 SEVERITY_WEIGHTS = {
     "LOW": 1,
     "MEDIUM": 3,
@@ -7,23 +9,43 @@ SEVERITY_WEIGHTS = {
     "CRITICAL": 10,
 }
 
-def determine_verdict(total_score, irreversible_count, critical_count):
+VERDICT_DO_NOT_SIGN = "DO NOT SIGN"
+VERDICT_CAUTION = "PROCEED WITH CAUTION"
+VERDICT_SAFE = "SAFE TO PROCEED"
+
+
+@dataclass(frozen=True)
+class ScoringProfile:
+    """
+    Severity weights and verdict thresholds. DEFAULT_PROFILE is what every
+    analysis uses; other profiles let a portfolio be re-scored under
+    different weights without touching stored results.
+    """
+    weights: dict = field(default_factory=lambda: dict(SEVERITY_WEIGHTS))
+    do_not_sign_score: float = 25
+    caution_score: float = 12
+
+
+DEFAULT_PROFILE = ScoringProfile(weights=SEVERITY_WEIGHTS)
+
+
+def determine_verdict(total_score, irreversible_count, critical_count, profile=DEFAULT_PROFILE):
     """
     Final decision engine.
     """
     if critical_count >= 1 and irreversible_count >= 1:
-        return "DO NOT SIGN"
+        return VERDICT_DO_NOT_SIGN
 
-    if total_score >= 25:
-        return "DO NOT SIGN"
+    if total_score >= profile.do_not_sign_score:
+        return VERDICT_DO_NOT_SIGN
 
-    if total_score >= 12:
-        return "PROCEED WITH CAUTION"
+    if total_score >= profile.caution_score:
+        return VERDICT_CAUTION
 
-    return "SAFE TO PROCEED"
+    return VERDICT_SAFE
 
 
-def score_risks(risks: list[dict]) -> dict:
+def score_risks(risks: list[dict], profile: ScoringProfile = DEFAULT_PROFILE) -> dict:
     """
     Computes total risk score, irreversibility index,
     and final verdict.
@@ -35,7 +57,7 @@ def score_risks(risks: list[dict]) -> dict:
 
     for risk in risks:
         severity = risk.get("severity", "LOW")
-        weight = SEVERITY_WEIGHTS.get(severity, 1)
+        weight = profile.weights.get(severity, 1)
 
         total_score += weight
 
@@ -55,7 +77,8 @@ def score_risks(risks: list[dict]) -> dict:
     verdict = determine_verdict(
         total_score,
         irreversible_count,
-        critical_count
+        critical_count,
+        profile
     )
 
     return {
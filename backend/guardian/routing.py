@@ -0,0 +1,216 @@
+"""
+Offline Persona Router for ClauseGuard
+
+Responsibility:
+- Predict which personas a document needs without a model round-trip
+- Hashed word uni/bigram features + one-vs-rest logistic regression
+- Train the shipped weights (router_model.json) from labeled samples
+
+Legal is part of every analysis, so only the optional personas
+(financial, insurance, compliance) are predicted.
+
+Usage:
+    cd backend
+    python -m guardian.routing train guardian/data/router_samples.jsonl
+"""
+
+import json
+import math
+import os
+import random
+import re
+import sys
+import zlib
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+ROUTER_MODEL_PATH = os.path.join(os.path.dirname(__file__), "router_model.json")
+ROUTER_CONFIDENCE_THRESHOLD = float(os.getenv("CLAUSEGUARD_ROUTER_CONFIDENCE", "0.7"))
+# Longer documents are routed on ROUTER_WINDOWS evenly spaced windows
+# totalling this many characters: cost stays flat with document size,
+# and the features stay close to the sample lengths the model saw.
+ROUTER_MAX_CHARS = int(os.getenv("CLAUSEGUARD_ROUTER_MAX_CHARS", "8000"))
+ROUTER_WINDOWS = 8
+
+ROUTED_PERSONAS = ["financial", "insurance", "compliance"]
+FEATURE_DIM = 1 << 14
+
+_PREFIX_CHARS = 5
+_TOKEN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+
+# ==================================================
+# FEATURES
+# ==================================================
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall(text.lower())
+
+
+def routing_sample(text: str, max_chars: int = ROUTER_MAX_CHARS,
+                   windows: int = ROUTER_WINDOWS) -> str:
+    """
+    text itself if it fits in max_chars, otherwise windows evenly spaced
+    slices of it (first and last included) totalling max_chars.
+    """
+    if max_chars <= 0 or len(text) <= max_chars:
+        return text
+    width = max_chars // windows
+    step = (len(text) - width) / (windows - 1)
+    return "\n".join(text[int(i * step):int(i * step) + width] for i in range(windows))
+
+
+def featurize(tokens: List[str], dim: int = FEATURE_DIM) -> Dict[int, float]:
+    """
+    Sparse, L2-normalized log-TF vector of hashed unigrams, bigrams and
+    5-character prefixes (a cheap stemmer: insurer/insured/insurance).
+
+    Counting happens on whole token lists first, so hashing cost depends
+    on the number of distinct n-grams rather than document length.
+    """
+    counts = Counter(tokens)
+    counts.update(a + " " + b for a, b in zip(tokens, tokens[1:]))
+    prefixes = Counter()
+    for token, n in list(counts.items()):
+        if " " not in token and len(token) > _PREFIX_CHARS:
+            prefixes["~" + token[:_PREFIX_CHARS]] += n
+    counts.update(prefixes)
+
+    vector: Dict[int, float] = {}
+    for gram, n in counts.items():
+        bucket = zlib.crc32(gram.encode("utf-8")) % dim
+        vector[bucket] = vector.get(bucket, 0.0) + 1.0 + math.log(n)
+
+    norm = math.sqrt(sum(v * v for v in vector.values())) or 1.0
+    return {k: v / norm for k, v in vector.items()}
+
+# ==================================================
+# MODEL
+# ==================================================
+
+class PersonaRouter:
+    """
+    One logistic regression per routed persona over shared features.
+    """
+
+    def __init__(self, weights: Dict[str, Dict[int, float]], bias: Dict[str, float],
+                 dim: int = FEATURE_DIM):
+        self.weights = weights
+        self.bias = bias
+        self.dim = dim
+
+    @classmethod
+    def load(cls, path: str = ROUTER_MODEL_PATH) -> "PersonaRouter":
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        weights = {
+            label: {int(k): v for k, v in w.items()}
+            for label, w in data["weights"].items()
+        }
+        return cls(weights, data["bias"], data["dim"])
+
+    def save(self, path: str = ROUTER_MODEL_PATH) -> None:
+        data = {
+            "dim": self.dim,
+            "labels": list(self.weights),
+            "bias": {k: round(v, 6) for k, v in self.bias.items()},
+            "weights": {
+                label: {str(k): round(v, 6) for k, v in sorted(w.items()) if abs(v) >= 1e-4}
+                for label, w in self.weights.items()
+            },
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+            f.write("\n")
+
+    def predict_proba(self, text: str, tokens: Optional[List[str]] = None) -> Dict[str, float]:
+        """
+        Probability that each persona is needed. Legal is always 1.0.
+        Long texts are featurized on routing_sample(text) unless tokens
+        are given.
+        """
+        if tokens is None:
+            tokens = tokenize(routing_sample(text))
+        vector = featurize(tokens, self.dim)
+        probabilities = {"legal": 1.0}
+        for label, w in self.weights.items():
+            z = self.bias[label] + sum(w.get(k, 0.0) * v for k, v in vector.items())
+            probabilities[label] = 1.0 / (1.0 + math.exp(-max(min(z, 30.0), -30.0)))
+        return probabilities
+
+    def route(self, text: str, tokens: Optional[List[str]] = None) -> Tuple[List[str], float, Dict[str, float]]:
+        """
+        Returns (personas, confidence, probabilities).
+
+        confidence is the least certain per-persona decision, i.e. the
+        minimum over personas of max(p, 1 - p).
+        """
+        probabilities = self.predict_proba(text, tokens)
+        personas = ["legal"] + [
+            label for label in ROUTED_PERSONAS
+            if probabilities.get(label, 0.0) >= 0.5
+        ]
+        confidence = min(
+            (max(p, 1.0 - p) for label, p in probabilities.items() if label != "legal"),
+            default=1.0,
+        )
+        return personas, confidence, probabilities
+
+# ==================================================
+# TRAINING
+# ==================================================
+
+def load_samples(path: str, split: Optional[str] = None) -> List[dict]:
+    samples = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                sample = json.loads(line)
+                if split is None or sample.get("split", "train") == split:
+                    samples.append(sample)
+    return samples
+
+
+def train(samples: List[dict], epochs: int = 100, learning_rate: float = 2.0,
+          l2: float = 1e-5, seed: int = 13) -> PersonaRouter:
+    """
+    Plain SGD on the logistic loss, one model per routed persona.
+    """
+    rng = random.Random(seed)
+    data = [(featurize(tokenize(s["text"])), set(s["labels"])) for s in samples]
+    weights = {label: {} for label in ROUTED_PERSONAS}
+    bias = {label: 0.0 for label in ROUTED_PERSONAS}
+
+    for _ in range(epochs):
+        rng.shuffle(data)
+        for vector, labels in data:
+            for label in ROUTED_PERSONAS:
+                w = weights[label]
+                z = bias[label] + sum(w.get(k, 0.0) * v for k, v in vector.items())
+                p = 1.0 / (1.0 + math.exp(-max(min(z, 30.0), -30.0)))
+                gradient = p - (1.0 if label in labels else 0.0)
+                for k, v in vector.items():
+                    w[k] = w.get(k, 0.0) * (1.0 - learning_rate * l2) - learning_rate * gradient * v
+                bias[label] -= learning_rate * gradient
+
+    return PersonaRouter(weights, bias)
+
+
+_router: Optional[PersonaRouter] = None
+
+
+def get_router() -> Optional[PersonaRouter]:
+    """The shipped router, loaded once; None if the model file is missing."""
+    global _router
+    if _router is None and os.path.exists(ROUTER_MODEL_PATH):
+        _router = PersonaRouter.load()
+    return _router
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3 or sys.argv[1] != "train":
+        print(__doc__)
+        sys.exit(1)
+    router = train(load_samples(sys.argv[2], split="train"))
+    router.save()
+    print(f"Saved router model to {ROUTER_MODEL_PATH}")
@@ -0,0 +1,189 @@
+"""
+Rule Engine for ClauseGuard
+
+Responsibility:
+- Run each persona's deterministic RULES (guardian/personas/*.py) over a
+  document before any model call
+- Emit risks in the shape score_risks consumes, with clause offsets
+- Tell the persona passes which clauses the rules fully cover, so they
+  can be narrowed to the rest of the document
+- Keep rule hits provisional: once a persona's model pass succeeds, only
+  the hits on clauses that pass did not read still count
+"""
+
+import bisect
+import re
+from typing import Dict, List, Optional
+
+from guardian.personas import legal, financial, insurance, compliance
+from guardian.segmentation import segment_clauses
+
+_PERSONA_RULES = {
+    "legal": legal.RULES,
+    "financial": financial.RULES,
+    "insurance": insurance.RULES,
+    "compliance": compliance.RULES,
+}
+
+# Sentence ends within a clause: a clause is only covered when a rule
+# matched in every one of its sentences. Shorter pieces ("2.", "Changes.")
+# are numbering and headings, not sentences.
+_SENTENCE_END = re.compile(r"(?<=[.;!?])\s+")
+_MIN_SENTENCE_WORDS = 3
+
+# A rule's optional "unless" pattern vetoes its hits in any clause it
+# matches (e.g. an indemnity that mentions a cap is not uncapped).
+COMPILED_RULES = {
+    persona: [
+        (
+            rule,
+            re.compile(rule["pattern"], re.IGNORECASE),
+            re.compile(rule["unless"], re.IGNORECASE) if rule.get("unless") else None,
+        )
+        for rule in rules
+    ]
+    for persona, rules in _PERSONA_RULES.items()
+}
+
+
+def run_rules(
+    document: str, personas: List[str], clauses: Optional[List[dict]] = None
+) -> List[dict]:
+    """
+    Runs the rules of the given personas.
+
+    Returns risks like:
+        {
+            "persona": "legal",
+            "title": "...",
+            "clause": "...text of the matching clause...",
+            "severity": "HIGH",
+            "irreversible": True,
+            "explanation": "...",
+            "source": "rule",
+            "rule_id": "legal.sole_discretion",
+            "clause_index": int,
+            "start": int, "end": int,              # the clause
+            "match_start": int, "match_end": int   # the matched text
+        }
+
+    A rule reports each clause at most once, and never a clause its
+    "unless" pattern matches.
+    """
+    clauses = clauses if clauses is not None else segment_clauses(document)
+    starts = [c["start"] for c in clauses]
+    risks = []
+
+    for persona in personas:
+        for rule, pattern, unless in COMPILED_RULES.get(persona, []):
+            seen = set()
+            for match in pattern.finditer(document):
+                position = bisect.bisect_right(starts, match.start()) - 1
+                if position < 0 or position in seen:
+                    continue
+                seen.add(position)
+                clause = clauses[position]
+                if unless is not None and unless.search(clause["text"]):
+                    continue
+                risks.append({
+                    "persona": persona,
+                    "title": rule["title"],
+                    "clause": clause["text"],
+                    "severity": rule["severity"],
+                    "irreversible": rule["irreversible"],
+                    "explanation": rule["explanation"],
+                    "source": "rule",
+                    "rule_id": rule["id"],
+                    "clause_index": clause["index"],
+                    "start": clause["start"],
+                    "end": clause["end"],
+                    "match_start": match.start(),
+                    "match_end": match.end(),
+                })
+    return risks
+
+
+def _fully_covered(clause: dict, matches: List[tuple]) -> bool:
+    """Whether every sentence of the clause overlaps a rule match."""
+    text = clause["text"]
+    position = 0
+    for piece in _SENTENCE_END.split(text):
+        offset = text.index(piece, position)
+        position = offset + len(piece)
+        if len(piece.split()) < _MIN_SENTENCE_WORDS:
+            continue
+        start = clause["start"] + offset
+        end = start + len(piece)
+        if not any(m_start < end and m_end > start for m_start, m_end in matches):
+            return False
+    return True
+
+
+def covered_clauses(
+    personas: List[str], clauses: List[dict], rule_risks: List[dict]
+) -> Dict[str, set]:
+    """
+    {persona: indexes of the clauses its rules fully cover}, i.e. matched
+    in every sentence of the clause.
+    """
+    matches = {}
+    for risk in rule_risks:
+        matches.setdefault((risk["persona"], risk["clause_index"]), []).append(
+            (risk["match_start"], risk["match_end"])
+        )
+    return {
+        persona: {
+            c["index"] for c in clauses
+            if (persona, c["index"]) in matches
+            and _fully_covered(c, matches[(persona, c["index"])])
+        }
+        for persona in personas
+    }
+
+
+def skipped_clauses(
+    personas: List[str], clauses: List[dict], rule_risks: List[dict]
+) -> Dict[str, set]:
+    """
+    {persona: indexes of the clauses left out of its model pass}: the
+    fully covered ones, or none when that would be every clause (the pass
+    then reads the whole document).
+    """
+    return {
+        persona: covered if len(covered) < len(clauses) else set()
+        for persona, covered in covered_clauses(personas, clauses, rule_risks).items()
+    }
+
+
+def standing_rule_risks(rule_risks: List[dict], persona: str, skipped: Dict[str, set]) -> List[dict]:
+    """
+    The persona's rule hits that still count once its model pass has
+    succeeded: those on clauses the pass did not read. Everywhere else
+    the model's reading of the clause replaces the pattern match, which
+    keeps a rule false positive out of the verdict and a clause from
+    being counted twice for one persona.
+    """
+    left_out = skipped.get(persona, set())
+    return [r for r in rule_risks if r["persona"] == persona and r["clause_index"] in left_out]
+
+
+def narrow_for_rules(
+    document: str, personas: List[str], clauses: List[dict], rule_risks: List[dict]
+) -> Dict[str, str]:
+    """
+    Text each persona's model pass still needs to read.
+
+    A clause is left out of a persona's pass only when that persona's
+    rules matched in every sentence of it; a clause the rules flagged in
+    part still goes to the model, which may find more in it. Returns
+    {persona: text}: the untouched document when no clause is fully
+    covered, the remaining clauses otherwise. A pass is never skipped:
+    if every clause were covered the whole document is sent.
+    """
+    narrowed = {}
+    for persona, skipped in skipped_clauses(personas, clauses, rule_risks).items():
+        if not skipped:
+            narrowed[persona] = document
+        else:
+            narrowed[persona] = "\n\n".join(c["text"] for c in clauses if c["index"] not in skipped)
+    return narrowed
@@ -0,0 +1,481 @@
+"""
+Model Call Scheduler for ClauseGuard
+
+Responsibility:
+- Send every Gemini call through one place
+- Enforce requests-per-second and tokens-per-minute budgets (token buckets)
+  and a ceiling on concurrent calls
+- Serve interactive calls before batch work, and batch before speculation
+- Retry transient failures with exponential backoff and jitter, and stop
+  calling a failing model for a while (circuit breaker)
+- Refuse new interactive work when the queue is too deep, so the API can
+  answer 429/503 instead of piling up requests
+"""
+
+import os
+import time
+import heapq
+import random
+import asyncio
+import itertools
+import contextvars
+from typing import Awaitable, Callable, Optional, Set
+
+from guardian.metrics import metrics
+
+# ==================================================
+# CONFIGURATION
+# ==================================================
+
+# 0 disables a limit.
+LLM_REQUESTS_PER_SECOND = float(os.getenv("CLAUSEGUARD_LLM_RPS", "5"))
+LLM_TOKENS_PER_MINUTE = float(os.getenv("CLAUSEGUARD_LLM_TPM", "1000000"))
+LLM_CONCURRENCY = int(os.getenv("CLAUSEGUARD_LLM_CONCURRENCY", "16"))
+LLM_MAX_QUEUE = int(os.getenv("CLAUSEGUARD_LLM_MAX_QUEUE", "64"))
+LLM_RETRIES = int(os.getenv("CLAUSEGUARD_LLM_RETRIES", "3"))
+LLM_BACKOFF_SECONDS = float(os.getenv("CLAUSEGUARD_LLM_BACKOFF", "0.5"))
+LLM_BACKOFF_MAX_SECONDS = float(os.getenv("CLAUSEGUARD_LLM_BACKOFF_MAX", "8"))
+LLM_BREAKER_FAILURES = int(os.getenv("CLAUSEGUARD_LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_COOLDOWN_SECONDS = float(os.getenv("CLAUSEGUARD_LLM_BREAKER_COOLDOWN", "30"))
+
+# Lower value is served first.
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 1
+PRIORITY_SPECULATIVE = 2
+
+_PRIORITY_NAMES = {
+    PRIORITY_INTERACTIVE: "interactive",
+    PRIORITY_BATCH: "batch",
+    PRIORITY_SPECULATIVE: "speculative",
+}
+
+# Priority of the model calls made by the current task. Batch workers and
+# speculative prefetch set it once; everything else is interactive.
+call_priority = contextvars.ContextVar(
+    "clauseguard_call_priority", default=PRIORITY_INTERACTIVE
+)
+
+
+
+class SharedPriority:
+    """
+    Priority of work done on behalf of several callers, such as one
+    cache load that later callers join. It starts at the first caller's
+    priority and is raised (never lowered) when a more urgent caller
+    joins; model calls already queued for the work move up with it.
+
+    Work started from inside shared work (a chunk call of a persona pass)
+    gets its own SharedPriority with the outer one as parent, and is never
+    less urgent than its parent.
+    """
+
+    def __init__(self, value: int, parent: Optional["SharedPriority"] = None):
+        self.initial = value
+        self._value = value
+        self.parent = parent
+        self._listeners: Set[Callable[[], None]] = set()
+
+    @property
+    def value(self) -> int:
+        if self.parent is None:
+            return self._value
+        return min(self._value, self.parent.value)
+
+    def promote(self, value: int) -> None:
+        if value < self._value:
+            self._value = value
+            for listener in list(self._listeners):
+                listener()
+
+    def subscribe(self, listener: Callable[[], None]) -> None:
+        """Calls listener whenever this priority, or a parent's, is raised."""
+        node = self
+        while node is not None:
+            node._listeners.add(listener)
+            node = node.parent
+
+    def unsubscribe(self, listener: Callable[[], None]) -> None:
+        node = self
+        while node is not None:
+            node._listeners.discard(listener)
+            node = node.parent
+
+
+# The shared work the current task is doing, if any (set by the analysis
+# cache for the task that runs a load).
+shared_priority: contextvars.ContextVar[Optional[SharedPriority]] = contextvars.ContextVar(
+    "clauseguard_shared_priority", default=None
+)
+
+
+def current_priority() -> int:
+    """Priority of the current task's model calls."""
+    shared = shared_priority.get()
+    return shared.value if shared is not None else call_priority.get()
+
+# HTTP status codes (google.genai APIError.code) worth retrying.
+_RETRYABLE_CODES = {408, 429, 500, 502, 503, 504}
+_RETRYABLE_MARKERS = ("RESOURCE_EXHAUSTED", "UNAVAILABLE", "DEADLINE_EXCEEDED", "INTERNAL")
+
+
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token)."""
+    return max(len(text) // CHARS_PER_TOKEN, 1)
+
+
+def is_retryable(error: BaseException) -> bool:
+    if isinstance(error, (asyncio.TimeoutError, ConnectionError)):
+        return True
+    code = getattr(error, "code", None) or getattr(error, "status_code", None)
+    if code in _RETRYABLE_CODES:
+        return True
+    message = str(error)
+    return any(marker in message for marker in _RETRYABLE_MARKERS)
+
+
+# ==================================================
+# ERRORS
+# ==================================================
+
+class SchedulerRejected(RuntimeError):
+    """A model call was refused without being attempted."""
+
+    status_code = 503
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class SchedulerOverloaded(SchedulerRejected):
+    status_code = 429
+
+
+class CircuitOpen(SchedulerRejected):
+    status_code = 503
+
+
+# ==================================================
+# TOKEN BUCKET
+# ==================================================
+
+class TokenBucket:
+    """
+    Refills at rate units per second up to capacity. A rate of 0 means
+    unlimited. The level may go negative when actual usage is charged
+    after the fact; later callers then wait for the debt to refill.
+    """
+
+    def __init__(self, rate: float, capacity: float, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.capacity = max(capacity, 1.0)
+        self._clock = clock
+        self._level = self.capacity
+        self._updated = clock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._level = min(self.capacity, self._level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until amount is available (0 if it is now)."""
+        if self.rate <= 0:
+            return 0.0
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self._level >= amount:
+            return 0.0
+        return (amount - self._level) / self.rate
+
+    def consume(self, amount: float) -> None:
+        if self.rate <= 0:
+            return
+        self._refill()
+        self._level -= amount
+
+
+# ==================================================
+# SCHEDULER
+# ==================================================
+
+class LLMScheduler:
+    """
+    Admission, ordering and retry policy for model calls.
+
+    submit() takes a zero-argument coroutine factory, so the same call can
+    be re-issued on retry and any runner (including a fake one) can sit
+    behind it.
+    """
+
+    def __init__(
+        self,
+        requests_per_second: float = LLM_REQUESTS_PER_SECOND,
+        tokens_per_minute: float = LLM_TOKENS_PER_MINUTE,
+        concurrency: int = LLM_CONCURRENCY,
+        max_queue: int = LLM_MAX_QUEUE,
+        retries: int = LLM_RETRIES,
+        backoff_seconds: float = LLM_BACKOFF_SECONDS,
+        backoff_max_seconds: float = LLM_BACKOFF_MAX_SECONDS,
+        breaker_failures: int = LLM_BREAKER_FAILURES,
+        breaker_cooldown_seconds: float = LLM_BREAKER_COOLDOWN_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.concurrency = max(concurrency, 1)
+        self.max_queue = max_queue
+        self.retries = max(retries, 0)
+        self.backoff_seconds = backoff_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self.breaker_failures = breaker_failures
+        self.breaker_cooldown_seconds = breaker_cooldown_seconds
+        self._clock = clock
+        self._requests = TokenBucket(
+            requests_per_second, max(requests_per_second, 1.0), clock
+        )
+        self._tokens = TokenBucket(tokens_per_minute / 60.0, tokens_per_minute, clock)
+
+        self._waiting: list = []  # heap of (priority, seq)
+        self._seq = itertools.count()
+        self._changed: Optional[asyncio.Condition] = None
+        self._changed_loop = None
+        self._active = 0
+        self._consecutive_failures = 0
+        self._open_until = 0.0
+        self._probing = False
+        self._counters = {
+            "calls": 0,
+            "succeeded": 0,
+            "failed": 0,
+            "retries": 0,
+            "rejected_overloaded": 0,
+            "rejected_circuit_open": 0,
+            "circuit_opened": 0,
+        }
+
+    # ---------- admission ----------
+
+    @property
+    def circuit_state(self) -> str:
+        if self._open_until and self._clock() < self._open_until:
+            return "open"
+        if self._open_until:
+            return "half_open"
+        return "closed"
+
+    def check_admission(self, priority: Optional[int] = None) -> None:
+        """
+        Raises CircuitOpen or SchedulerOverloaded if a call at this
+        priority would be refused right now. Cheap enough to call at the
+        top of an API handler, before any work is done.
+        """
+        priority = current_priority() if priority is None else priority
+        if self.circuit_state == "open":
+            self._counters["rejected_circuit_open"] += 1
+            raise CircuitOpen(
+                "The model is currently unavailable. Please retry shortly.",
+                retry_after=self._open_until - self._clock(),
+            )
+        depth = len(self._waiting)
+        # Batch work is already bounded by its worker pool and waits its
+        # turn; speculation is dropped as soon as anything is queued.
+        if (priority == PRIORITY_INTERACTIVE and self.max_queue and depth >= self.max_queue) or (
+            priority == PRIORITY_SPECULATIVE and depth > 0
+        ):
+            self._counters["rejected_overloaded"] += 1
+            raise SchedulerOverloaded(
+                "Too many analyses are queued. Please retry shortly.",
+                retry_after=max(depth / max(self._requests.rate, 1.0), 1.0),
+            )
+
+    # ---------- submission ----------
+
+    async def submit(
+        self,
+        call: Callable[[], Awaitable[str]],
+        prompt_tokens: int = 1,
+        priority: Optional[int] = None,
+    ) -> str:
+        """
+        Runs call() under the rate limits and retry policy and returns its
+        text. Output tokens are charged to the token budget afterwards.
+
+        Without an explicit priority the call takes the current task's,
+        and follows it if the shared work it belongs to is promoted.
+        """
+        shared = shared_priority.get() if priority is None else None
+        priority = current_priority() if priority is None else priority
+        label = _PRIORITY_NAMES.get(priority, str(priority))
+        try:
+            self.check_admission(priority)
+        except SchedulerRejected:
+            metrics.inc("clauseguard_llm_calls_total", priority=label, outcome="rejected")
+            raise
+        self._counters["calls"] += 1
+
+        attempt = 0
+        while True:
+            await self._acquire(priority, prompt_tokens, shared)
+            probe = False
+            delay = None
+            try:
+                # The breaker may have tripped while this call was queued;
+                # once its cooldown is over, a single call probes the model.
+                state = self.circuit_state
+                if state == "open" or (state == "half_open" and self._probing):
+                    self._counters["rejected_circuit_open"] += 1
+                    raise CircuitOpen(
+                        "The model is currently unavailable. Please retry shortly.",
+                        retry_after=max(self._open_until - self._clock(), 1.0),
+                    )
+                if state == "half_open":
+                    self._probing = probe = True
+                metrics.inc("clauseguard_llm_input_tokens_total", prompt_tokens, priority=label)
+                text = await call()
+            except Exception as e:
+                if isinstance(e, SchedulerRejected):
+                    metrics.inc("clauseguard_llm_calls_total", priority=label, outcome="rejected")
+                    raise
+                retryable = is_retryable(e)
+                if retryable:
+                    self._record_failure()
+                if not retryable or attempt >= self.retries or self.circuit_state == "open":
+                    self._counters["failed"] += 1
+                    metrics.inc("clauseguard_llm_calls_total", priority=label, outcome="error")
+                    raise
+                attempt += 1
+                self._counters["retries"] += 1
+                delay = min(self.backoff_max_seconds, self.backoff_seconds * 2 ** (attempt - 1))
+            finally:
+                if probe:
+                    self._probing = False
+                self._release()
+
+            if delay is not None:
+                # Full jitter, outside the concurrency slot.
+                await asyncio.sleep(random.uniform(0, delay))
+                continue
+
+            self._record_success()
+            output_tokens = estimate_tokens(text or "")
+            self._tokens.consume(output_tokens)
+            self._counters["succeeded"] += 1
+            metrics.inc("clauseguard_llm_calls_total", priority=label, outcome="ok")
+            metrics.inc("clauseguard_llm_output_tokens_total", output_tokens, priority=label)
+            return text
+
+    # ---------- ordering & rate limits ----------
+
+    def _condition(self) -> asyncio.Condition:
+        # Bound to the running loop; the sync entry point starts a new loop
+        # per call, so a condition from an earlier loop is replaced.
+        loop = asyncio.get_running_loop()
+        if self._changed is None or self._changed_loop is not loop:
+            self._changed = asyncio.Condition()
+            self._changed_loop = loop
+        return self._changed
+
+    async def _acquire(
+        self, priority: int, prompt_tokens: int, shared: Optional[SharedPriority] = None
+    ) -> None:
+        """Waits until this call is first in line, a slot is free and both buckets allow it."""
+        changed = self._condition()
+        if shared is not None:
+            priority = min(priority, shared.value)
+        ticket = (priority, next(self._seq))
+        heapq.heappush(self._waiting, ticket)
+
+        def _promoted() -> None:
+            self._wake()
+
+        if shared is not None:
+            shared.subscribe(_promoted)
+        try:
+            async with changed:
+                while True:
+                    if shared is not None and shared.value < ticket[0]:
+                        # Moved up: re-queue at the new priority, same seq.
+                        self._waiting.remove(ticket)
+                        ticket = (shared.value, ticket[1])
+                        self._waiting.append(ticket)
+                        heapq.heapify(self._waiting)
+                    timeout = None
+                    if self._waiting[0] == ticket and self._active < self.concurrency:
+                        wait = max(
+                            self._requests.wait_time(1),
+                            self._tokens.wait_time(prompt_tokens),
+                        )
+                        if wait <= 0:
+                            self._requests.consume(1)
+                            self._tokens.consume(prompt_tokens)
+                            self._active += 1
+                            return
+                        timeout = wait
+                    try:
+                        await asyncio.wait_for(changed.wait(), timeout)
+                    except asyncio.TimeoutError:
+                        pass
+        finally:
+            if shared is not None:
+                shared.unsubscribe(_promoted)
+            self._waiting.remove(ticket)
+            heapq.heapify(self._waiting)
+            # The next waiter may now be first in line. Not awaited: a
+            # caller cancelled here would leave with its slot taken.
+            self._wake()
+
+    def _wake(self) -> None:
+        """Wakes the waiters from a separate task, never blocking the caller."""
+        asyncio.ensure_future(self._notify())
+
+    async def _notify(self) -> None:
+        changed = self._condition()
+        async with changed:
+            changed.notify_all()
+
+    def _release(self) -> None:
+        # Synchronous, so a cancellation cannot lose the slot.
+        self._active -= 1
+        self._wake()
+
+    # ---------- circuit breaker ----------
+
+    def _record_failure(self) -> None:
+        self._consecutive_failures += 1
+        if (
+            self.breaker_failures
+            and self._consecutive_failures >= self.breaker_failures
+            and self.circuit_state != "open"
+        ):
+            self._open_until = self._clock() + self.breaker_cooldown_seconds
+            self._counters["circuit_opened"] += 1
+            print(
+                f"[Scheduler] circuit opened after {self._consecutive_failures} "
+                f"failures; pausing model calls for {self.breaker_cooldown_seconds}s"
+            )
+
+    def _record_success(self) -> None:
+        self._consecutive_failures = 0
+        self._open_until = 0.0
+
+    # ---------- introspection ----------
+
+    def stats(self) -> dict:
+        queued = {name: 0 for name in _PRIORITY_NAMES.values()}
+        for priority, _ in self._waiting:
+            queued[_PRIORITY_NAMES.get(priority, str(priority))] += 1
+        return {
+            **self._counters,
+            "active": self._active,
+            "queued": queued,
+            "circuit": self.circuit_state,
+            "concurrency": self.concurrency,
+            "max_queue": self.max_queue,
+            "requests_per_second": self._requests.rate,
+            "tokens_per_minute": self._tokens.rate * 60.0,
+        }
+
+
+scheduler = LLMScheduler()
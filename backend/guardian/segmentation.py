@@ -0,0 +1,222 @@
+"""
+Clause Segmentation for ClauseGuard
+
+Responsibility:
+- Split a normalized document into clauses using headings, numbered
+  clauses and paragraph boundaries
+- Pack clauses into chunks under a character budget for map-reduce
+  persona passes
+- Merge the per-chunk risks back into one de-duplicated list
+"""
+
+import re
+from typing import List
+
+from guardian.document_ingestion import normalize_text
+from guardian.risk_scoring import SEVERITY_WEIGHTS
+
+# "1.", "1.2", "12.3.4)", "(a)", "(iv)", "A.", "Article 5", "SECTION 3", "§ 4"
+_NUMBERED = re.compile(
+    r"^\s*(?:"
+    r"\d+(?:\.\d+)*[.)]?"
+    r"|\([a-z0-9]{1,4}\)"
+    r"|[A-Z][.)]"
+    r"|(?:article|section|clause|schedule|annex|exhibit)\s+[\w.]+"
+    r"|§\s*\d+"
+    r")\s+\S",
+    re.IGNORECASE,
+)
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+_MAX_HEADING_CHARS = 80
+
+
+def _is_heading_line(line: str) -> bool:
+    stripped = line.strip()
+    if not stripped or len(stripped) > _MAX_HEADING_CHARS:
+        return False
+    if _NUMBERED.match(stripped):
+        return True
+    letters = [c for c in stripped if c.isalpha()]
+    return len(letters) >= 3 and all(c.isupper() for c in letters)
+
+
+def _is_standalone_heading(block: str) -> bool:
+    stripped = block.strip()
+    return (
+        "\n" not in stripped
+        and _is_heading_line(stripped)
+        and not stripped.endswith((".", ";", ","))
+    )
+
+
+def _split_paragraph(text: str, base: int) -> List[tuple]:
+    """Splits one paragraph at lines that open a numbered clause."""
+    spans = []
+    start = 0
+    offset = 0
+    for line in text.splitlines(keepends=True):
+        if offset > start and _NUMBERED.match(line):
+            spans.append((base + start, base + offset))
+            start = offset
+        offset += len(line)
+    spans.append((base + start, base + len(text)))
+    return spans
+
+
+def segment_clauses(text: str) -> List[dict]:
+    """
+    Splits a document into clauses.
+
+    Returns:
+        [
+            {
+                "index": int,
+                "heading": str | None,
+                "text": "...clause text...",
+                "start": int,   # offsets into text
+                "end": int
+            },
+            ...
+        ]
+    """
+    spans = []
+    cursor = 0
+    for match in _PARAGRAPH_BREAK.finditer(text):
+        spans.extend(_split_paragraph(text[cursor:match.start()], cursor))
+        cursor = match.end()
+    spans.extend(_split_paragraph(text[cursor:], cursor))
+
+    clauses = []
+    pending_start = None
+    for start, end in spans:
+        block = text[start:end]
+        if not block.strip():
+            continue
+        # A heading on its own ("ARTICLE 7 - TERMINATION") belongs to the
+        # clause that follows it.
+        if _is_standalone_heading(block):
+            if pending_start is None:
+                pending_start = start
+            continue
+        if pending_start is not None:
+            start, pending_start = pending_start, None
+        clauses.append(_make_clause(text, start, end, len(clauses)))
+
+    if pending_start is not None:
+        clauses.append(_make_clause(text, pending_start, len(text), len(clauses)))
+    return clauses
+
+
+def _make_clause(text: str, start: int, end: int, index: int) -> dict:
+    block = text[start:end]
+    start += len(block) - len(block.lstrip())
+    end -= len(block) - len(block.rstrip())
+    clause_text = text[start:end]
+    first_line = clause_text.split("\n", 1)[0]
+    return {
+        "index": index,
+        "heading": first_line.strip() if _is_standalone_heading(first_line) else None,
+        "text": clause_text,
+        "start": start,
+        "end": end,
+    }
+
+
+def _split_oversized(clause: dict, budget: int) -> List[dict]:
+    """Breaks a single clause longer than the budget at whitespace."""
+    pieces = []
+    text = clause["text"]
+    pos = 0
+    while pos < len(text):
+        stop = min(pos + budget, len(text))
+        if stop < len(text):
+            space = text.rfind(" ", pos + budget // 2, stop)
+            if space != -1:
+                stop = space
+        pieces.append({
+            **clause,
+            "text": text[pos:stop].strip(),
+            "start": clause["start"] + pos,
+            "end": clause["start"] + stop,
+        })
+        pos = stop
+    return pieces
+
+
+def chunk_clauses(clauses: List[dict], budget_chars: int) -> List[dict]:
+    """
+    Greedily packs consecutive clauses into chunks of at most budget_chars.
+
+    Returns:
+        [
+            {
+                "index": int,
+                "clauses": [clause_index, ...],
+                "text": "...joined clause text...",
+                "start": int,
+                "end": int
+            },
+            ...
+        ]
+    """
+    budget = max(budget_chars, 1)
+    chunks = []
+    current = []
+    size = 0
+
+    def _flush():
+        if current:
+            chunks.append({
+                "index": len(chunks),
+                "clauses": sorted({c["index"] for c in current}),
+                "text": "\n\n".join(c["text"] for c in current),
+                "start": current[0]["start"],
+                "end": current[-1]["end"],
+            })
+
+    for clause in clauses:
+        for piece in (
+            _split_oversized(clause, budget) if len(clause["text"]) > budget else [clause]
+        ):
+            length = len(piece["text"]) + 2
+            if current and size + length > budget:
+                _flush()
+                current, size = [], 0
+            current.append(piece)
+            size += length
+    _flush()
+    return chunks
+
+
+def risk_fingerprint(risk: dict) -> str:
+    """
+    Identity of a risk for exact de-duplication: the quoted clause if the
+    model gave one, otherwise its title/description.
+    """
+    for field in ("clause", "quote", "clause_text", "text", "title", "risk", "description"):
+        value = risk.get(field)
+        if isinstance(value, str) and value.strip():
+            return normalize_text(value).lower()
+    return repr(sorted(risk.items(), key=lambda kv: kv[0]))
+
+
+def merge_chunk_risks(risk_lists: List[List[dict]]) -> List[dict]:
+    """
+    Reduces per-chunk risk lists into one list.
+
+    Chunks overlap at clause boundaries only through oversized clauses, but
+    the model often repeats document-wide risks (governing law, parties) in
+    every chunk, so identical fingerprints are merged, keeping the most
+    severe copy.
+    """
+    merged = {}
+    for risks in risk_lists:
+        for risk in risks:
+            key = risk_fingerprint(risk)
+            kept = merged.get(key)
+            if kept is None or (
+                SEVERITY_WEIGHTS.get(risk.get("severity"), 1)
+                > SEVERITY_WEIGHTS.get(kept.get("severity"), 1)
+            ):
+                merged[key] = risk
+    return list(merged.values())
@@ -0,0 +1,203 @@
+"""
+Session Management for ClauseGuard
+
+Responsibility:
+- Give each conversation its own ADK session instead of one shared one
+- Run persona passes and summaries in throwaway (stateless) sessions
+- Cap history per conversation, evict idle conversations, and keep the
+  total retained history under a configurable memory ceiling
+"""
+
+import asyncio
+import os
+import time
+import uuid
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+
+SESSION_MAX_EVENTS = int(os.getenv("CLAUSEGUARD_SESSION_MAX_EVENTS", "20"))
+SESSION_IDLE_TTL_SECONDS = float(os.getenv("CLAUSEGUARD_SESSION_TTL", "1800"))
+SESSION_MEMORY_MB = float(os.getenv("CLAUSEGUARD_SESSION_MEMORY_MB", "64"))
+
+_SWEEP_INTERVAL_SECONDS = 60
+
+
+@dataclass
+class _Conversation:
+    session_id: str
+    last_used: float
+    size_bytes: int = 0
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    # The ADK session is created by the first turn, under lock.
+    created: bool = False
+
+
+def _turn_start(events, max_events: int) -> int:
+    """
+    Index of the oldest event to keep so at most max_events remain,
+    moved forward to the start of a turn (a user message) so no turn is
+    cut in half. The latest turn is always kept whole.
+    """
+    starts = [i for i, e in enumerate(events) if e.author == "user"]
+    if not starts:
+        return max(len(events) - max_events, 0)
+    cut = len(events) - max_events
+    return next((i for i in starts if i >= cut), starts[-1])
+
+
+def _event_bytes(events) -> int:
+    total = 0
+    for e in events:
+        if e.content and e.content.parts:
+            total += sum(len(p.text.encode("utf-8")) for p in e.content.parts if p.text)
+    return total
+
+
+class SessionManager:
+    """
+    Owns every ADK session the agent creates.
+    """
+
+    def __init__(
+        self,
+        session_service,
+        app_name: str,
+        user_id: str,
+        max_events: int = SESSION_MAX_EVENTS,
+        idle_ttl_seconds: float = SESSION_IDLE_TTL_SECONDS,
+        memory_limit_bytes: int = int(SESSION_MEMORY_MB * 1024 * 1024),
+    ):
+        self.session_service = session_service
+        self.app_name = app_name
+        self.user_id = user_id
+        self.max_events = max(max_events, 2)
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self.memory_limit_bytes = memory_limit_bytes
+        self._conversations: dict[str, _Conversation] = {}
+        self._last_sweep = time.monotonic()
+        self.evictions = 0
+
+    # ---------- stateless ----------
+
+    @asynccontextmanager
+    async def ephemeral(self):
+        """
+        Yields the id of a fresh session that is deleted on exit.
+        """
+        session_id = f"oneshot-{uuid.uuid4().hex}"
+        await self.session_service.create_session(
+            app_name=self.app_name, user_id=self.user_id, session_id=session_id
+        )
+        try:
+            yield session_id
+        finally:
+            await self._delete(session_id)
+
+    # ---------- per conversation ----------
+
+    @asynccontextmanager
+    async def conversation(self, conversation_id: str):
+        """
+        Yields the session id for conversation_id, creating it on first use.
+
+        Turns within one conversation are serialized so concurrent requests
+        do not interleave their history. On exit the history is trimmed and
+        the memory ceiling enforced.
+        """
+        await self._sweep()
+
+        # Registered before any await, so concurrent first requests for a
+        # conversation share one entry and wait on the same lock.
+        convo = self._conversations.get(conversation_id)
+        if convo is None:
+            convo = _Conversation(
+                session_id=f"conv-{uuid.uuid4().hex}", last_used=time.monotonic()
+            )
+            self._conversations[conversation_id] = convo
+
+        async with convo.lock:
+            if not convo.created:
+                await self.session_service.create_session(
+                    app_name=self.app_name, user_id=self.user_id, session_id=convo.session_id
+                )
+                convo.created = True
+            try:
+                yield convo.session_id
+            finally:
+                convo.last_used = time.monotonic()
+                await self._trim(convo)
+                await self._enforce_memory_limit()
+
+    async def _trim(self, convo: _Conversation) -> None:
+        session = await self.session_service.get_session(
+            app_name=self.app_name, user_id=self.user_id, session_id=convo.session_id
+        )
+        if session is None:
+            convo.size_bytes = 0
+            return
+
+        events = list(session.events)
+        if len(events) > self.max_events:
+            keep = events[_turn_start(events, self.max_events):]
+            # The session service has no way to drop events, so the session
+            # is rebuilt from the kept turns, with its state.
+            await self._delete(convo.session_id)
+            fresh = await self.session_service.create_session(
+                app_name=self.app_name, user_id=self.user_id,
+                state=dict(session.state), session_id=convo.session_id,
+            )
+            for e in keep:
+                await self.session_service.append_event(fresh, e)
+            events = keep
+
+        convo.size_bytes = _event_bytes(events)
+
+    async def _enforce_memory_limit(self) -> None:
+        total = sum(c.size_bytes for c in self._conversations.values())
+        if total <= self.memory_limit_bytes:
+            return
+
+        # Least recently used first; never evict a conversation mid-turn.
+        for key, convo in sorted(
+            self._conversations.items(), key=lambda kv: kv[1].last_used
+        ):
+            if total <= self.memory_limit_bytes:
+                break
+            if convo.lock.locked():
+                continue
+            total -= convo.size_bytes
+            await self._evict(key)
+
+    async def _sweep(self) -> None:
+        now = time.monotonic()
+        if now - self._last_sweep < _SWEEP_INTERVAL_SECONDS:
+            return
+        self._last_sweep = now
+
+        for key, convo in list(self._conversations.items()):
+            if now - convo.last_used > self.idle_ttl_seconds and not convo.lock.locked():
+                await self._evict(key)
+
+    async def _evict(self, conversation_id: str) -> None:
+        convo = self._conversations.pop(conversation_id, None)
+        if convo is not None:
+            self.evictions += 1
+            await self._delete(convo.session_id)
+
+    async def _delete(self, session_id: str) -> None:
+        try:
+            await self.session_service.delete_session(
+                app_name=self.app_name, user_id=self.user_id, session_id=session_id
+            )
+        except Exception as e:
+            print(f"[Session Cleanup Error] {session_id}: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "conversations": len(self._conversations),
+            "history_bytes": sum(c.size_bytes for c in self._conversations.values()),
+            "memory_limit_bytes": self.memory_limit_bytes,
+            "max_events": self.max_events,
+            "idle_ttl_seconds": self.idle_ttl_seconds,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,176 @@
+"""
+Speculative Persona Prefetch for ClauseGuard
+
+Responsibility:
+- Start persona passes in the background while the user is still picking
+  an analysis mode, so the follow-up request is served from the cache
+- Cap how much speculative work runs at once (excess is dropped, not queued)
+- Cancel speculation that is replaced, expires, or was not selected
+"""
+
+import os
+import asyncio
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, Iterable, Optional
+
+from guardian.analysis_cache import abandonable_loads
+from guardian.scheduler import PRIORITY_SPECULATIVE, SchedulerRejected, call_priority
+
+
+# ==================================================
+# CONFIGURATION
+# ==================================================
+
+SPECULATION_ENABLED = os.getenv("CLAUSEGUARD_SPECULATION", "1") == "1"
+# Persona passes that may run speculatively at once, across all documents.
+SPECULATION_MAX_INFLIGHT = int(os.getenv("CLAUSEGUARD_SPECULATION_MAX_INFLIGHT", "4"))
+# Documents with speculation pending; the oldest is cancelled beyond this.
+SPECULATION_MAX_DOCUMENTS = int(os.getenv("CLAUSEGUARD_SPECULATION_MAX_DOCUMENTS", "16"))
+# Unclaimed speculation is cancelled after this many seconds.
+SPECULATION_TTL_SECONDS = float(os.getenv("CLAUSEGUARD_SPECULATION_TTL", "120"))
+
+
+@dataclass
+class _Speculation:
+    document_hash: str
+    tasks: Dict[str, asyncio.Task] = field(default_factory=dict)
+    timer: Optional[asyncio.TimerHandle] = None
+
+
+class SpeculativePrefetcher:
+    """
+    Runs optional persona passes for documents awaiting a mode selection.
+
+    Passes run with abandonable_loads set, so cancelling one also cancels
+    its model call unless a real request has joined it in the meantime;
+    in that case the call finishes and the request gets its result.
+    """
+
+    def __init__(
+        self,
+        run_pass: Callable[[str, str, Optional[str]], Awaitable[object]],
+        enabled: bool = SPECULATION_ENABLED,
+        max_inflight: int = SPECULATION_MAX_INFLIGHT,
+        max_documents: int = SPECULATION_MAX_DOCUMENTS,
+        ttl_seconds: float = SPECULATION_TTL_SECONDS,
+    ):
+        self._run_pass = run_pass
+        self.enabled = enabled
+        self.max_inflight = max_inflight
+        self.max_documents = max_documents
+        self.ttl_seconds = ttl_seconds
+        self._pending: "OrderedDict[str, _Speculation]" = OrderedDict()
+        self._inflight = 0
+        self._counters = {
+            "started": 0,
+            "completed": 0,
+            "failed": 0,
+            "cancelled": 0,
+            "dropped": 0,
+        }
+
+    def start(
+        self,
+        key: str,
+        document: str,
+        document_hash: str,
+        documents: Dict[str, Optional[str]],
+    ) -> int:
+        """
+        Starts speculative passes for key (a conversation or document).
+
+        documents maps each predicted persona to the text its pass would
+        read (None: nothing to analyze). Any earlier speculation under the
+        same key is cancelled. Returns the number of passes started.
+        """
+        if not self.enabled or self.max_inflight <= 0:
+            return 0
+        self.cancel(key)
+
+        loop = asyncio.get_running_loop()
+        spec = _Speculation(document_hash=document_hash)
+        for persona, text in documents.items():
+            if text is None:
+                continue
+            if self._inflight >= self.max_inflight:
+                self._counters["dropped"] += 1
+                continue
+            text_hash = document_hash if text is document else None
+            task = loop.create_task(self._speculate(persona, text, text_hash))
+            task.add_done_callback(lambda t, k=key, p=persona: self._finished(k, p, t))
+            self._inflight += 1
+            self._counters["started"] += 1
+            spec.tasks[persona] = task
+
+        if not spec.tasks:
+            return 0
+        spec.timer = loop.call_later(self.ttl_seconds, self.cancel, key)
+        self._pending[key] = spec
+        while len(self._pending) > self.max_documents:
+            self.cancel(next(iter(self._pending)))
+        return len(spec.tasks)
+
+    def settle(self, key: str, document_hash: str, personas: Iterable[str]) -> None:
+        """
+        Called once the real request arrives: passes for the selected
+        personas keep running (the request joins them through the cache),
+        the rest are cancelled. Speculation for another document is
+        cancelled entirely.
+        """
+        spec = self._pending.pop(key, None)
+        if spec is None:
+            return
+        if spec.timer:
+            spec.timer.cancel()
+        keep = set(personas) if spec.document_hash == document_hash else set()
+        for persona, task in spec.tasks.items():
+            if persona not in keep:
+                task.cancel()
+
+    def cancel(self, key: str) -> None:
+        spec = self._pending.pop(key, None)
+        if spec is None:
+            return
+        if spec.timer:
+            spec.timer.cancel()
+        for task in spec.tasks.values():
+            task.cancel()
+
+    async def _speculate(self, persona: str, text: str, text_hash: Optional[str]):
+        abandonable_loads.set(True)
+        call_priority.set(PRIORITY_SPECULATIVE)
+        try:
+            await self._run_pass(persona, text, text_hash)
+        except SchedulerRejected:
+            # The scheduler is busy with real work; this pass is not needed.
+            self._counters["dropped"] += 1
+
+    def _finished(self, key: str, persona: str, task: asyncio.Task) -> None:
+        self._inflight -= 1
+        if task.cancelled():
+            self._counters["cancelled"] += 1
+        elif task.exception() is not None:
+            self._counters["failed"] += 1
+            print(f"[Speculation Error] {persona}: {task.exception()}")
+        else:
+            self._counters["completed"] += 1
+
+        spec = self._pending.get(key)
+        if spec and spec.tasks.get(persona) is task:
+            del spec.tasks[persona]
+            if not spec.tasks:
+                self.cancel(key)
+
+    # ---------- introspection ----------
+
+    def stats(self) -> dict:
+        return {
+            **self._counters,
+            "inflight": self._inflight,
+            "pending_documents": len(self._pending),
+            "enabled": self.enabled,
+            "max_inflight": self.max_inflight,
+            "max_documents": self.max_documents,
+            "ttl_seconds": self.ttl_seconds,
+        }
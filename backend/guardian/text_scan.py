@@ -0,0 +1,107 @@
+"""
+Keyword Scanning for ClauseGuard
+
+Responsibility:
+- Lowercase a text once and find every keyword of every heuristic in a
+  single pass
+- Match whole words/phrases only ("data" does not match "update")
+- Expose the hits (with offsets) to the intent and sufficiency heuristics
+
+All phrases are compiled into one trie-shaped regular expression, so the
+scan is a single left-to-right pass in the regex engine, Aho-Corasick
+style, regardless of how many keywords or groups there are.
+"""
+
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+_WORD_CHARS = "a-z0-9"
+
+
+def _trie_pattern(phrases: Iterable[str]) -> str:
+    """Builds a regex alternation shaped like a prefix trie of phrases."""
+    trie: dict = {}
+    for phrase in phrases:
+        node = trie
+        for ch in phrase:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def _build(node: dict) -> str:
+        terminal = "" in node
+        branches = [
+            re.escape(ch) + _build(child)
+            for ch, child in sorted(node.items()) if ch != ""
+        ]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return "(?:" + body + ")?" if terminal else body
+
+    return _build(trie)
+
+
+class TextScan:
+    """
+    Result of scanning one text.
+
+    The text is lowercased and scanned on first access to hits, so a
+    heuristic that can decide from the length alone never pays for the
+    scan. hits maps group name -> [(phrase, start, end), ...] in text order.
+    """
+
+    def __init__(self, scanner: "KeywordScanner", text: str):
+        self._scanner = scanner
+        self._text = text or ""
+        self._hits: Optional[Dict[str, List[Tuple[str, int, int]]]] = None
+        self._lowered: Optional[str] = None
+        self.stripped_length = len(self._text.strip())
+
+    @property
+    def lowered(self) -> str:
+        if self._lowered is None:
+            self._lowered = self._text.lower().replace("’", "'")
+        return self._lowered
+
+    @property
+    def hits(self) -> Dict[str, List[Tuple[str, int, int]]]:
+        if self._hits is None:
+            self._hits = self._scanner._find(self.lowered)
+        return self._hits
+
+    def has(self, group: str) -> bool:
+        return bool(self.hits.get(group))
+
+    def phrases(self, group: str) -> set:
+        return {phrase for phrase, _, _ in self.hits.get(group, [])}
+
+
+class KeywordScanner:
+    """
+    Scans for many keyword groups at once.
+
+    groups maps a group name to its phrases; a phrase may belong to
+    several groups.
+    """
+
+    def __init__(self, groups: Dict[str, Iterable[str]]):
+        self.groups = {name: [p.lower() for p in phrases] for name, phrases in groups.items()}
+        self._phrase_groups: Dict[str, List[str]] = {}
+        for name, phrases in self.groups.items():
+            for phrase in phrases:
+                self._phrase_groups.setdefault(phrase, []).append(name)
+
+        self._pattern = re.compile(
+            rf"(?<![{_WORD_CHARS}]){_trie_pattern(self._phrase_groups)}(?![{_WORD_CHARS}])"
+        )
+
+    def scan(self, text: str) -> TextScan:
+        return TextScan(self, text)
+
+    def _find(self, lowered: str) -> Dict[str, List[Tuple[str, int, int]]]:
+        hits = {name: [] for name in self.groups}
+        for match in self._pattern.finditer(lowered):
+            phrase = match.group()
+            for name in self._phrase_groups[phrase]:
+                hits[name].append((phrase, match.start(), match.end()))
+        return hits
@@ -0,0 +1,19 @@
+"""
+Bulk-ingests a directory or archive of contracts (.txt, .md, .pdf).
+
+Writes one canonical record per document as JSON lines, or with --batch a
+single request body for POST /api/analyze/batch. With --manifest, files
+unchanged since the previous run are skipped.
+
+Usage:
+    cd backend
+    python ingest_corpus.py contracts/ --manifest corpus_manifest.json --out records.jsonl
+    python ingest_corpus.py contracts.zip --batch --out batch.json
+"""
+
+import sys
+
+from guardian.document_ingestion import main
+
+if __name__ == "__main__":
+    sys.exit(main())
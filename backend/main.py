@@ -1,18 +1,58 @@
 # backend/main.py
 import os
-import io
 import sys
-from typing import Optional, List
+import json
+import asyncio
+import math
+from typing import Dict, Literal, Optional, List, Union
 from fastapi import FastAPI, UploadFile, File, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-from pypdf import PdfReader
 from dotenv import load_dotenv
 
 # Add the current directory (backend) to sys.path so we can import 'guardian'
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from guardian.agent import run_clauseguard_consensus
+from guardian.agent import (
+    run_clauseguard_consensus_async,
+    sessions,
+    speculation,
+    stream_clauseguard_consensus,
+)
+from guardian.analysis_cache import analysis_cache
+from guardian.document_store import document_store
+from guardian.revisions import (
+    clauses_for,
+    record_clause_risks,
+    run_incremental_analysis,
+    stream_incremental_analysis,
+)
+from guardian.risk_index import risk_index
+from guardian.portfolio_scoring import (
+    RiskColumns,
+    portfolio_aggregates,
+    profile_from,
+    score_portfolio,
+)
+from guardian.followup import (
+    index_for,
+    is_followup_question,
+    run_followup,
+    stream_followup,
+    wants_followup,
+)
+from guardian.batch import BATCH_DEFAULT_CONTEXT, batch_queue
+from guardian.document_ingestion import content_hash, normalize_document
+from guardian.compaction import compact_document
+from guardian.scheduler import SchedulerRejected, scheduler
+from guardian.metrics import collect_timings, metrics, span
+from guardian.pdf_extraction import (
+    UploadTooLarge,
+    extract_pdf_text,
+    read_upload_limited,
+    spool_upload,
+)
 
 # Load environment variables from the local .env (in backend/)
 load_dotenv(os.path.join(os.path.dirname(os.path.abspath(__file__)), '.env'))
@@ -28,42 +68,459 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+PersonaMode = Literal["auto", "legal", "financial", "insurance", "compliance", "full"]
+# "fanout" (one model call per persona) or "consolidated" (one call for all)
+AnalysisMode = Literal["fanout", "consolidated"]
+
 class AnalysisRequest(BaseModel):
-    content: str
+    # Either the id returned by /api/upload or the raw document text.
+    document_id: Optional[str] = None
+    content: Optional[str] = None
     context: str = "general"
-    persona_mode: Optional[str] = "auto"
+    persona_mode: PersonaMode = "auto"
+    conversation_id: Optional[str] = None
+    # Set to the document_id of the prior version to only re-analyze the
+    # clauses that changed.
+    previous_document_id: Optional[str] = None
+    analysis_mode: AnalysisMode = "fanout"
+    # Add a per-stage timing breakdown ("timings") to the response.
+    timings: bool = False
+
+class BatchDocument(BaseModel):
+    document_id: Optional[str] = None
+    content: Optional[str] = None
+    filename: Optional[str] = None
+
+class BatchRequest(BaseModel):
+    documents: List[BatchDocument]
+    context: str = BATCH_DEFAULT_CONTEXT
+    # Any concrete persona mode; "auto" cannot wait for a selection.
+    persona_mode: Literal["legal", "financial", "insurance", "compliance", "full"] = "full"
+    analysis_mode: AnalysisMode = "fanout"
+
+class PortfolioScoreRequest(BaseModel):
+    # Overrides of the severity weights and verdict thresholds; anything
+    # left out keeps the default scoring.
+    weights: Optional[Dict[str, Union[int, float]]] = None
+    do_not_sign_score: Optional[Union[int, float]] = None
+    caution_score: Optional[Union[int, float]] = None
+    top: int = 10
+    # Add every document's score to the response.
+    include_documents: bool = False
+
+# Component stats are read at scrape time and exposed as gauges.
+metrics.gauges("clauseguard_cache", analysis_cache.stats, "Analysis cache statistics.")
+metrics.gauges("clauseguard_sessions", sessions.stats, "Conversation session statistics.")
+metrics.gauges("clauseguard_documents", document_store.stats, "Document store statistics.")
+metrics.gauges("clauseguard_scheduler", scheduler.stats, "Model call scheduler statistics.")
+metrics.gauges("clauseguard_speculation", speculation.stats, "Speculative prefetch statistics.")
+metrics.gauges("clauseguard_batch", batch_queue.stats, "Batch queue statistics.")
+metrics.gauges("clauseguard_risk_index", risk_index.stats, "Portfolio risk index size.")
+
+@app.on_event("startup")
+async def start_batch_workers():
+    resumed = await batch_queue.start()
+    if resumed:
+        print(f"Resumed {resumed} queued batch documents")
+
+@app.on_event("shutdown")
+async def stop_batch_workers():
+    await batch_queue.stop()
 
 @app.post("/api/upload")
 async def upload_document(file: UploadFile = File(...)):
     """Extracts text from PDF or TXT files."""
+    extraction = None
     try:
         if file.content_type == "application/pdf":
-            pdf_content = await file.read()
-            reader = PdfReader(io.BytesIO(pdf_content))
-            text = "".join([page.extract_text() for page in reader.pages])
+            # Spool to disk and extract pages in parallel worker processes.
+            with span("upload.spool"):
+                path = await spool_upload(file, suffix=".pdf")
+            try:
+                with span("upload.pdf_extract"):
+                    extraction = await extract_pdf_text(path)
+            finally:
+                os.unlink(path)
+            text = extraction.pop("text")
         else:
-            text = (await file.read()).decode("utf-8")
-        
-        return {"content": text, "filename": file.filename}
+            with span("upload.read"):
+                text = (await read_upload_limited(file)).decode("utf-8")
+
+        with span("upload.store"):
+            doc = document_store.put(text, filename=file.filename)
+        # Built once here so follow-up questions only search it.
+        with span("upload.index"):
+            index_for(doc)
+        # Also cached: every prompt for this document uses the compacted text.
+        with span("upload.compact"):
+            compaction = compact_document(doc.content)
+        response = {
+            "document_id": doc.document_id,
+            "filename": file.filename,
+            "length": len(doc.content),
+            "preview": doc.content[:500],
+            "compaction": compaction.stats(),
+        }
+        if extraction:
+            response["extraction"] = extraction
+        return response
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Parsing error: {str(e)}")
 
+def get_stored_document(document_id: str):
+    doc = document_store.get(document_id)
+    if doc is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Unknown or expired document_id. Please upload the document again."
+        )
+    return doc
+
+def resolve_document(data: AnalysisRequest):
+    """
+    Returns (doc, content, content_hash) for a request; doc and the hash
+    are None when raw content was sent.
+    """
+    if data.document_id:
+        doc = get_stored_document(data.document_id)
+        return doc, doc.content, doc.content_hash
+    return None, data.content or "", None
+
+def previous_document(data: AnalysisRequest, doc):
+    """The stored prior version a revised upload is diffed against, if any."""
+    if doc is None or not data.previous_document_id:
+        return None
+    return get_stored_document(data.previous_document_id)
+
+def followup_document(data: AnalysisRequest, doc, content: str):
+    """
+    The stored document to answer data.context from retrieved clauses, or
+    None when it needs a full analysis. Raw content asked a follow-up is
+    put in the document store, so it is segmented and indexed once like
+    an upload.
+    """
+    if doc is None:
+        if not content.strip() or not is_followup_question(data.context, content):
+            return None
+        doc = document_store.put(content)
+    return doc if wants_followup(data.context, doc) else None
+
+def overloaded(e: SchedulerRejected) -> HTTPException:
+    """429 when the model queue is full, 503 while the circuit breaker is open."""
+    return HTTPException(
+        status_code=e.status_code,
+        detail=str(e),
+        headers={"Retry-After": str(math.ceil(e.retry_after))},
+    )
+
+def admit():
+    """Refuses a request up front rather than queueing it behind a full scheduler."""
+    try:
+        scheduler.check_admission()
+    except SchedulerRejected as e:
+        raise overloaded(e)
+
+async def index_result(result: dict, doc):
+    """
+    Adds a finished risk analysis of a stored document to the portfolio
+    index, off the event loop. Raw-content requests are not indexed.
+    """
+    if doc is None:
+        return
+    try:
+        await asyncio.to_thread(
+            risk_index.record, result, doc.content, doc.content_hash,
+            doc.document_id, doc.filename, clauses_for(doc),
+        )
+    except Exception as e:
+        print(f"[Risk Index Error] {e}")
+
 @app.post("/api/analyze")
 async def analyze_content(data: AnalysisRequest):
     """Communicates with ClauseGuard consensus engine."""
+    admit()
+    doc, content, document_hash = resolve_document(data)
+    previous = previous_document(data, doc)
+    followup = followup_document(data, doc, content)
     try:
-        # Use the actual ADK-powered consensus engine
-        result = run_clauseguard_consensus(
-            user_query=data.context,
-            file_context=data.content,
-            persona_mode=data.persona_mode
-        )
-        
+        with collect_timings() as timings, span("analyze"):
+            if followup is not None:
+                # Follow-up question: answered from the top-k retrieved clauses.
+                result = await run_followup(
+                    user_query=data.context,
+                    doc=followup,
+                    conversation_id=data.conversation_id
+                )
+            elif previous is not None:
+                # Revised version: only changed clauses go back to the model.
+                result = await run_incremental_analysis(
+                    user_query=data.context,
+                    current=doc,
+                    previous=previous,
+                    persona_mode=data.persona_mode,
+                    conversation_id=data.conversation_id,
+                    analysis_mode=data.analysis_mode
+                )
+            else:
+                # Use the actual ADK-powered consensus engine (async, so the worker
+                # keeps serving other requests while Gemini is thinking)
+                result = await run_clauseguard_consensus_async(
+                    user_query=data.context,
+                    file_context=content,
+                    persona_mode=data.persona_mode,
+                    conversation_id=data.conversation_id,
+                    document_hash=document_hash,
+                    analysis_mode=data.analysis_mode
+                )
+            if doc is not None and previous is None:
+                record_clause_risks(doc, result)
+            await index_result(result, doc)
+
         # Return the raw result from agent.py, allowing frontend to handle different statuses
-        return {
+        response = {
             **result,
             "status_code": "success" 
         }
+        if data.timings:
+            response["timings"] = timings
+        return response
+    except SchedulerRejected as e:
+        raise overloaded(e)
     except Exception as e:
         print(f"Analysis error: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/analyze/stream")
+async def analyze_content_stream(data: AnalysisRequest):
+    """
+    Same as /api/analyze, but streams progress as Server-Sent Events:
+    intent, personas, one persona_result per finished pass, partial_score,
+    and finally result (the response /api/analyze would have returned).
+    """
+    admit()
+    doc, content, document_hash = resolve_document(data)
+
+    previous = previous_document(data, doc)
+    followup = followup_document(data, doc, content)
+    if followup is not None:
+        stream = stream_followup(data.context, followup, data.conversation_id)
+    elif previous is not None:
+        stream = stream_incremental_analysis(
+            user_query=data.context,
+            current=doc,
+            previous=previous,
+            persona_mode=data.persona_mode,
+            conversation_id=data.conversation_id,
+            analysis_mode=data.analysis_mode
+        )
+    else:
+        stream = stream_clauseguard_consensus(
+            user_query=data.context,
+            file_context=content,
+            persona_mode=data.persona_mode,
+            conversation_id=data.conversation_id,
+            document_hash=document_hash,
+            analysis_mode=data.analysis_mode
+        )
+
+    async def events():
+        try:
+            with collect_timings() as timings:
+                async for event in stream:
+                    payload = event["data"]
+                    if event["event"] == "result":
+                        if doc is not None and previous is None:
+                            record_clause_risks(doc, payload)
+                        await index_result(payload, doc)
+                        payload = {**payload, "status_code": "success"}
+                        if data.timings:
+                            payload["timings"] = timings
+                    yield f"event: {event['event']}\ndata: {json.dumps(payload)}\n\n"
+        except SchedulerRejected as e:
+            detail = {"detail": str(e), "status": e.status_code, "retry_after": e.retry_after}
+            yield f"event: error\ndata: {json.dumps(detail)}\n\n"
+        except Exception as e:
+            print(f"Analysis error: {e}")
+            yield f"event: error\ndata: {json.dumps({'detail': str(e)})}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.post("/api/analyze/batch")
+async def analyze_batch(data: BatchRequest):
+    """
+    Queues many documents (uploaded document ids or raw text) for risk
+    analysis and returns the job id and its initial progress.
+    """
+    documents = []
+    for item in data.documents:
+        if item.document_id:
+            doc = get_stored_document(item.document_id)
+            documents.append({
+                "document_id": doc.document_id,
+                "filename": item.filename or doc.filename,
+                "content": doc.content,
+                "content_hash": doc.content_hash,
+            })
+        else:
+            content = normalize_document(item.content or "")
+            documents.append({
+                "filename": item.filename,
+                "content": content,
+                "content_hash": content_hash(content),
+            })
+    try:
+        return await batch_queue.submit(
+            documents, data.context, data.persona_mode, data.analysis_mode
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/api/analyze/batch/{job_id}")
+async def batch_status(job_id: str, include_results: bool = False):
+    """Progress of a batch job; per-document results with include_results=true."""
+    job = await asyncio.to_thread(batch_queue.job, job_id, include_results)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown batch job id.")
+    return job
+
+@app.get("/api/analyze/batch/{job_id}/stream")
+async def batch_stream(job_id: str):
+    """
+    Streams a batch job as Server-Sent Events: a snapshot, then item and
+    progress events as each document finishes.
+    """
+    if await asyncio.to_thread(batch_queue.job, job_id) is None:
+        raise HTTPException(status_code=404, detail="Unknown batch job id.")
+
+    async def events():
+        async for event in batch_queue.events(job_id):
+            yield f"event: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/api/cache/stats")
+async def cache_stats():
+    """Hit/miss counters for the analysis cache, for sizing."""
+    return analysis_cache.stats()
+
+
+@app.get("/api/sessions/stats")
+async def session_stats():
+    """Retained conversation history, for sizing the session memory ceiling."""
+    return sessions.stats()
+
+
+@app.get("/api/documents/stats")
+async def document_stats():
+    """Occupancy of the server-side document store."""
+    return document_store.stats()
+
+
+@app.get("/api/speculation/stats")
+async def speculation_stats():
+    """Speculative persona passes started, dropped and cancelled."""
+    return speculation.stats()
+
+
+@app.get("/api/batch/stats")
+async def batch_stats():
+    """Batch jobs by status and the documents still queued."""
+    return await asyncio.to_thread(batch_queue.stats)
+
+
+@app.get("/api/scheduler/stats")
+async def scheduler_stats():
+    """Model call queue depth per priority, retries and circuit breaker state."""
+    return scheduler.stats()
+
+
+@app.get("/api/portfolio/search")
+async def portfolio_search(
+    q: str,
+    scope: str = "risks",
+    persona: Optional[str] = None,
+    severity: Optional[str] = None,
+    irreversible: Optional[bool] = None,
+    verdict: Optional[str] = None,
+    limit: int = 50
+):
+    """
+    Searches the risks (or, with scope=clauses, the clause text) of every
+    analyzed document, without model calls. severity takes a comma list.
+    """
+    try:
+        return risk_index.search(
+            q, scope, persona,
+            [s.strip() for s in severity.split(",")] if severity else None,
+            irreversible, verdict, limit,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def rescore_portfolio(request: PortfolioScoreRequest) -> dict:
+    profile = profile_from(request.weights, request.do_not_sign_score, request.caution_score)
+    indexed = risk_index.portfolio()
+    with span("portfolio.columns"):
+        columns = RiskColumns.from_documents({h: d["risks"] for h, d in indexed.items()})
+    with span("portfolio.score"):
+        scored = score_portfolio(columns, profile)
+        aggregates = portfolio_aggregates(columns, scored, request.top)
+
+    changed = 0
+    for document in scored["documents"]:
+        stored = indexed[document["document_id"]]
+        if document["verdict"] != stored["verdict"]:
+            changed += 1
+        # Keyed by content hash; report the names users know.
+        document["content_hash"] = document["document_id"]
+        document["document_id"] = stored["document_id"]
+        document["filename"] = stored["filename"]
+
+    response = {
+        "profile": {
+            "weights": profile.weights,
+            "do_not_sign_score": profile.do_not_sign_score,
+            "caution_score": profile.caution_score,
+        },
+        "aggregates": aggregates,
+        "verdicts_changed": changed,
+    }
+    if request.include_documents:
+        response["documents"] = scored["documents"]
+    return response
+
+
+@app.post("/api/portfolio/score")
+async def portfolio_score(request: PortfolioScoreRequest = PortfolioScoreRequest()):
+    """
+    Re-scores every indexed document under the given weights and
+    thresholds in one vectorized pass, without model calls, and returns
+    portfolio aggregates. verdicts_changed counts documents whose verdict
+    differs from the one they were analyzed with.
+    """
+    if request.top < 0:
+        raise HTTPException(status_code=400, detail="top must not be negative")
+    return await asyncio.to_thread(rescore_portfolio, request)
+
+
+@app.get("/api/portfolio/stats")
+async def portfolio_stats():
+    """Returns the size of the portfolio risk index."""
+    return risk_index.stats()
+
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Stage timings, model call counters and component stats in Prometheus text format."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
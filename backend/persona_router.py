@@ -1,8 +1,14 @@
 import json
+import uuid
 from google.adk.agents import LlmAgent
+from google.adk.runners import Runner
+from google.adk.sessions.in_memory_session_service import InMemorySessionService
+from google.genai.types import Content, Part
 
 # Import persona modules (config-only files)
 from guardian.personas import legal, financial, insurance, compliance
+from guardian.scheduler import estimate_tokens, scheduler
+from guardian.metrics import metrics
 
 
 
@@ -78,6 +84,69 @@ Return the required personas as a JSON list.
         return ["legal"]  # Hard safety fallback
 
 
+# Async variant used as the low-confidence fallback of the offline router
+_router_sessions = InMemorySessionService()
+_router_runner = Runner(
+    agent=persona_router,
+    app_name="persona_router_app",
+    session_service=_router_sessions,
+)
+
+# The router only needs the gist of the document, not all of it.
+ROUTER_CONTEXT_CHARS = 4000
+
+
+async def determine_relevant_personas_async(user_input: str, file_context: str | None = None):
+    """
+    Asks the Persona_Router agent which personas are relevant.
+
+    Returns:
+        List[str] of persona keys, or None if the call or its output failed
+        (callers keep their own routing in that case).
+    """
+    context = file_context[:ROUTER_CONTEXT_CHARS] if file_context else "No document provided."
+    prompt = f"""
+User Input:
+{user_input}
+
+Document Context:
+{context}
+
+Return the required personas as a JSON list.
+"""
+    session_id = f"route-{uuid.uuid4().hex}"
+    try:
+        await _router_sessions.create_session(
+            app_name="persona_router_app", user_id="router", session_id=session_id
+        )
+        async def _call():
+            chunks = []
+            async for e in _router_runner.run_async(
+                user_id="router",
+                session_id=session_id,
+                new_message=Content(role="user", parts=[Part(text=prompt)]),
+            ):
+                if e.content:
+                    chunks.extend(p.text for p in e.content.parts if p.text)
+            return "".join(chunks)
+
+        reply = await scheduler.submit(_call, estimate_tokens(prompt))
+        try:
+            selected = json.loads(reply.strip())
+        except ValueError:
+            metrics.inc("clauseguard_parse_failures_total", kind="router")
+            raise
+        valid = [key for key in selected if key in AVAILABLE_PERSONAS]
+        return valid or None
+    except Exception as e:
+        print(f"[Persona Router Error] {e}")
+        return None
+    finally:
+        await _router_sessions.delete_session(
+            app_name="persona_router_app", user_id="router", session_id=session_id
+        )
+
+
 # Persona Loader Helper
 def get_persona_modules(persona_keys: list[str]):
     """
@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+
+from guardian import batch
+from guardian.batch import ITEM_DONE, ITEM_FAILED, JOB_COMPLETED, BatchQueue
+from guardian.scheduler import SchedulerOverloaded
+
+RESULT = {"status": "RISK_ANALYSIS", "risk_analysis": {"verdict": "SAFE", "total_risk_score": 0}}
+
+
+@pytest.fixture(autouse=True)
+def no_risk_index(monkeypatch):
+    recorded = []
+    monkeypatch.setattr(batch.risk_index, "record", lambda result, *args: recorded.append(result))
+    return recorded
+
+
+async def _run(queue, documents):
+    await queue.start()
+    try:
+        job = await queue.submit(documents)
+        events = [e async for e in queue.events(job["job_id"])]
+        return await asyncio.to_thread(queue.job, job["job_id"]), events
+    finally:
+        await queue.stop()
+
+
+def test_documents_run_to_completion(tmp_path, no_risk_index):
+    async def analyze(*args):
+        return RESULT
+
+    queue = BatchQueue(db_path=str(tmp_path / "batch.db"), workers=2, analyze=analyze)
+    job, events = asyncio.run(_run(queue, [{"content": "a"}, {"content": "b"}]))
+    assert job["status"] == JOB_COMPLETED
+    assert [d["status"] for d in job["documents"]] == [ITEM_DONE, ITEM_DONE]
+    assert job["documents"][0]["verdict"] == "SAFE"
+    assert events[0]["event"] == "snapshot"
+    assert len(no_risk_index) == 2
+
+
+def test_rejected_documents_are_queued_again(tmp_path):
+    attempts = []
+
+    async def analyze(context, content, *args):
+        attempts.append(content)
+        if attempts.count(content) == 1:
+            raise SchedulerOverloaded("Too many requests.", retry_after=0.01)
+        return RESULT
+
+    queue = BatchQueue(db_path=str(tmp_path / "batch.db"), workers=1, analyze=analyze)
+    job, _ = asyncio.run(_run(queue, [{"content": "a"}, {"content": "b"}]))
+    assert job["status"] == JOB_COMPLETED
+    assert job["done"] == 2 and job["failed"] == 0
+    assert sorted(attempts) == ["a", "a", "b", "b"]
+
+
+def test_other_errors_fail_the_document(tmp_path):
+    async def analyze(context, content, *args):
+        if content == "bad":
+            raise ValueError("broken document")
+        return RESULT
+
+    queue = BatchQueue(db_path=str(tmp_path / "batch.db"), workers=1, analyze=analyze)
+    job, _ = asyncio.run(_run(queue, [{"content": "bad"}, {"content": "good"}]))
+    assert [d["status"] for d in job["documents"]] == [ITEM_FAILED, ITEM_DONE]
+    assert job["documents"][0]["error"] == "broken document"
+
+
+def test_submit_validates_modes(tmp_path):
+    queue = BatchQueue(db_path=str(tmp_path / "batch.db"))
+    with pytest.raises(ValueError):
+        asyncio.run(queue.submit([{"content": "a"}], persona_mode="auto"))
+    with pytest.raises(ValueError):
+        asyncio.run(queue.submit([{"content": "a"}], analysis_mode="bogus"))
+    with pytest.raises(ValueError):
+        asyncio.run(queue.submit([]))
@@ -0,0 +1,89 @@
+import re
+
+from guardian.compaction import compact_document, fit_to_budget
+from guardian.document_ingestion import normalize_text
+
+BODIES = [
+    "1. Payment\nThe customer shall pay all fees within thirty days of the invoice date.\n"
+    "Late payments carry interest at two percent per month.",
+    "2. Term\nThis agreement renews automatically for successive twelve month periods unless\n"
+    "terminated by either party.",
+    "3. Liability\nThe supplier's aggregate liability is limited to the fees paid in the "
+    "preceding twelve months.",
+]
+PAGED = "\n".join(
+    f"ACME SERVICES AGREEMENT\n\n{body}\n\nPage {i + 1} of {len(BODIES)}"
+    for i, body in enumerate(BODIES)
+)
+
+
+def test_running_headers_and_page_numbers_are_removed():
+    compaction = compact_document(PAGED)
+    assert "ACME SERVICES AGREEMENT" not in compaction.text
+    assert "Page 2 of 3" not in compaction.text
+    assert compaction.text == "\n\n".join(BODIES)
+    removed = compaction.stats()["removed"]
+    assert removed["headers_footers"] == 3
+    assert removed["page_numbers"] == 3
+
+
+def test_every_word_maps_back_to_the_same_word():
+    compaction = compact_document(PAGED)
+    for match in re.finditer(r"\S+", compaction.text):
+        start, end = compaction.original_span(match.start(), match.end())
+        assert PAGED[start:end] == match.group()
+
+
+def test_locate_returns_original_offsets():
+    quote = "interest at two percent per month"
+    start, end = compact_document(PAGED).locate(quote)
+    assert PAGED[start:end] == quote
+
+
+def test_locate_tolerates_whitespace_and_unknown_quotes():
+    compaction = compact_document(PAGED)
+    start, end = compaction.locate("renews  automatically\nfor successive")
+    assert normalize_text(PAGED[start:end]) == "renews automatically for successive"
+    assert compaction.locate("not in the document at all") is None
+    assert compaction.locate("") is None
+
+
+def test_hyphenation_and_space_runs_keep_offsets():
+    text = "The supplier shall indemni-\nfication of all claims.   Extra   spaces here."
+    compaction = compact_document(text)
+    assert compaction.text == "The supplier shall indemnification of all claims. Extra spaces here."
+    start, end = compaction.locate("spaces here.")
+    assert text[start:end] == "spaces here."
+    start, end = compaction.locate("indemnification of all claims")
+    assert text[start:end] == "indemni-\nfication of all claims"
+
+
+def test_lines_repeated_mid_page_are_kept():
+    line = "The customer may terminate on thirty days notice."
+    text = "\n".join(
+        f"Header {i}\nIntro paragraph number {i}.\n{line}\nClosing paragraph {i}.\nFooter {i}"
+        for i in range(4)
+    )
+    assert compact_document(text).text.count(line) == 4
+
+
+def test_identical_pages_are_never_compacted_away():
+    page = "Identical page text that repeats.\nSecond line of the page."
+    text = "\n\n".join([page] * 4)
+    compaction = compact_document(text)
+    assert compaction.text.count("Identical page text that repeats.") == 4
+
+
+def test_fit_to_budget_cuts_on_a_clause_boundary():
+    text = "\n\n".join(f"{i}. Clause {i}\n" + " ".join(["word"] * 400) for i in range(1, 40))
+    kept, decision = fit_to_budget(text, budget_tokens=4000)
+    assert decision["decision"] == "truncate"
+    assert text.startswith(kept)
+    assert text[len(kept):].startswith("\n\n")
+    assert decision["kept_tokens"] <= 4000
+
+
+def test_fit_to_budget_leaves_short_documents_alone():
+    kept, decision = fit_to_budget("\n\n".join(BODIES))
+    assert kept == "\n\n".join(BODIES)
+    assert decision["decision"] == "fits"
@@ -0,0 +1,68 @@
+from guardian.deduplication import merge_duplicate_risks, quoted_clause
+
+RENEWAL = (
+    "This Agreement renews automatically for successive periods of twelve months "
+    "unless either party gives written notice of non-renewal."
+)
+LIABILITY = (
+    "Neither party's aggregate liability shall exceed the fees paid in the twelve "
+    "months preceding the claim, save for fraud or wilful misconduct."
+)
+
+
+def _risk(persona, clause, severity="MEDIUM", **extra):
+    return {"persona": persona, "title": f"{persona} finding", "clause": clause,
+            "severity": severity, **extra}
+
+
+def test_near_identical_quotes_from_two_personas_merge():
+    risks = [
+        _risk("legal", RENEWAL, "MEDIUM"),
+        _risk("financial", RENEWAL.replace("Agreement", "agreement") + " ", "HIGH", irreversible=True),
+        _risk("legal", LIABILITY),
+    ]
+    merged = merge_duplicate_risks(risks)
+    assert len(merged) == 2
+    first = merged[0]
+    assert first["personas"] == ["legal", "financial"]
+    assert first["merged_risks"] == 2
+    assert first["severity"] == "HIGH"
+    assert first["irreversible"] is True
+    assert merged[1] is risks[2]
+
+
+def test_one_persona_never_merges_with_itself():
+    risks = [_risk("legal", RENEWAL), _risk("legal", RENEWAL)]
+    assert merge_duplicate_risks(risks) == risks
+
+
+def test_groups_hold_at_most_one_risk_per_persona():
+    risks = [_risk("legal", RENEWAL), _risk("financial", RENEWAL), _risk("legal", RENEWAL + " Today.")]
+    merged = merge_duplicate_risks(risks)
+    assert len(merged) == 2
+    assert merged[0]["personas"] == ["legal", "financial"]
+    assert merged[1] is risks[2]
+
+
+def test_different_clauses_stay_apart():
+    risks = [_risk("legal", RENEWAL), _risk("financial", LIABILITY)]
+    assert merge_duplicate_risks(risks) == risks
+
+
+def test_threshold_controls_how_close_quotes_must_be():
+    edited = RENEWAL.replace("written", "prior")
+    risks = [_risk("legal", RENEWAL), _risk("financial", edited)]
+    assert len(merge_duplicate_risks(risks, similarity=0.95)) == 2
+    assert len(merge_duplicate_risks(risks, similarity=0.6)) == 1
+
+
+def test_risks_without_a_quote_pass_through():
+    risks = [{"persona": "legal", "title": "Vague"}, {"persona": "financial", "title": "Vague"}]
+    assert quoted_clause(risks[0]) is None
+    assert merge_duplicate_risks(risks) == risks
+
+
+def test_inputs_are_not_modified():
+    risks = [_risk("legal", RENEWAL), _risk("financial", RENEWAL)]
+    merge_duplicate_risks(risks)
+    assert "personas" not in risks[0] and "personas" not in risks[1]
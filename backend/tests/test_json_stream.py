@@ -0,0 +1,84 @@
+import pytest
+
+from guardian.json_stream import (
+    PARSE_INVALID,
+    PARSE_MALFORMED,
+    PARSE_NO_JSON,
+    PARSE_TRUNCATED,
+    RiskStreamParser,
+    parse_risks,
+)
+
+RESPONSE = (
+    "Here is the analysis:\n```json\n"
+    '[{"title": "Auto renewal", "clause": "renews [yearly] {unless} \\"noticed\\"",'
+    ' "severity": "high", "irreversible": "true"},'
+    ' {"clause": "No refunds", "severity": "LOW"}]\n'
+    "```\nLet me know if you need more."
+)
+
+
+def test_fences_and_prose_around_the_array_are_ignored():
+    parser = parse_risks(RESPONSE)
+    assert parser.failures == {}
+    assert [r.get("title") for r in parser.risks] == ["Auto renewal", None]
+    assert parser.risks[0]["clause"] == 'renews [yearly] {unless} "noticed"'
+
+
+def test_severity_and_irreversible_are_normalized():
+    risk = parse_risks(RESPONSE).risks[0]
+    assert risk["severity"] == "HIGH"
+    assert risk["irreversible"] is True
+
+
+@pytest.mark.parametrize("size", [1, 2, 7, 64])
+def test_any_split_of_the_stream_gives_the_same_risks(size):
+    seen = []
+    parser = RiskStreamParser(on_risk=seen.append)
+    for i in range(0, len(RESPONSE), size):
+        parser.feed(RESPONSE[i:i + size])
+    assert parser.close() == parse_risks(RESPONSE).risks
+    assert seen == parser.risks
+
+
+def test_risks_are_reported_as_soon_as_they_complete():
+    parser = RiskStreamParser()
+    assert parser.feed('[{"title": "A"}, {"title": "B"') == [{"title": "A"}]
+    assert parser.feed("}]") == [{"title": "B"}]
+
+
+def test_truncated_array_keeps_complete_objects():
+    parser = parse_risks('[{"title": "A"}, {"title": "B"}, {"title": "C", "sev')
+    assert parser.risks == [{"title": "A"}, {"title": "B"}]
+    assert parser.failures == {PARSE_TRUNCATED: 1}
+
+
+def test_unusable_elements_are_counted_and_skipped():
+    parser = parse_risks('[{"title": "A"}, 5, {"foo": 1}, {"title": }]')
+    assert parser.risks == [{"title": "A"}]
+    assert parser.failures == {PARSE_INVALID: 2, PARSE_MALFORMED: 1}
+
+
+def test_wrapper_object_and_single_object():
+    assert parse_risks('{"risks": [{"title": "A"}]}').risks == [{"title": "A"}]
+    assert parse_risks('{"title": "solo"}').risks == [{"title": "solo"}]
+
+
+def test_empty_array_is_a_clean_answer():
+    parser = parse_risks("[]")
+    assert parser.risks == [] and parser.failures == {}
+
+
+def test_no_json_at_all_is_a_failure():
+    parser = parse_risks("I could not find any risks in this document.")
+    assert parser.risks == []
+    assert parser.failures == {PARSE_NO_JSON: 1}
+
+
+def test_reset_starts_over():
+    parser = RiskStreamParser()
+    parser.feed('[{"title": "A"')
+    parser.reset()
+    parser.feed('[{"title": "B"}]')
+    assert parser.close() == [{"title": "B"}]
+    assert parser.failures == {}
@@ -0,0 +1,72 @@
+import copy
+import random
+
+import pytest
+
+from guardian.portfolio_scoring import RiskColumns, portfolio_aggregates, profile_from, score_portfolio
+from guardian.risk_scoring import score_risks
+
+SEVERITIES = ["LOW", "MEDIUM", "HIGH", "CRITICAL", "SEVERE", None, 3]
+SCORE_FIELDS = ("total_risk_score", "irreversibility_index", "irreversible_risks", "critical_risks", "verdict")
+
+PROFILES = {
+    "default": profile_from(),
+    "float weights": profile_from({"LOW": 0.5, "MEDIUM": 2.5, "HIGH": 7.25}, 22.5, 10.1),
+    "strict": profile_from({"HIGH": 9, "CRITICAL": 20, "SEVERE": 8}, 15, 6),
+}
+
+
+def _portfolio(documents=300, seed=11):
+    rng = random.Random(seed)
+    portfolio = {}
+    for i in range(documents):
+        risks = []
+        for _ in range(rng.randint(0, 12)):
+            risk = {"persona": rng.choice(["legal", "financial"]), "title": rng.choice(["Renewal", "Liability"])}
+            if rng.random() < 0.9:
+                risk["severity"] = rng.choice(SEVERITIES)
+            if rng.random() < 0.3:
+                risk["irreversible"] = rng.choice([True, "yes", False])
+            risks.append(risk)
+        portfolio[f"doc-{i}"] = risks
+    return portfolio
+
+
+@pytest.mark.parametrize("label", sorted(PROFILES))
+def test_vectorized_scores_match_score_risks(label):
+    profile = PROFILES[label]
+    portfolio = _portfolio()
+    expected = {k: score_risks(v, profile) for k, v in copy.deepcopy(portfolio).items()}
+    scored = score_portfolio(RiskColumns.from_documents(portfolio), profile)
+    assert [d["document_id"] for d in scored["documents"]] == list(portfolio)
+    for document in scored["documents"]:
+        want = expected[document["document_id"]]
+        for name in SCORE_FIELDS:
+            got = document[name]
+            assert got == want[name], (document["document_id"], name)
+            assert type(got) is type(want[name]), (document["document_id"], name)
+        assert document["risks"] == len(portfolio[document["document_id"]])
+
+
+def test_from_documents_leaves_risks_untouched():
+    portfolio = _portfolio(20)
+    before = copy.deepcopy(portfolio)
+    RiskColumns.from_documents(portfolio)
+    assert portfolio == before
+
+
+def test_empty_portfolio():
+    columns = RiskColumns.from_documents({"a": [], "b": []})
+    scored = score_portfolio(columns)
+    assert [d["risks"] for d in scored["documents"]] == [0, 0]
+    want = score_risks([])
+    assert all(d["verdict"] == want["verdict"] for d in scored["documents"])
+    portfolio_aggregates(columns, scored)
+
+
+def test_aggregates_count_every_document():
+    portfolio = _portfolio(50)
+    columns = RiskColumns.from_documents(portfolio)
+    aggregates = portfolio_aggregates(columns, score_portfolio(columns))
+    assert aggregates["documents"] == 50
+    assert sum(aggregates["verdicts"].values()) == 50
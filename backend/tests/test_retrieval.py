@@ -0,0 +1,66 @@
+from guardian.retrieval import ClauseIndex, excerpt, select_within_budget
+from guardian.segmentation import segment_clauses
+
+CONTRACT = (
+    "1. Payment\nThe customer pays all invoices within thirty days of receipt.\n"
+    "2. Late payment\nLate payments accrue interest at two percent per month.\n"
+    "3. Termination\nEither party may terminate this agreement on ninety days notice.\n"
+    "4. Confidentiality\nEach party keeps the other's information confidential."
+)
+
+
+def _index():
+    return ClauseIndex(segment_clauses(CONTRACT))
+
+
+def _first_lines(hits):
+    return [hit["clause"]["text"].split("\n", 1)[0] for hit in hits]
+
+
+def test_bm25_ranks_the_matching_clause_first():
+    hits = _index().search("How much interest on late payments?", k=2)
+    assert _first_lines(hits)[0] == "2. Late payment"
+    assert hits[0]["score"] > hits[1]["score"]
+
+
+def test_referenced_clause_is_pinned_first():
+    hits = _index().search("What does clause 3 say about payments?", k=4)
+    assert _first_lines(hits)[0] == "3. Termination"
+    assert "2. Late payment" in _first_lines(hits)
+
+
+def test_unmatched_query_returns_nothing():
+    assert _index().search("zebra", k=3) == []
+    assert _index().search("payment", k=0) == []
+
+
+def test_budget_keeps_hits_in_rank_order():
+    hits = _index().search("payment interest terminate notice", k=4)
+    budget = sum(len(h["clause"]["text"]) for h in hits[:2]) + 5
+    kept = select_within_budget(hits, budget)
+    assert kept == hits[:2]
+    assert sum(len(h["clause"]["text"]) for h in kept) <= budget
+
+
+def test_no_budget_keeps_everything():
+    hits = _index().search("payment", k=4)
+    assert select_within_budget(hits, None) == hits
+    assert select_within_budget(hits, 0) == hits
+
+
+def test_oversized_first_hit_becomes_an_excerpt_around_the_query():
+    text = "1. Fees\n" + "filler " * 300 + "A termination fee of one million applies. " + "filler " * 300
+    hits = ClauseIndex(segment_clauses(text)).search("termination fee", k=1)
+    kept = select_within_budget(hits, 200, "termination fee")
+    assert len(kept) == 1
+    clause = kept[0]["clause"]
+    assert clause["truncated"] is True
+    assert len(clause["text"]) <= 200
+    assert "termination fee" in clause["text"]
+    assert "truncated" not in hits[0]["clause"]
+
+
+def test_excerpt_falls_back_to_the_start():
+    text = "abc " * 100
+    assert excerpt(text, "zebra", 40) == text[:40]
+    assert excerpt("short", "zebra", 40) == "short"
@@ -0,0 +1,52 @@
+import asyncio
+
+from guardian import agent, revisions
+from guardian.document_store import DocumentStore
+
+TERM = "\n\n3. Term\nThis agreement starts on the signature date and lasts for two years."
+OLD = (
+    "1. Services\nThe supplier provides hosting services to the customer.\n\n"
+    "2. Fees\nThe customer pays the monthly fee within thirty days." + TERM
+)
+NEW = (
+    "1. Services\nThe supplier provides hosting services to the customer.\n\n"
+    "2. Fees\nThe customer pays the monthly fee within fourteen days." + TERM
+)
+
+
+def _analyze(monkeypatch, previous_risks):
+    calls = []
+
+    async def no_risks(persona, document, document_hash=None):
+        calls.append(document)
+        return []
+
+    monkeypatch.setattr(agent, "_run_single_persona_pass", no_risks)
+    store = DocumentStore()
+    previous, current = store.put(OLD), store.put(NEW)
+    clauses = revisions.clauses_for(previous)
+    previous.extras["clause_risks"] = {"legal": {clauses[0]["hash"]: previous_risks}}
+    result = asyncio.run(revisions.run_incremental_analysis(
+        "Is this contract safe to sign?", current, previous, persona_mode="legal"
+    ))
+    return result, calls
+
+
+def test_only_changed_clauses_are_reanalyzed(monkeypatch):
+    risk = {"persona": "legal", "title": "Hosting scope", "severity": "LOW",
+            "clause": "The supplier provides hosting services to the customer."}
+    result, calls = _analyze(monkeypatch, [risk])
+    assert len(calls) == 1 and "fourteen days" in calls[0] and "hosting" not in calls[0]
+    (kept,) = result["risk_analysis"]["scored_risks"]
+    start, end = kept["location"]["start"], kept["location"]["end"]
+    assert NEW[start:end] == risk["clause"]
+    assert result["revision"]["unchanged_risks"] == 1
+
+
+def test_reused_risks_drop_offsets_into_the_previous_version(monkeypatch):
+    stale = {"persona": "legal", "title": "Hosting scope", "severity": "LOW",
+             "clause": "Supplier hosts things for the customer (paraphrased).",
+             "location": {"start": 40, "end": 95}}
+    result, _ = _analyze(monkeypatch, [stale])
+    (kept,) = result["risk_analysis"]["scored_risks"]
+    assert "location" not in kept
@@ -0,0 +1,69 @@
+from guardian.portfolio_scoring import RiskColumns, portfolio_aggregates, score_portfolio
+from guardian.risk_index import RiskIndex
+
+CONTENT = (
+    "1. Renewal\nThis agreement renews automatically for successive one-year terms.\n\n"
+    "2. Fees\nLate payments accrue interest at two percent per month."
+)
+
+
+def _result(risks):
+    return {
+        "status": "RISK_ANALYSIS",
+        "personas_used": ["legal", "financial"],
+        "risk_analysis": {"verdict": "PROCEED WITH CAUTION", "total_risk_score": 8, "scored_risks": risks},
+    }
+
+
+MERGED = {
+    "persona": "legal", "personas": ["legal", "financial"], "merged_risks": 2,
+    "title": "Automatic renewal", "severity": "HIGH", "irreversible": False, "score": 5,
+    "clause": "This agreement renews automatically for successive one-year terms.",
+    "explanation": "The contract continues unless cancelled in time.",
+}
+INTEREST = {
+    "persona": "financial", "title": "Late payment interest", "severity": "MEDIUM",
+    "score": 3, "clause": "Late payments accrue interest at two percent per month.",
+}
+
+
+def _index(tmp_path):
+    index = RiskIndex(str(tmp_path / "risks.db"))
+    index.record(_result([dict(MERGED), dict(INTEREST)]), CONTENT, document_id="doc-1")
+    return index
+
+
+def test_search_by_a_secondary_persona_finds_the_merged_risk(tmp_path):
+    index = _index(tmp_path)
+    for persona in ("legal", "financial"):
+        hits = index.search("renews automatically", persona=persona)["hits"]
+        assert [h["title"] for h in hits] == ["Automatic renewal"]
+        assert hits[0]["personas"] == ["legal", "financial"]
+    assert index.search("renews automatically", persona="insurance")["hits"] == []
+    assert [h["title"] for h in index.search("interest", persona="financial")["hits"]] == [
+        "Late payment interest"
+    ]
+
+
+def test_re_recording_replaces_the_persona_links(tmp_path):
+    index = _index(tmp_path)
+    index.record(_result([dict(INTEREST)]), CONTENT, document_id="doc-1")
+    assert index.search("renews automatically", persona="financial")["hits"] == []
+    assert index.stats()["risks"] == 1
+    assert index.search("renews automatically", scope="clauses")["hits"]
+
+
+def test_portfolio_counts_every_contributing_persona(tmp_path):
+    documents = {h: d["risks"] for h, d in _index(tmp_path).portfolio().items()}
+    (risks,) = documents.values()
+    assert [r["personas"] for r in risks] == [["legal", "financial"], ["financial"]]
+    columns = RiskColumns.from_documents(documents)
+    aggregates = portfolio_aggregates(columns, score_portfolio(columns))
+    assert aggregates["risks"] == 2
+    assert aggregates["personas"] == {"financial": 2, "legal": 1}
+
+
+def test_other_results_are_not_stored(tmp_path):
+    index = RiskIndex(str(tmp_path / "risks.db"))
+    assert index.record({"status": "INFO", "message": "hi"}, CONTENT) is False
+    assert index.stats()["documents"] == 0
@@ -0,0 +1,64 @@
+import asyncio
+
+from guardian import agent
+from guardian.rule_engine import run_rules, skipped_clauses, standing_rule_risks
+from guardian.segmentation import segment_clauses
+
+CAPPED = (
+    "Each party shall indemnify the other against third-party claims, including without "
+    "limitation reasonable attorneys' fees, subject to the cap in Section 9."
+)
+UNCAPPED = "The Customer shall indemnify the Supplier against any and all losses arising from its use."
+
+
+def _rule_ids(text, personas=("legal",)):
+    return [r["rule_id"] for r in run_rules(text, list(personas))]
+
+
+def test_capped_indemnity_is_not_flagged():
+    assert _rule_ids(CAPPED) == []
+    assert _rule_ids("The Supplier shall indemnify the Customer without limitation of its other remedies.") == []
+    assert _rule_ids("The Customer shall indemnify the Supplier for any and all claims, limited to the fees paid.") == []
+
+
+def test_uncapped_indemnity_is_flagged():
+    assert _rule_ids(UNCAPPED) == ["legal.uncapped_indemnity"]
+    assert _rule_ids("The Customer shall indemnify the Supplier without limit.") == ["legal.uncapped_indemnity"]
+    assert _rule_ids(
+        "The Customer shall indemnify the Supplier against any and all claims, including but not limited to fines."
+    ) == ["legal.uncapped_indemnity"]
+
+
+def test_rule_hits_carry_their_clause():
+    document = "1. Fees\nFees are due monthly.\n\n2. Indemnity\n" + UNCAPPED
+    (risk,) = run_rules(document, ["legal"])
+    assert document[risk["start"]:risk["end"]] == risk["clause"]
+    assert risk["clause_index"] == 1 and risk["source"] == "rule"
+
+
+def test_only_hits_on_skipped_clauses_stand():
+    document = "1. Renewal\nThis agreement renews automatically each year.\n\n2. Indemnity\n" + UNCAPPED
+    clauses = segment_clauses(document)
+    rule_risks = run_rules(document, ["legal"], clauses)
+    assert standing_rule_risks(rule_risks, "legal", {}) == []
+    skipped = skipped_clauses(["legal"], clauses, rule_risks)
+    assert skipped == {"legal": set()}  # every clause covered: the pass reads all of them
+    assert standing_rule_risks(rule_risks, "legal", {"legal": {0}}) == [rule_risks[0]]
+
+
+def test_model_pass_replaces_rule_hits(monkeypatch):
+    async def no_risks(persona, document, document_hash=None):
+        return []
+
+    monkeypatch.setattr(agent, "_run_persona_pass", no_risks)
+    document = "1. Fees\nThe customer pays monthly.\n\n2. Indemnity\n" + UNCAPPED
+
+    async def collect():
+        return [e async for e in agent.stream_clauseguard_consensus(
+            "Is this contract safe to sign?", document, persona_mode="legal"
+        )]
+
+    events = {e["event"]: e["data"] for e in asyncio.run(collect())}
+    assert events["provisional"]["verdict"] == "DO NOT SIGN"
+    assert events["persona_result"]["risks"] == []
+    assert events["result"]["status"] == "INFO"
@@ -0,0 +1,271 @@
+import asyncio
+
+import pytest
+
+from guardian import agent
+from guardian.scheduler import (
+    PRIORITY_BATCH,
+    PRIORITY_INTERACTIVE,
+    PRIORITY_SPECULATIVE,
+    CircuitOpen,
+    LLMScheduler,
+    SchedulerOverloaded,
+    SchedulerRejected,
+    SharedPriority,
+    TokenBucket,
+    shared_priority,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _scheduler(clock=None, **kwargs):
+    options = dict(requests_per_second=0, tokens_per_minute=0, concurrency=1, retries=0)
+    options.update(kwargs)
+    return LLMScheduler(clock=clock or FakeClock(), **options)
+
+
+async def _hold(scheduler, started, release):
+    async def call():
+        started.set()
+        await release.wait()
+        return "held"
+    return await scheduler.submit(call, priority=PRIORITY_INTERACTIVE)
+
+
+def _recording(order, name):
+    async def call():
+        order.append(name)
+        return name
+    return call
+
+
+def test_token_bucket_refills_with_the_clock():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2, capacity=2, clock=clock)
+    bucket.consume(2)
+    assert bucket.wait_time(1) == pytest.approx(0.5)
+    clock.now += 0.25
+    assert bucket.wait_time(1) == pytest.approx(0.25)
+    clock.now += 0.25
+    assert bucket.wait_time(1) == 0.0
+
+
+def test_token_bucket_debt_delays_later_callers():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=10, capacity=10, clock=clock)
+    bucket.consume(15)
+    assert bucket.wait_time(1) == pytest.approx(0.6)
+
+
+def test_unlimited_bucket_never_waits():
+    bucket = TokenBucket(rate=0, capacity=1, clock=FakeClock())
+    bucket.consume(1000)
+    assert bucket.wait_time(1000) == 0.0
+
+
+def test_interactive_calls_go_before_queued_batch_calls():
+    async def scenario():
+        scheduler = _scheduler()
+        started, release = asyncio.Event(), asyncio.Event()
+        order = []
+        holder = asyncio.ensure_future(_hold(scheduler, started, release))
+        await started.wait()
+        batch = asyncio.ensure_future(
+            scheduler.submit(_recording(order, "batch"), priority=PRIORITY_BATCH)
+        )
+        await asyncio.sleep(0)
+        interactive = asyncio.ensure_future(
+            scheduler.submit(_recording(order, "interactive"), priority=PRIORITY_INTERACTIVE)
+        )
+        await asyncio.sleep(0)
+        assert scheduler.stats()["queued"] == {"interactive": 1, "batch": 1, "speculative": 0}
+        release.set()
+        await asyncio.gather(holder, batch, interactive)
+        return order
+
+    assert asyncio.run(scenario()) == ["interactive", "batch"]
+
+
+def test_promoted_shared_work_moves_ahead_of_batch():
+    async def scenario():
+        scheduler = _scheduler()
+        started, release = asyncio.Event(), asyncio.Event()
+        order = []
+        holder = asyncio.ensure_future(_hold(scheduler, started, release))
+        await started.wait()
+
+        shared = SharedPriority(PRIORITY_SPECULATIVE)
+
+        async def speculative():
+            shared_priority.set(shared)
+            # Admitted before anything else is queued, then waits for the slot.
+            return await scheduler.submit(_recording(order, "speculative"))
+
+        spec = asyncio.ensure_future(speculative())
+        await asyncio.sleep(0)
+        batch = asyncio.ensure_future(
+            scheduler.submit(_recording(order, "batch"), priority=PRIORITY_BATCH)
+        )
+        await asyncio.sleep(0)
+        shared.promote(PRIORITY_INTERACTIVE)
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(holder, spec, batch)
+        return order
+
+    assert asyncio.run(scenario()) == ["speculative", "batch"]
+
+
+def test_speculation_is_refused_once_anything_is_queued():
+    async def scenario():
+        scheduler = _scheduler()
+        started, release = asyncio.Event(), asyncio.Event()
+        holder = asyncio.ensure_future(_hold(scheduler, started, release))
+        await started.wait()
+        queued = asyncio.ensure_future(
+            scheduler.submit(_recording([], "batch"), priority=PRIORITY_BATCH)
+        )
+        await asyncio.sleep(0)
+        with pytest.raises(SchedulerOverloaded):
+            await scheduler.submit(_recording([], "spec"), priority=PRIORITY_SPECULATIVE)
+        release.set()
+        await asyncio.gather(holder, queued)
+
+    asyncio.run(scenario())
+
+
+def test_full_queue_rejects_interactive_work_with_429():
+    async def scenario():
+        scheduler = _scheduler(max_queue=1)
+        started, release = asyncio.Event(), asyncio.Event()
+        holder = asyncio.ensure_future(_hold(scheduler, started, release))
+        await started.wait()
+        queued = asyncio.ensure_future(scheduler.submit(_recording([], "queued")))
+        await asyncio.sleep(0)
+        with pytest.raises(SchedulerOverloaded) as rejected:
+            scheduler.check_admission(PRIORITY_INTERACTIVE)
+        release.set()
+        await asyncio.gather(holder, queued)
+        return rejected.value
+
+    rejected = asyncio.run(scenario())
+    assert rejected.status_code == 429
+    assert rejected.retry_after >= 1.0
+
+
+def test_circuit_opens_after_failures_and_closes_after_a_probe():
+    clock = FakeClock()
+    scheduler = _scheduler(clock, breaker_failures=2, breaker_cooldown_seconds=30)
+
+    async def failing():
+        raise ConnectionError("connection reset")
+
+    async def ok():
+        return "ok"
+
+    async def scenario():
+        for _ in range(2):
+            with pytest.raises(ConnectionError):
+                await scheduler.submit(failing)
+        assert scheduler.circuit_state == "open"
+        with pytest.raises(CircuitOpen) as refused:
+            await scheduler.submit(ok)
+        assert refused.value.status_code == 503
+        assert refused.value.retry_after == pytest.approx(30)
+
+        clock.now += 31
+        assert scheduler.circuit_state == "half_open"
+        assert await scheduler.submit(ok) == "ok"
+        assert scheduler.circuit_state == "closed"
+
+    asyncio.run(scenario())
+
+
+def test_non_retryable_errors_do_not_trip_the_breaker():
+    scheduler = _scheduler(breaker_failures=1)
+
+    async def broken():
+        raise ValueError("bad prompt")
+
+    async def scenario():
+        with pytest.raises(ValueError):
+            await scheduler.submit(broken)
+
+    asyncio.run(scenario())
+    assert scheduler.circuit_state == "closed"
+
+
+def test_cancelling_a_caller_that_just_got_a_slot_frees_it():
+    async def scenario():
+        scheduler = _scheduler()
+        started, release, finish = asyncio.Event(), asyncio.Event(), asyncio.Event()
+        holder = asyncio.ensure_future(_hold(scheduler, started, release))
+        await started.wait()
+
+        async def call():
+            await finish.wait()
+            return "done"
+
+        first = asyncio.ensure_future(scheduler.submit(call))
+        second = asyncio.ensure_future(scheduler.submit(call))
+        await asyncio.sleep(0)
+
+        # Queue both waiters on the condition lock, so the one that gets
+        # the slot has to wait for the lock again right after taking it.
+        changed = scheduler._condition()
+        await changed.acquire()
+        release.set()
+        for _ in range(5):
+            await asyncio.sleep(0)
+        changed.release()
+        await changed.acquire()
+        changed.release()
+        while scheduler.stats()["active"] == 0:
+            await asyncio.sleep(0)
+        # Cancelled as soon as it holds the slot, as a persona timeout would.
+        first.cancel()
+        await asyncio.gather(first, holder, return_exceptions=True)
+        finish.set()
+        assert await asyncio.wait_for(second, 1) == "done"
+        assert scheduler.stats()["active"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_retryable_errors_are_retried(monkeypatch):
+    monkeypatch.setattr("guardian.scheduler.random.uniform", lambda a, b: 0.0)
+    scheduler = _scheduler(retries=2, breaker_failures=0)
+    attempts = []
+
+    async def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise ConnectionError("try again")
+        return "ok"
+
+    assert asyncio.run(scheduler.submit(flaky)) == "ok"
+    assert len(attempts) == 3
+    assert scheduler.stats()["retries"] == 2
+
+
+def test_rejected_persona_pass_reaches_the_caller(monkeypatch):
+    async def refused(persona, document, document_hash=None):
+        raise CircuitOpen("The model is currently unavailable.", retry_after=5)
+
+    monkeypatch.setattr(agent, "_run_persona_pass", refused)
+    document = (
+        "1. Payment\nThe customer shall pay every invoice within thirty days of receipt.\n\n"
+        "2. Term\nThis agreement runs for twelve months and renews for the same period."
+    )
+
+    with pytest.raises(SchedulerRejected):
+        asyncio.run(agent.run_clauseguard_consensus_async(
+            "Is this contract safe to sign?", document, persona_mode="legal"
+        ))
@@ -0,0 +1,62 @@
+from guardian.segmentation import chunk_clauses, merge_chunk_risks, segment_clauses
+
+CONTRACT = (
+    "SERVICES AGREEMENT\n\n"
+    "1. Payment\nThe customer shall pay all fees within thirty days.\n"
+    "2. Term\nThis agreement runs for one year.\n\n"
+    "ARTICLE 3 - TERMINATION\n\n"
+    "Either party may terminate on thirty days notice.\n\n"
+    "(a) Notices must be in writing.\n"
+    "(b) Notices take effect on receipt."
+)
+
+
+def test_numbered_clauses_and_headings_are_split():
+    clauses = segment_clauses(CONTRACT)
+    firsts = [c["text"].split("\n", 1)[0] for c in clauses]
+    assert firsts == [
+        "SERVICES AGREEMENT", "2. Term", "ARTICLE 3 - TERMINATION",
+        "(a) Notices must be in writing.", "(b) Notices take effect on receipt.",
+    ]
+    assert [c["index"] for c in clauses] == list(range(len(clauses)))
+
+
+def test_standalone_heading_joins_the_following_clause():
+    clause = segment_clauses(CONTRACT)[2]
+    assert clause["heading"] == "ARTICLE 3 - TERMINATION"
+    assert clause["text"].endswith("Either party may terminate on thirty days notice.")
+
+
+def test_offsets_point_into_the_text():
+    for clause in segment_clauses(CONTRACT):
+        assert CONTRACT[clause["start"]:clause["end"]] == clause["text"]
+        assert clause["text"] == clause["text"].strip()
+
+
+def test_empty_text_has_no_clauses():
+    assert segment_clauses("") == []
+    assert segment_clauses("\n\n   \n") == []
+
+
+def test_chunks_respect_the_budget_and_keep_order():
+    clauses = segment_clauses(CONTRACT)
+    chunks = chunk_clauses(clauses, 120)
+    assert all(len(c["text"]) <= 120 for c in chunks)
+    assert [i for c in chunks for i in c["clauses"]] == [c["index"] for c in clauses]
+
+
+def test_oversized_clause_is_split_at_whitespace():
+    text = "1. Long\n" + " ".join(f"word{i}" for i in range(200))
+    chunks = chunk_clauses(segment_clauses(text), 300)
+    assert len(chunks) > 1
+    assert all(len(c["text"]) <= 300 for c in chunks)
+    assert " ".join(c["text"] for c in chunks).split() == text.split()
+
+
+def test_chunk_risks_merge_keeping_the_most_severe():
+    risks = merge_chunk_risks([
+        [{"clause": "Governing law is Delaware.", "severity": "LOW"}],
+        [{"clause": "governing law is  Delaware.", "severity": "HIGH"},
+         {"clause": "Fees are non-refundable.", "severity": "MEDIUM"}],
+    ])
+    assert [r["severity"] for r in risks] == ["HIGH", "MEDIUM"]
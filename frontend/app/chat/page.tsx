@@ -45,8 +45,9 @@ export default function ChatPage() {
   const [input, setInput] = useState("");
   const [isLoading, setIsLoading] = useState(false);
   const [uploadedFiles, setUploadedFiles] = useState<File[]>([]);
-  const [activeDocumentContent, setActiveDocumentContent] = useState<string | null>(null);
+  const [activeDocumentId, setActiveDocumentId] = useState<string | null>(null);
   const [personaMode, setPersonaMode] = useState<string>("auto");
+  const [conversationId] = useState(() => crypto.randomUUID());
   const [showPersonaMenu, setShowPersonaMenu] = useState(false);
   const messagesEndRef = useRef<HTMLDivElement>(null);
   const textareaRef = useRef<HTMLTextAreaElement>(null);
@@ -79,7 +80,7 @@ export default function ChatPage() {
     setIsLoading(true);
 
     try {
-      let documentContent = activeDocumentContent || "";
+      let documentId = activeDocumentId;
       let documentContext = currentInput || "General Document Analysis";
 
       // 1. If files are present, upload the first one to extract text
@@ -95,8 +96,8 @@ export default function ChatPage() {
         if (!uploadResponse.ok) throw new Error("File upload failed");
 
         const uploadData = await uploadResponse.json();
-        documentContent = uploadData.content;
-        setActiveDocumentContent(uploadData.content);
+        documentId = uploadData.document_id;
+        setActiveDocumentId(uploadData.document_id);
       }
 
       // 2. Perform risk analysis
@@ -104,9 +105,10 @@ export default function ChatPage() {
         method: "POST",
         headers: { "Content-Type": "application/json" },
         body: JSON.stringify({
-          content: documentContent,
+          document_id: documentId,
           context: currentInput,
-          persona_mode: personaMode
+          persona_mode: personaMode,
+          conversation_id: conversationId
         }),
       });
 